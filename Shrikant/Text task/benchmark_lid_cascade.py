@@ -0,0 +1,76 @@
+"""
+Cascade LID vs the full fastText model on a labelled set.
+
+Reports time per text, accuracy, and for the cascade how many texts each
+tier answered and how accurate that tier was.
+
+Labelled file: one "lang<TAB>text" per line (lang as fastText codes: hi, kn, te, en, ...).
+Without one, the benchmark sample texts are used.
+
+Usage:
+    python benchmark_lid_cascade.py models/lid.176.bin [models/lid.176.ftz] [labelled.tsv] [repeat]
+"""
+
+import sys
+import time
+from collections import Counter
+
+from text_pipeline import CascadeLanguageIdentifier, LanguageIdentifier
+from benchmark_text_pipeline import SAMPLE_TEXTS
+
+SAMPLE_LABELS = ["hi", "kn", "te", "en", "hi"]
+
+
+def load_labelled(path):
+    labels, texts = [], []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            lang, _, text = line.rstrip("\n").partition("\t")
+            if text:
+                labels.append(lang)
+                texts.append(text)
+    return labels, texts
+
+
+def run(detector, texts):
+    start = time.perf_counter()
+    results = detector.detect_batch(texts)
+    return results, time.perf_counter() - start
+
+
+def accuracy(results, labels):
+    return sum(r.lang_code == lang for r, lang in zip(results, labels)) / max(len(labels), 1)
+
+
+def main():
+    model_path = sys.argv[1] if len(sys.argv) > 1 else None
+    fast_model_path = sys.argv[2] if len(sys.argv) > 2 and sys.argv[2].endswith(".ftz") else None
+    rest = sys.argv[3 if fast_model_path else 2:]
+    labelled_path = rest[0] if rest and not rest[0].isdigit() else None
+    repeat = int(rest[-1]) if rest and rest[-1].isdigit() else (1 if labelled_path else 4000)
+
+    if labelled_path:
+        labels, texts = load_labelled(labelled_path)
+    else:
+        labels, texts = SAMPLE_LABELS, SAMPLE_TEXTS
+    labels, texts = labels * repeat, texts * repeat
+
+    print(f"Texts: {len(texts)} | full: {model_path or '-'} | fast: {fast_model_path or '-'}")
+
+    full = LanguageIdentifier(model_path=model_path)
+    results, elapsed = run(full, texts)
+    print(f"  full model : {elapsed / len(texts) * 1e6:8.1f} us/text  accuracy {accuracy(results, labels):.3f}")
+
+    cascade = CascadeLanguageIdentifier(model_path=model_path, fast_model_path=fast_model_path)
+    results, cascade_elapsed = run(cascade, texts)
+    print(f"  cascade    : {cascade_elapsed / len(texts) * 1e6:8.1f} us/text  accuracy {accuracy(results, labels):.3f}"
+          f"  ({elapsed / cascade_elapsed:.1f}x)")
+
+    correct = Counter(r.tier for r, lang in zip(results, labels) if r.lang_code == lang)
+    for tier, stats in cascade.tier_stats().items():
+        tier_accuracy = correct[tier] / stats["count"] if stats["count"] else 0.0
+        print(f"    {tier:<10} {stats['count']:7d} texts  hit rate {stats['rate']:6.1%}  accuracy {tier_accuracy:.3f}")
+
+
+if __name__ == "__main__":
+    main()
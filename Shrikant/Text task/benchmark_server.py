@@ -0,0 +1,121 @@
+"""
+Load generator for text_server.py vs direct ProductionPipeline.process calls.
+
+Starts the server in a subprocess, opens `concurrency` keep-alive
+connections that each send requests back to back, and reports
+throughput and p50/p99 latency next to the direct per-item call.
+
+Usage:
+    python benchmark_server.py [path/to/lid.176.bin] [concurrency] [requests]
+"""
+
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import time
+
+from text_pipeline import ProductionPipeline
+from benchmark_text_pipeline import SAMPLE_TEXTS
+
+HOST = "127.0.0.1"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def wait_for_server(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection((HOST, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+async def client(port, texts, latencies):
+    reader, writer = await asyncio.open_connection(HOST, port)
+    for text in texts:
+        body = json.dumps({"text": text}).encode("utf-8")
+        request = (
+            f"POST /process HTTP/1.1\r\nHost: {HOST}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+        ).encode("latin-1") + body
+
+        start = time.perf_counter()
+        writer.write(request)
+        await writer.drain()
+
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        await reader.readexactly(length)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    writer.close()
+
+
+async def run_load(port, concurrency, num_requests):
+    per_client = num_requests // concurrency
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(port, [SAMPLE_TEXTS[(c + i) % len(SAMPLE_TEXTS)] for i in range(per_client)], latencies)
+        for c in range(concurrency)
+    ))
+    return time.perf_counter() - start, latencies
+
+
+def report(name, elapsed, latencies):
+    print(f"  {name:<14}: {len(latencies) / elapsed:9.0f} req/s  "
+          f"p50 {percentile(latencies, 50):7.2f} ms  p99 {percentile(latencies, 99):7.2f} ms")
+
+
+def main():
+    model_path = sys.argv[1] if len(sys.argv) > 1 else None
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    num_requests = int(sys.argv[3]) if len(sys.argv) > 3 else 20000
+
+    # Direct per-item calls
+    pipeline = ProductionPipeline(lid_model_path=model_path)
+    latencies = []
+    start = time.perf_counter()
+    for i in range(num_requests):
+        t = time.perf_counter()
+        pipeline.process(SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)])
+        latencies.append((time.perf_counter() - t) * 1000)
+    print(f"Requests: {num_requests} | Concurrency: {concurrency}")
+    report("direct call", time.perf_counter() - start, latencies)
+
+    # Micro-batching server
+    port = free_port()
+    cmd = [sys.executable, "text_server.py", "--port", str(port)]
+    if model_path:
+        cmd += ["--model", model_path]
+    server = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+    try:
+        wait_for_server(port)
+        elapsed, latencies = asyncio.run(run_load(port, concurrency, num_requests))
+        report("micro-batched", elapsed, latencies)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
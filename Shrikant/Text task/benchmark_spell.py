@@ -0,0 +1,80 @@
+"""
+Suggestion latency of SpellIndex vs the old linear substring scan,
+for synthetic dictionaries from 1k to 1M words.
+
+Usage:
+    python benchmark_spell.py [max_size]
+"""
+
+import random
+import sys
+import time
+
+from text_pipeline import SpellIndex
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+NUM_QUERIES = 200
+LINEAR_SCAN_MAX = 100_000     # the old scan is too slow to time beyond this
+
+# Devanagari consonants and vowel signs
+LETTERS = [chr(c) for c in range(0x0915, 0x0939)] + [chr(c) for c in range(0x093E, 0x094C)]
+
+
+def make_words(n, rng):
+    words = set()
+    while len(words) < n:
+        words.add("".join(rng.choices(LETTERS, k=rng.randint(4, 10))))
+    return list(words)
+
+
+def misspell(word, rng):
+    i = rng.randrange(len(word))
+    if rng.random() < 0.5:
+        return word[:i] + word[i + 1:]
+    return word[:i] + rng.choice(LETTERS) + word[i + 1:]
+
+
+def linear_suggest(dictionary, word):
+    """Suggestion loop used by HunspellChecker before SpellIndex"""
+    return [w for w in dictionary if word[:-1] in w or word[1:] in w]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def time_queries(fn, queries):
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        fn(q)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return percentile(latencies, 50), percentile(latencies, 99)
+
+
+def main():
+    max_size = int(sys.argv[1]) if len(sys.argv) > 1 else SIZES[-1]
+    rng = random.Random(0)
+
+    print(f"{'words':>10} {'build s':>8} {'index p50 ms':>13} {'index p99 ms':>13} {'scan p50 ms':>12}")
+    for size in [s for s in SIZES if s <= max_size]:
+        words = make_words(size, rng)
+        queries = [misspell(rng.choice(words), rng) for _ in range(NUM_QUERIES)]
+
+        start = time.perf_counter()
+        index = SpellIndex(words)
+        build = time.perf_counter() - start
+
+        p50, p99 = time_queries(index.lookup, queries)
+
+        scan = "-"
+        if size <= LINEAR_SCAN_MAX:
+            scan_p50, _ = time_queries(lambda q: linear_suggest(words, q), queries[:20])
+            scan = f"{scan_p50:.3f}"
+
+        print(f"{size:>10} {build:>8.1f} {p50:>13.3f} {p99:>13.3f} {scan:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Throughput benchmark: per-item ProductionPipeline.process loop
+vs ProductionPipeline.process_batch
+
+Usage:
+    python benchmark_text_pipeline.py [path/to/lid.176.bin] [num_texts]
+"""
+
+import sys
+import time
+
+from text_pipeline import ProductionPipeline
+
+SAMPLE_TEXTS = [
+    "नमस्ते आज का मौसम कैसे है",
+    "ನಮಸ್ಕಾರ ಇಂದಿನ ಹವಾಮಾನ ಎನ್ನ",
+    "నమస్కారం ఈ రోజు వాతావరణం ఎలా",
+    "Good morning, how are you today?",
+    "kl ka mausm kse hai",
+]
+
+BATCH_SIZES = [64, 256, 1024, 4096]
+
+
+def run_loop(pipeline, texts):
+    start = time.perf_counter()
+    for text in texts:
+        pipeline.process(text)
+    return time.perf_counter() - start
+
+
+def run_batch(pipeline, texts, batch_size):
+    start = time.perf_counter()
+    pipeline.process_batch(texts, batch_size=batch_size)
+    return time.perf_counter() - start
+
+
+def main():
+    model_path = sys.argv[1] if len(sys.argv) > 1 else None
+    num_texts = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    pipeline = ProductionPipeline(lid_model_path=model_path)
+    texts = [SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)] for i in range(num_texts)]
+
+    # Sanity check: batched results must match the per-item path
+    assert pipeline.process_batch(texts[:100]) == [pipeline.process(t) for t in texts[:100]]
+
+    print(f"Texts: {num_texts} | Model: {model_path or 'not loaded'}")
+
+    elapsed = run_loop(pipeline, texts)
+    print(f"  per-item loop     : {num_texts / elapsed:10.0f} texts/s")
+
+    for batch_size in BATCH_SIZES:
+        elapsed = run_batch(pipeline, texts, batch_size)
+        print(f"  batch_size={batch_size:<6}: {num_texts / elapsed:10.0f} texts/s")
+
+
+if __name__ == "__main__":
+    main()
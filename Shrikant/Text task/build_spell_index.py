@@ -0,0 +1,30 @@
+"""
+Build a SpellIndex from a Hunspell .dic (or word list) and save it, so
+Stage 1B loads it without rebuilding the deletion index.
+
+Usage:
+    python build_spell_index.py dictionaries/hi_IN.dic dictionaries/hi_IN.pkl [max_distance]
+
+Then: ProductionPipeline(dictionary_paths={"hi": "dictionaries/hi_IN.pkl"})
+"""
+
+import sys
+import time
+
+from text_pipeline import SpellIndex
+
+
+def main():
+    dic_path, out_path = sys.argv[1], sys.argv[2]
+    max_distance = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+
+    start = time.perf_counter()
+    index = SpellIndex.from_file(dic_path, max_distance=max_distance)
+    index.save(out_path)
+
+    print(f"Indexed {len(index)} words ({len(index.deletes)} delete keys) "
+          f"in {time.perf_counter() - start:.1f}s -> {out_path}")
+
+
+if __name__ == "__main__":
+    main()
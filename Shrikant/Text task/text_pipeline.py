@@ -1,30 +1,174 @@
+import os
+import pickle
 import re
-import unicodedata
+import sys
 import numpy as np
 import warnings
+from collections import Counter
 from dataclasses import dataclass
 from typing import Dict, List
 
 warnings.filterwarnings("ignore")
 
-def monkey_patch_numpy():
-    original_array = np.array
-    def patched_array(obj, copy=False, *args, **kwargs):
+class _FastTextNumpy:
+    """
+    numpy as seen by the fastText wrapper only. fastText calls
+    np.array(x, copy=False), which NumPy 2 rejects when a copy is needed;
+    here that means np.asarray(x). The global np.array is left alone.
+    """
+
+    def __getattr__(self, name):
+        return getattr(np, name)
+
+    @staticmethod
+    def array(obj, *args, copy=True, **kwargs):
         if copy is False:
             return np.asarray(obj, *args, **kwargs)
-        return original_array(obj, copy=copy, *args, **kwargs)
-    np.array = patched_array
+        return np.array(obj, *args, copy=copy, **kwargs)
+
+
+def load_fasttext_model(path):
+    """Import fastText on first use and load a model (.bin or .ftz)"""
+    import fasttext
+    import fasttext.FastText
+
+    fasttext.FastText.np = _FastTextNumpy()
+    return fasttext.load_model(path)
+
+# Text normalisation and stage profiling are shared with the evaluation,
+# imported through the Tharun package of the repository (only the
+# repository root goes on sys.path, not Tharun's generic top-level names)
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+if REPO_DIR not in sys.path:
+    sys.path.append(REPO_DIR)
+
+from Tharun.evaluation.normalize_text import get_normalizer
+from Tharun.stage_profiler import profiled
+
+
+def edit_distance(a, b, max_distance):
+    """
+    Levenshtein distance between a and b, or max_distance + 1 as soon as
+    it is known to be larger (early exit keeps suggestion lookups cheap)
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+        if min(cur) > max_distance:
+            return max_distance + 1
+        prev = cur
+    return prev[-1]
+
+
+class SpellIndex:
+    """
+    SymSpell-style dictionary index.
+    
+    Every dictionary word is stored under each string reachable by deleting
+    up to max_distance characters from its first prefix_length characters.
+    A lookup generates the same deletes for the input word, so candidates
+    come from a few hash lookups instead of a scan of the dictionary, and
+    only those candidates are checked with edit_distance.
+    """
+    
+    def __init__(self, words=(), max_distance=2, prefix_length=7):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.words = set()
+        self.deletes: Dict[str, List[str]] = {}
+        
+        for word in words:
+            self.add(word)
+    
+    def _delete_variants(self, word):
+        variants = {word}
+        frontier = {word}
+        for _ in range(self.max_distance):
+            frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+            variants |= frontier
+        return variants
+    
+    def add(self, word):
+        if not word or word in self.words:
+            return
+        self.words.add(word)
+        for variant in self._delete_variants(word[:self.prefix_length]):
+            self.deletes.setdefault(variant, []).append(word)
+    
+    def __contains__(self, word):
+        return word in self.words
+    
+    def __len__(self):
+        return len(self.words)
+    
+    def lookup(self, word, max_distance=None, limit=5):
+        """Dictionary words within max_distance edits, closest first"""
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        
+        candidates = set()
+        for variant in self._delete_variants(word[:self.prefix_length]):
+            candidates.update(self.deletes.get(variant, ()))
+        
+        scored = []
+        for candidate in candidates:
+            distance = edit_distance(word, candidate, max_distance)
+            if distance <= max_distance:
+                scored.append((distance, candidate))
+        
+        scored.sort()
+        return [candidate for _, candidate in scored[:limit]]
+    
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """
+        Build from a Hunspell .dic file (first line is the word count,
+        affix flags after "/" are dropped) or a plain one-word-per-line list
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        
+        if lines and lines[0].strip().isdigit():
+            lines = lines[1:]
+        
+        words = (line.split("/")[0].strip() for line in lines)
+        return cls((w for w in words if w), **kwargs)
+    
+    def save(self, path):
+        """Serialise the built index (pickle) so it loads without rebuilding"""
+        with open(path, "wb") as f:
+            pickle.dump(self.__dict__, f, protocol=pickle.HIGHEST_PROTOCOL)
+    
+    @classmethod
+    def load(cls, path):
+        index = cls.__new__(cls)
+        with open(path, "rb") as f:
+            index.__dict__.update(pickle.load(f))
+        return index
 
-monkey_patch_numpy()
 
-import fasttext
+def load_spell_index(path):
+    """Load a saved index (.pkl) or build one from a dictionary file"""
+    if path.endswith(".pkl"):
+        return SpellIndex.load(path)
+    return SpellIndex.from_file(path)
+
 
 class HunspellChecker:
     """Hunspell-based spell checker for Indian languages"""
     
-    def __init__(self, language="hi"):
+    def __init__(self, language="hi", dictionary_path=None):
         self.language = language
-        self.dictionary = self.load_dictionary(language)
+        if dictionary_path:
+            self.index = load_spell_index(dictionary_path)
+        else:
+            self.index = SpellIndex(self.load_dictionary(language))
+        self.dictionary = self.index.words
     
     def load_dictionary(self, language):
         """Load common words dictionary for each language"""
@@ -39,24 +183,30 @@ class HunspellChecker:
         """Check if word exists in dictionary"""
         return word in self.dictionary
     
-    def suggest(self, word):
-        """Suggest corrections"""
-        suggestions = []
-        for dict_word in self.dictionary:
-            if word[:-1] in dict_word or word[1:] in dict_word:
-                suggestions.append(dict_word)
-        return suggestions
+    def suggest(self, word, max_distance=2):
+        """Suggest corrections within max_distance edits, closest first"""
+        return self.index.lookup(word, max_distance)
 
 
 class IndicSpellChecker:
     """IndicSpell-based correction for Indian languages"""
     
-    def __init__(self, language="hi"):
+    def __init__(self, language="hi", typo_map_path=None):
         self.language = language
-        self.typo_map = self.load_typo_map(language)
+        self.typo_map = self.load_typo_map(language, typo_map_path)
+        self.phrase_re = self.compile_phrases(self.typo_map)
     
-    def load_typo_map(self, language):
-        """Language-specific typo corrections"""
+    def load_typo_map(self, language, path=None):
+        """Language-specific typo corrections (from a "typo<TAB>correction" file if given)"""
+        if path:
+            typo_map = {}
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    typo, sep, correction = line.rstrip("\n").partition("\t")
+                    if sep and typo.strip():
+                        typo_map[" ".join(typo.lower().split())] = correction.strip()
+            return typo_map
+        
         return {
             "hi": {
                 "mausm": "मौसम", "samay": "समय", "aaj": "आज",
@@ -71,8 +221,26 @@ class IndicSpellChecker:
             }
         }.get(language, {})
     
+    @staticmethod
+    def compile_phrases(typo_map):
+        """
+        One compiled pattern for multi-word entries (longest first, matched
+        on whitespace boundaries); single words stay O(1) dict lookups
+        """
+        phrases = sorted((k for k in typo_map if " " in k), key=len, reverse=True)
+        if not phrases:
+            return None
+        alternation = "|".join(re.escape(p) for p in phrases)
+        return re.compile(rf"(?<!\S)(?:{alternation})(?!\S)", re.IGNORECASE)
+    
     def correct(self, text):
         """Correct typos in text"""
+        if self.phrase_re is not None:
+            text = self.phrase_re.sub(
+                lambda m: self.typo_map[m.group(0).lower()],
+                " ".join(text.split())
+            )
+        
         words = text.split()
         corrected_words = []
         
@@ -86,20 +254,22 @@ class IndicSpellChecker:
 
 class Stage1BTextValidation:
     
-    def __init__(self, language="hi"):
+    def __init__(self, language="hi", dictionary_path=None, typo_map_path=None):
         self.language = language
-        self.hunspell = HunspellChecker(language)
-        self.indicspell = IndicSpellChecker(language)
+        self.hunspell = HunspellChecker(language, dictionary_path)
+        self.indicspell = IndicSpellChecker(language, typo_map_path)
+        # Step 1 (basic cleaning): collapse whitespace + NFKD
+        self.normalizer = get_normalizer(language, "stage1b")
     
     def validate_text(self, text):
         """Execute Stage 1B pipeline"""
         if not text or not isinstance(text, str):
             return ""
         
-        # Step 1: Basic cleaning
-        text = re.sub(r'\s+', ' ', text.strip())
-        text = unicodedata.normalize('NFKD', text)
-        
+        return self._validate_clean(self.normalizer.normalize(text))
+    
+    def _validate_clean(self, text):
+        """Steps 2-3 on text that went through the normaliser"""
         # Step 2: IndicSpell correction (primary)
         corrected = self.indicspell.correct(text)
         
@@ -119,6 +289,12 @@ class Stage1BTextValidation:
     def process(self, text):
         """Main processing method for Stage 1B"""
         return self.validate_text(text)
+    
+    @profiled("text.stage1b_batch")
+    def process_batch(self, texts):
+        """Run Stage 1B over a list of texts of this language"""
+        texts = [text if text and isinstance(text, str) else "" for text in texts]
+        return [self._validate_clean(text) for text in self.normalizer.normalize_many(texts)]
 
 @dataclass
 class LIDResult:
@@ -128,6 +304,7 @@ class LIDResult:
     confidence: float
     route_key: str
     cleaned_text: str = ""
+    tier: str = ""
 
 
 class LanguageIdentifier:
@@ -147,7 +324,7 @@ class LanguageIdentifier:
         
         if model_path:
             try:
-                self.model = fasttext.load_model(model_path)
+                self.model = load_fasttext_model(model_path)
             except Exception as e:
                 print(f"Warning: Could not load model: {e}")
     
@@ -161,39 +338,260 @@ class LanguageIdentifier:
         
         try:
             labels, probs = self.model.predict(text.strip())
-            lang_code = labels[0].replace("__label__", "")
-            confidence = float(probs[0])
-            
-            # Check confidence threshold
-            if confidence < self.conf_threshold:
-                return LIDResult(lang_code, "Low confidence", confidence, "nlu_fallback")
-            
-            lang_name = self.INDIAN_LANGUAGES.get(lang_code, "Other")
-            
-            # Determine routing key based on language
-            if lang_code in {"hi", "kn", "te"}:
-                route_key = f"nlu_{lang_code}"
-            elif lang_code in self.INDIAN_LANGUAGES:
-                route_key = "nlu_indic"
-            else:
-                route_key = "nlu_other"
-            
-            return LIDResult(lang_code, lang_name, confidence, route_key)
+            return self._make_result(labels[0], probs[0])
             
         except Exception as e:
             return LIDResult("error", f"Detection failed: {str(e)}", 0.0, "nlu_fallback")
+    
+    @profiled("text.lid_batch")
+    def detect_batch(self, texts: List[str], batch_size: int = 1024) -> List[LIDResult]:
+        """
+        Detect languages for a list of texts.
+        Valid texts are sent to fastText in chunks of batch_size through a
+        single multi-line predict call; results are in input order.
+        """
+        results = [None] * len(texts)
+        pending = []
+        
+        for i, text in enumerate(texts):
+            # fastText predicts one line per item, so multi-line texts
+            # go through detect() to keep identical behaviour
+            if (not self.model or not isinstance(text, str)
+                    or len(text.strip()) < 5 or "\n" in text.strip()):
+                results[i] = self.detect(text)
+            else:
+                pending.append(i)
+        
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            try:
+                labels, probs = self.model.predict([texts[i].strip() for i in chunk])
+            except Exception:
+                for i in chunk:
+                    results[i] = self.detect(texts[i])
+                continue
+            
+            for i, label, prob in zip(chunk, labels, probs):
+                results[i] = self._make_result(label[0], prob[0])
+        
+        return results
+    
+    def _make_result(self, label, prob) -> LIDResult:
+        """Turn a fastText label/probability pair into a routed LIDResult"""
+        lang_code = label.replace("__label__", "")
+        confidence = float(prob)
+        
+        # Check confidence threshold
+        if confidence < self.conf_threshold:
+            return LIDResult(lang_code, "Low confidence", confidence, "nlu_fallback")
+        
+        lang_name = self.INDIAN_LANGUAGES.get(lang_code, "Other")
+        
+        # Determine routing key based on language
+        if lang_code in {"hi", "kn", "te"}:
+            route_key = f"nlu_{lang_code}"
+        elif lang_code in self.INDIAN_LANGUAGES:
+            route_key = "nlu_indic"
+        else:
+            route_key = "nlu_other"
+        
+        return LIDResult(lang_code, lang_name, confidence, route_key)
+
+# Unicode script blocks are 128 code points wide, so block = code point >> 7.
+# Scripts used by a single language in our traffic decide the language on
+# their own; Bengali (bn / as), Arabic (ur / ar / fa) and Latin (English or
+# romanised Indic) are left to fastText.
+SCRIPT_LANGUAGES = {
+    0x0900 >> 7: "hi",   # Devanagari (Marathi / Nepali also route as hi)
+    0x0A00 >> 7: "pa",   # Gurmukhi
+    0x0A80 >> 7: "gu",   # Gujarati
+    0x0B00 >> 7: "or",   # Oriya
+    0x0B80 >> 7: "ta",   # Tamil
+    0x0C00 >> 7: "te",   # Telugu
+    0x0C80 >> 7: "kn",   # Kannada
+    0x0D00 >> 7: "ml",   # Malayalam
+}
+NUM_SCRIPT_BLOCKS = (0x0D80 >> 7)
+MIN_SCRIPT_LETTERS = 3
+
+
+def script_scores(texts: List[str], min_letters: int = MIN_SCRIPT_LETTERS):
+    """
+    Dominant-script language and its share of letters for each text,
+    computed for the whole list with one histogram.
+    Returns (languages, shares); language is None when the dominant script
+    does not identify a language or the text has fewer than min_letters.
+    """
+    if not texts:
+        return [], []
+
+    codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32)
+    owner = np.repeat(np.arange(len(texts)), [len(t) for t in texts])
+
+    # Letters only: Latin, Arabic and the Indic blocks (no spaces, digits, punctuation)
+    letters = (((codes | 0x20) >= ord("a")) & ((codes | 0x20) <= ord("z"))) \
+        | ((codes >= 0xC0) & (codes < 0x250)) \
+        | ((codes >= 0x0600) & (codes < 0x0700)) \
+        | ((codes >= 0x0900) & (codes < 0x0D80))
+    blocks = codes[letters] >> 7
+    histogram = np.bincount(
+        owner[letters] * NUM_SCRIPT_BLOCKS + blocks,
+        minlength=len(texts) * NUM_SCRIPT_BLOCKS
+    ).reshape(len(texts), NUM_SCRIPT_BLOCKS)
+
+    totals = histogram.sum(axis=1)
+    dominant = histogram.argmax(axis=1)
+    shares = histogram[np.arange(len(texts)), dominant] / np.maximum(totals, 1)
+
+    languages = [
+        SCRIPT_LANGUAGES.get(int(block)) if total >= min_letters else None
+        for block, total in zip(dominant, totals)
+    ]
+    return languages, shares.tolist()
+
+
+class CascadeLanguageIdentifier(LanguageIdentifier):
+    """
+    LanguageIdentifier that tries cheap tiers first:
+
+        script  Unicode block histogram (no model)
+        fast    compressed fastText model (lid.176.ftz)
+        full    full fastText model (lid.176.bin)
+
+    A tier answers when its confidence reaches its threshold, otherwise the
+    text moves on; the last available tier always answers. Which tier
+    answered is kept in LIDResult.tier and counted in tier_counts.
+    """
+
+    TIERS = ("script", "fast", "full")
+
+    def __init__(self, model_path=None, fast_model_path=None, confidence_threshold=0.8,
+                 script_threshold=None, fast_threshold=None, min_script_letters=MIN_SCRIPT_LETTERS):
+        super().__init__(model_path=model_path, confidence_threshold=confidence_threshold)
+
+        self.fast_model = None
+        if fast_model_path:
+            try:
+                self.fast_model = load_fasttext_model(fast_model_path)
+            except Exception as e:
+                print(f"Warning: Could not load fast model: {e}")
+
+        self.script_threshold = confidence_threshold if script_threshold is None else script_threshold
+        self.fast_threshold = confidence_threshold if fast_threshold is None else fast_threshold
+        self.min_script_letters = min_script_letters
+        self.tier_counts = Counter()
+
+    def detect(self, text: str) -> LIDResult:
+        return self.detect_batch([text])[0]
+
+    def _predict_tier(self, tier, model, texts, indices, results, threshold, final, batch_size):
+        """Run one fastText tier; returns the indices it did not answer"""
+        rest = []
+        for start in range(0, len(indices), batch_size):
+            chunk = indices[start:start + batch_size]
+            try:
+                # fastText predicts one line per item
+                labels, probs = model.predict([" ".join(texts[i].split()) for i in chunk])
+            except Exception as e:
+                if final:
+                    for i in chunk:
+                        results[i] = LIDResult("error", f"Detection failed: {str(e)}", 0.0, "nlu_fallback", tier=tier)
+                        self.tier_counts["error"] += 1
+                else:
+                    rest += chunk
+                continue
+
+            for i, label, prob in zip(chunk, labels, probs):
+                if final or float(prob[0]) >= threshold:
+                    results[i] = self._make_result(label[0], prob[0])
+                    results[i].tier = tier
+                    self.tier_counts[tier] += 1
+                else:
+                    rest.append(i)
+        return rest
+
+    @profiled("text.lid_cascade_batch")
+    def detect_batch(self, texts: List[str], batch_size: int = 1024) -> List[LIDResult]:
+        results = [None] * len(texts)
+        pending = []
+        for i, text in enumerate(texts):
+            if not isinstance(text, str) or len(text.strip()) < 5:
+                results[i] = LIDResult("unk", "Unknown", 0.0, "nlu_fallback")
+                self.tier_counts["invalid"] += 1
+            else:
+                pending.append(i)
+
+        # Tier 1: script histogram
+        languages, shares = script_scores([texts[i] for i in pending], self.min_script_letters)
+        script_guess = {}
+        rest = []
+        for i, language, share in zip(pending, languages, shares):
+            if language and share >= self.script_threshold:
+                results[i] = self._make_result(language, share)
+                results[i].tier = "script"
+                self.tier_counts["script"] += 1
+            else:
+                script_guess[i] = (language, share)
+                rest.append(i)
+
+        # Tiers 2 and 3: fastText models, cheapest first
+        models = [(tier, model, threshold) for tier, model, threshold in (
+            ("fast", self.fast_model, self.fast_threshold),
+            ("full", self.model, self.conf_threshold),
+        ) if model]
+        for n, (tier, model, threshold) in enumerate(models):
+            rest = self._predict_tier(tier, model, texts, rest, results, threshold,
+                                      n == len(models) - 1, batch_size)
+
+        # No model at all: the script guess is the answer, however weak
+        for i in rest:
+            language, share = script_guess[i]
+            if language:
+                results[i] = self._make_result(language, share)
+                results[i].tier = "script"
+                self.tier_counts["script"] += 1
+            else:
+                results[i] = LIDResult("error", "Model not loaded", 0.0, "nlu_fallback")
+                self.tier_counts["unresolved"] += 1
+
+        return results
+
+    def tier_stats(self) -> Dict:
+        """Share of answered texts per tier since the last reset_stats()"""
+        total = sum(self.tier_counts.values())
+        return {
+            tier: {"count": count, "rate": count / total if total else 0.0}
+            for tier, count in self.tier_counts.items()
+        }
+
+    def reset_stats(self):
+        self.tier_counts.clear()
+
+
+RESULT_FIELDS = ['input', 'cleaned_text', 'lang_code', 'lang_name',
+                 'confidence', 'route_key', 'status']
+
 
 class ProductionPipeline:
 
-    def __init__(self, lid_model_path=None):
+    def __init__(self, lid_model_path=None, dictionary_paths=None,
+                 lid_fast_model_path=None, cascade=False):
+        # dictionary_paths: optional {lang: .dic / word list / saved .pkl index}
+        # cascade / lid_fast_model_path: script -> .ftz -> .bin cascade LID
+        dictionary_paths = dictionary_paths or {}
 
-        self.lid_detector = LanguageIdentifier(model_path=lid_model_path)
+        if cascade or lid_fast_model_path:
+            self.lid_detector = CascadeLanguageIdentifier(
+                model_path=lid_model_path, fast_model_path=lid_fast_model_path
+            )
+        else:
+            self.lid_detector = LanguageIdentifier(model_path=lid_model_path)
         self.stage1b_pipelines = {
-            "hi": Stage1BTextValidation("hi"),
-            "kn": Stage1BTextValidation("kn"),
-            "te": Stage1BTextValidation("te"),
+            lang: Stage1BTextValidation(lang, dictionary_paths.get(lang))
+            for lang in ("hi", "kn", "te")
         }
     
+    @profiled("text.process")
     def process(self, text: str) -> Dict:
   
         if not text or not isinstance(text, str):
@@ -236,6 +634,67 @@ class ProductionPipeline:
                 'route_key': "nlu_fallback",
                 'status': f'error: {str(e)}'
             }
+    
+    @profiled("text.process_batch")
+    def process_batch(self, texts: List[str], batch_size: int = 1024,
+                      columnar: bool = False):
+        """
+        Batched version of process().
+        
+        Language detection runs through LanguageIdentifier.detect_batch, then
+        texts are grouped by detected language so each Stage 1B pipeline
+        handles its whole group at once. Returns a list of the same dicts as
+        process(), or a dict of lists (one per field) when columnar=True.
+        """
+        results = [None] * len(texts)
+        valid = []
+        
+        for i, text in enumerate(texts):
+            if text and isinstance(text, str):
+                valid.append(i)
+            else:
+                results[i] = self.process(text)
+        
+        for start in range(0, len(valid), batch_size):
+            chunk = valid[start:start + batch_size]
+            chunk_texts = [texts[i] for i in chunk]
+            
+            try:
+                # STAGE 2B: Detect language for the whole chunk
+                lid_results = self.lid_detector.detect_batch(chunk_texts, batch_size)
+                
+                # STAGE 1B: Clean each language group in one go
+                groups: Dict[str, List[int]] = {}
+                for j, lid_result in enumerate(lid_results):
+                    lang_code = lid_result.lang_code if lid_result.lang_code in self.stage1b_pipelines else "hi"
+                    groups.setdefault(lang_code, []).append(j)
+                
+                cleaned = [""] * len(chunk)
+                for lang_code, members in groups.items():
+                    group_texts = [chunk_texts[j] for j in members]
+                    for j, text in zip(members, self.stage1b_pipelines[lang_code].process_batch(group_texts)):
+                        cleaned[j] = text
+                
+                for j, i in enumerate(chunk):
+                    lid_result = lid_results[j]
+                    results[i] = {
+                        'input': texts[i],
+                        'cleaned_text': cleaned[j],
+                        'lang_code': lid_result.lang_code,
+                        'lang_name': lid_result.lang_name,
+                        'confidence': lid_result.confidence,
+                        'route_key': lid_result.route_key,
+                        'status': 'success'
+                    }
+            
+            except Exception:
+                # Fall back to per-item processing so one bad text only fails itself
+                for i in chunk:
+                    results[i] = self.process(texts[i])
+        
+        if columnar:
+            return {field: [r[field] for r in results] for field in RESULT_FIELDS}
+        return results
 
 if __name__ == "__main__":
     print("=" * 80)
@@ -0,0 +1,280 @@
+"""
+Async micro-batching service for ProductionPipeline.
+
+Incoming texts are queued and flushed to ProductionPipeline.process_batch
+when a batch is full or the oldest text has waited max_delay_ms. The
+queue is bounded: when it is full new requests get 503 (backpressure)
+instead of piling up latency.
+
+Endpoints (HTTP/1.1, keep-alive, JSON):
+    POST /process   {"text": "..."} or {"texts": ["...", ...]}
+    GET  /metrics   queue depth, batch sizes, latency histogram / percentiles
+
+Usage:
+    python text_server.py --model models/lid.176.bin --port 8080
+    python text_server.py --unix /tmp/text_pipeline.sock
+"""
+
+import argparse
+import asyncio
+import bisect
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from text_pipeline import ProductionPipeline
+
+# Latency histogram bucket upper bounds (ms); the last bucket is open-ended
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Histogram:
+    """Fixed-bucket histogram; percentiles are bucket upper bounds"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS, unit="ms"):
+        self.buckets = buckets
+        self.unit = unit
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0
+
+    def record(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += 1
+
+    def percentile(self, p):
+        if not self.total:
+            return 0.0
+        target = p / 100 * self.total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return float(self.buckets[i]) if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def to_dict(self):
+        labels = [f"<={b}" for b in self.buckets] + [f">{self.buckets[-1]}"]
+        return {
+            f"buckets_{self.unit}": dict(zip(labels, self.counts)),
+            f"p50_{self.unit}": self.percentile(50),
+            f"p99_{self.unit}": self.percentile(99),
+            "count": self.total,
+        }
+
+
+class MicroBatcher:
+
+    def __init__(self, pipeline, max_batch_size=256, max_delay_ms=5.0, max_queue=10000):
+        self.pipeline = pipeline
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay_ms / 1000
+        self.queue = asyncio.Queue(maxsize=max_queue)
+
+        # One thread runs the batches so the event loop keeps accepting requests
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.latency = Histogram()
+        self.batch_sizes = Histogram(buckets=[1, 8, 32, 64, 128, 256, 512, 1024], unit="texts")
+        self.rejected = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+        self.executor.shutdown(wait=False)
+
+    async def submit(self, text):
+        """Queue one text and wait for its result dict"""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((text, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFull()
+        return await future
+
+    async def _collect(self):
+        """Wait for one item, then take more until full or the deadline passes"""
+        batch = [await self.queue.get()]
+        deadline = batch[0][2] + self.max_delay
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            texts = [text for text, _, _ in batch]
+
+            try:
+                results = await loop.run_in_executor(
+                    self.executor, self.pipeline.process_batch, texts
+                )
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            now = time.perf_counter()
+            self.batch_sizes.record(len(batch))
+            for (_, future, queued_at), result in zip(batch, results):
+                self.latency.record((now - queued_at) * 1000)
+                if not future.done():
+                    future.set_result(result)
+
+    def metrics(self):
+        return {
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "rejected": self.rejected,
+            "latency": self.latency.to_dict(),
+            "batch_size": self.batch_sizes.to_dict(),
+        }
+
+
+# ---------------- HTTP ----------------
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error",
+               503: "Service Unavailable"}
+
+
+async def _write_response(writer, status, payload):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    headers = (
+        f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+    )
+    if status == 503:
+        headers += "Retry-After: 1\r\n"
+    writer.write((headers + "\r\n").encode("latin-1") + body)
+    await writer.drain()
+
+
+async def _handle_request(batcher, method, path, body):
+    if method == "GET" and path == "/metrics":
+        return 200, batcher.metrics()
+
+    if method != "POST" or path != "/process":
+        return 404, {"error": "not found"}
+
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        return 400, {"error": "invalid JSON"}
+
+    if not isinstance(payload, dict):
+        return 400, {"error": 'expected a JSON object with "text" or "texts"'}
+    if "texts" in payload:
+        texts = payload["texts"]
+        if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+            return 400, {"error": '"texts" must be a list of strings'}
+    elif not isinstance(payload.get("text"), str):
+        return 400, {"error": '"text" must be a string'}
+
+    try:
+        if "texts" in payload:
+            results = await asyncio.gather(*(batcher.submit(t) for t in payload["texts"]))
+            return 200, {"results": list(results)}
+        return 200, await batcher.submit(payload["text"])
+    except QueueFull:
+        return 503, {"error": "queue full, retry later"}
+    except Exception as e:
+        return 500, {"error": f"{e.__class__.__name__}: {e}"}
+
+
+def make_handler(batcher):
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = await _handle_request(batcher, method, path, body)
+                await _write_response(writer, status, payload)
+
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    return handle
+
+
+async def serve(pipeline, host="127.0.0.1", port=8080, unix_path=None, **batcher_kwargs):
+    batcher = MicroBatcher(pipeline, **batcher_kwargs)
+    batcher.start()
+
+    if unix_path:
+        server = await asyncio.start_unix_server(make_handler(batcher), path=unix_path)
+        print(f"Serving on unix:{unix_path}")
+    else:
+        server = await asyncio.start_server(make_handler(batcher), host, port)
+        print(f"Serving on http://{host}:{port}")
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await batcher.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-batching text routing service")
+    parser.add_argument("--model", help="path to lid.176.bin")
+    parser.add_argument("--fast-model", help="path to lid.176.ftz (enables the cascade LID)")
+    parser.add_argument("--cascade", action="store_true", help="script -> fastText cascade LID")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--unix", help="serve on a Unix socket instead of TCP")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--max-delay-ms", type=float, default=5.0)
+    parser.add_argument("--max-queue", type=int, default=10000)
+    args = parser.parse_args()
+
+    pipeline = ProductionPipeline(
+        lid_model_path=args.model,
+        lid_fast_model_path=args.fast_model,
+        cascade=args.cascade
+    )
+    asyncio.run(serve(
+        pipeline, args.host, args.port, args.unix,
+        max_batch_size=args.batch_size,
+        max_delay_ms=args.max_delay_ms,
+        max_queue=args.max_queue,
+    ))
+
+
+if __name__ == "__main__":
+    main()
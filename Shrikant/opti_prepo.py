@@ -1,115 +1,98 @@
+"""
+Raw vs preprocessed Whisper WER on a CSV of (audio_file, transcript).
 
-!pip install -q torchaudio librosa pyloudnorm noisereduce jiwer faster-whisper pydub soundfile torch
-!pip install -q git+https://github.com/snakers4/silero-vad.git
+Plain script (no Colab cells): install requirements first, mount Drive
+yourself when running in Colab, then
 
-from google.colab import drive
-drive.mount('/content/drive')
+    python Shrikant/opti_prepo.py [csv] [audio_dir]
 
-AUDIO_DIR = "/content/drive/MyDrive/GGST/ml_test_dataset/audio+transcripts"   # folder with audio files
-CSV_PATH  = "/content/drive/MyDrive/GGST/malya.csv"  # CSV with audio_file, transcript
-PRE_DIR   = "/content/drive/MyDrive/preprocessed_ml"
+The run is done by Tharun/experiment.py: the CSV is streamed, audio is
+decoded once per file on background threads and shared by the variants,
+and Whisper transcribes one variant while the next files are prepared.
 
-import os
-os.makedirs(PRE_DIR, exist_ok=True)
+Scores: the notebook printed the mean of per-file jiwer.wer on the raw
+text. The run now reports corpus WER (errors over all reference words)
+plus that per-file mean ("file WER"). NORMALIZER = "none" keeps the text
+as written, so numbers stay comparable with earlier runs; "language"
+lowercases and drops punctuation but keeps the Malayalam vowel signs.
+"""
 
 import os
-import torch
-import torchaudio
-import librosa
-import numpy as np
-import pyloudnorm as pyln
-import noisereduce as nr
-from jiwer import wer
-from faster_whisper import WhisperModel
-from pydub import AudioSegment
-import pandas as pd
-
-vad_model, vad_utils = torch.hub.load(
-    'snakers4/silero-vad',
-    'silero_vad',
-    trust_repo=True
-)
-
-(get_speech_timestamps,
- save_audio,
- _, _, collect_chunks) = vad_utils
-
-TARGET_SR = 16000
-TARGET_LOUDNESS = -20.0
-
-import soundfile as sf
-
-def preprocess_audio(in_path, out_path):
-    y, sr = librosa.load(in_path, sr=None, mono=True)
-
-    if sr != TARGET_SR:
-        y = librosa.resample(y=y, orig_sr=sr, target_sr=TARGET_SR)
-        sr = TARGET_SR
-
-    meter = pyln.Meter(sr)
-    loudness = meter.integrated_loudness(y)
-    y = pyln.normalize.loudness(y, loudness, TARGET_LOUDNESS)
-
-    wav = torch.tensor(y).float()
-    speech_ts = get_speech_timestamps(wav, vad_model, sampling_rate=sr)
-
-    if len(speech_ts) == 0:
-        return None
-
-    y_vad = collect_chunks(speech_ts, wav).numpy()
-
-    noise = y[:int(0.5 * sr)]
-    snr = 10 * np.log10((np.mean(y_vad**2) + 1e-9) /
-                        (np.mean(noise**2) + 1e-9))
+import sys
 
-    if snr < 25:
-        y_vad = nr.reduce_noise(y=y_vad, sr=sr)
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(REPO_DIR, "Tharun"))
 
-    sf.write(out_path, y_vad, sr)
-    return out_path
+from experiment import run_experiment
 
-df = pd.read_csv(CSV_PATH, encoding='latin1')
-df = df.dropna(subset=["audio_file", "transcript"])
-df = df.head(15)
+# =======================
+# CONFIGURATION
+# =======================
 
-model = WhisperModel(
-    "small",
-    device="cuda",
-    compute_type="int8"
-)
+DRIVE_DIR = "/content/drive/MyDrive/GGST"
 
-def whisper_asr(audio_path):
-    segments, _ = model.transcribe(audio_path, language="ml")
-    return " ".join([s.text.strip() for s in segments])
+AUDIO_DIR = f"{DRIVE_DIR}/ml_test_dataset/audio+transcripts"   # folder with audio files
+CSV_PATH = f"{DRIVE_DIR}/malya.csv"                             # CSV with audio_file, transcript
+CSV_ENCODING = "latin1"
+PRE_DIR = "/content/drive/MyDrive/preprocessed_ml"              # preprocessed audio, None to skip writing
+RESULTS_DIR = f"{DRIVE_DIR}/results/malya"
 
-!pip install torchcodec
-
-raw_wers = []
-pre_wers = []
-
-for _, row in df.iterrows():
-    audio_path = os.path.join(AUDIO_DIR, row["audio_file"])
-    raw_gt = row["transcript"]
-
-    if not os.path.exists(audio_path):
-        continue
-
-    # RAW WER (CSV transcript vs itself = baseline 0, kept for consistency)
-    raw_pred = whisper_asr(audio_path)
-    raw_wers.append(wer(raw_gt, raw_pred))
-
-
-    # PREPROCESS → WHISPER
-    pre_audio = os.path.join(PRE_DIR, row["audio_file"])
-    processed = preprocess_audio(audio_path, pre_audio)
-
-    if processed:
-        pre_pred = whisper_asr(processed)
-        pre_wers.append(wer(raw_gt, pre_pred))
-
-raw_avg_wer = np.mean(raw_wers)
-pre_avg_wer = np.mean(pre_wers)
-
-print("FILES USED:", len(pre_wers))
-print("RAW WER:", round(raw_avg_wer, 4))
-print("PREPROCESSED WER:", round(pre_avg_wer, 4))
+TARGET_LOUDNESS = -20.0
+VAD_PARAMS = {"threshold": 0.5, "min_speech_duration_ms": 250, "min_silence_duration_ms": 100}
+SNR_THRESHOLD_DB = 25
+
+MODEL_SIZE = "small"
+LANGUAGE = "ml"
+DEVICE = "cuda"
+COMPUTE_TYPE = "int8"
+NORMALIZER = "none"       # "none" or "language", see the docstring
+
+MAX_FILES = 15            # None = whole CSV
+
+# Every variant is transcribed and scored against the same references;
+# the first one is the baseline of the paired comparison
+VARIANTS = [
+    {"name": "raw"},
+    {"name": "preprocessed", "target_lufs": TARGET_LOUDNESS, "vad_params": VAD_PARAMS,
+     "denoise_below_snr_db": SNR_THRESHOLD_DB},
+    # e.g. another SNR gate (shares loudness + VAD with "preprocessed"):
+    # {"name": "snr15", "target_lufs": TARGET_LOUDNESS, "vad_params": VAD_PARAMS, "denoise_below_snr_db": 15},
+]
+
+# Transcripts are cached by audio content + variant + Whisper settings,
+# so re-running with one variant changed only transcribes that variant
+CACHE_DIR = f"{DRIVE_DIR}/stage_cache"
+CACHE_MAX_GB = 20
+
+DECODE_THREADS = 2
+PREFETCH = 8
+
+# =======================
+
+
+def main():
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else CSV_PATH
+    audio_dir = sys.argv[2] if len(sys.argv) > 2 else AUDIO_DIR
+
+    settings = {
+        "name": "opti_prepo",
+        "manifest": csv_path,
+        "encoding": CSV_ENCODING,
+        "audio_dir": audio_dir,
+        "language": LANGUAGE,
+        "model": MODEL_SIZE,
+        "device": DEVICE,
+        "compute_type": COMPUTE_TYPE,
+        "normalizer": NORMALIZER,
+        "variants": VARIANTS,
+        "max_files": MAX_FILES,
+        "results_dir": RESULTS_DIR,
+        "save_audio_dir": PRE_DIR,
+        "cache_dir": CACHE_DIR,
+        "cache_max_gb": CACHE_MAX_GB,
+    }
+    run_experiment(settings, decode_threads=DECODE_THREADS, prefetch=PREFETCH)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,19 @@
+import os
 import re
-import unicodedata
+import sys
+
+# Shared normaliser, imported through the Tharun package of the repository
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+if REPO_DIR not in sys.path:
+    sys.path.append(REPO_DIR)
+
+from Tharun.evaluation.normalize_text import get_normalizer
 
 class Stage1BTextValidation:
     def __init__(self, language="hi"):
         self.language = language
         self.typo_map = self._get_typo_map(language)
+        self.normalizer = get_normalizer(language, "stage1b")
     
     def _get_typo_map(self, language):
         maps = {
@@ -18,8 +27,7 @@ class Stage1BTextValidation:
         if not isinstance(text, str):
             return ""
         try:
-            text = re.sub(r"\s+", " ", text.strip())
-            text = unicodedata.normalize("NFKD", text)
+            text = self.normalizer.normalize(text)
             words = text.split()
             corrected_words = []
             for word in words:
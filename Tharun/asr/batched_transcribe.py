@@ -0,0 +1,123 @@
+"""
+Batched Whisper decoding for many short clips.
+
+model.transcribe() handles one file per call, and a 3-8 s clip still
+costs a full 30 s encoder window plus per-call overhead. Here clips are
+stacked into batches of 30 s windows: one encoder pass and one beam
+search call per batch, each clip with its own language token.
+
+- clips longer than one window fall back to model.transcribe()
+- clips without a language hint get it from one batched
+  language-detection call on the same encoder output
+- decoding is beam search without timestamps or temperature fallback,
+  so text can differ slightly from model.transcribe() on hard clips
+"""
+
+import numpy as np
+
+from asr.model_registry import get_model
+from lazy import LazyModule
+from stage_profiler import profiled
+
+fw_audio = LazyModule("faster_whisper.audio")
+fw_tokenizer = LazyModule("faster_whisper.tokenizer")
+
+
+SAMPLE_RATE = 16000
+
+
+def _load_clip(clip):
+    if isinstance(clip, np.ndarray):
+        return clip.astype(np.float32, copy=False)
+    return fw_audio.decode_audio(clip, sampling_rate=SAMPLE_RATE)
+
+
+def _batch_seconds(model, batch, *args):
+    return sum(len(audio) for _, audio, _ in batch) / SAMPLE_RATE
+
+
+@profiled("asr.decode_batch", _batch_seconds)
+def _decode_batch(model, batch, tokenizers, beam_size):
+    """batch: list of (index, audio, language). Returns {index: (language, text)}"""
+    features = np.stack([fw_audio.pad_or_trim(model.feature_extractor(audio)) for _, audio, _ in batch])
+    encoder_output = model.encode(features)
+
+    languages = [language for _, _, language in batch]
+    if model.model.is_multilingual and any(lang is None for lang in languages):
+        detected = model.model.detect_language(encoder_output)
+        # Tokens look like "<|hi|>"; results are sorted by probability
+        languages = [lang or probs[0][0][2:-2] for lang, probs in zip(languages, detected)]
+
+    prompts = []
+    for language in languages:
+        if language not in tokenizers:
+            tokenizers[language] = fw_tokenizer.Tokenizer(
+                model.hf_tokenizer,
+                model.model.is_multilingual,
+                task="transcribe",
+                language=language if model.model.is_multilingual else None,
+            )
+        tokenizer = tokenizers[language]
+        prompts.append(list(tokenizer.sot_sequence) + [tokenizer.no_timestamps])
+
+    results = model.model.generate(
+        encoder_output,
+        prompts,
+        beam_size=beam_size,
+        max_length=model.max_length,
+        suppress_blank=True,
+        suppress_tokens=[-1],
+    )
+
+    return {
+        index: (language, tokenizers[language].decode(result.sequences_ids[0]).strip())
+        for (index, _, _), language, result in zip(batch, languages, results)
+    }
+
+
+@profiled("asr.transcribe_batch")
+def transcribe_batch(clips, languages=None, batch_size=16, model_size="small",
+                     device="cpu", compute_type="default", beam_size=5):
+    """
+    Transcribe many short clips.
+
+    clips: list of wav paths or 16 kHz float arrays (e.g. VAD-trimmed)
+    languages: optional list of language codes ("hi", "ml", ...) or None per clip
+
+    Returns one dict per clip, in input order:
+    {"clip": index, "source": path or None, "language": ..., "text": ...}
+    """
+    model = get_model(model_size, device=device, compute_type=compute_type)
+    languages = languages or [None] * len(clips)
+    window = model.feature_extractor.n_samples
+
+    results = {}
+    tokenizers = {}
+    pending = []
+
+    for index, (clip, language) in enumerate(zip(clips, languages)):
+        audio = _load_clip(clip)
+
+        if len(audio) > window:
+            segments, info = model.transcribe(audio, language=language, beam_size=beam_size)
+            text = " ".join(segment.text.strip() for segment in segments)
+            results[index] = (info.language, text)
+            continue
+
+        pending.append((index, audio, language))
+        if len(pending) == batch_size:
+            results.update(_decode_batch(model, pending, tokenizers, beam_size))
+            pending = []
+
+    if pending:
+        results.update(_decode_batch(model, pending, tokenizers, beam_size))
+
+    return [
+        {
+            "clip": index,
+            "source": None if isinstance(clip, np.ndarray) else clip,
+            "language": results[index][0],
+            "text": results[index][1],
+        }
+        for index, clip in enumerate(clips)
+    ]
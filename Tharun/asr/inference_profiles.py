@@ -0,0 +1,249 @@
+"""
+Named Whisper inference profiles and a calibration command to choose one.
+
+A profile fixes how faster-whisper runs:
+
+- device / compute_type: "int8", "int8_float32", "float32", ... (int8
+  weights are about 4x smaller and usually 2-3x faster on CPU)
+- cpu_threads / num_workers: ctranslate2 threads per model and parallel
+  transcribe() calls per model (None = all cores split between workers,
+  0 = library default; parallel_transcribe always splits the cores
+  between its processes unless the profile fixes a count)
+- beam_size / vad_filter: decoding options passed to transcribe()
+
+get_profile() resolves which one to use: an explicit name, then the
+ASR_PROFILE environment variable, then the profile chosen by the last
+calibration (CALIBRATION_FILE), then "default" (faster-whisper defaults,
+what the pipeline used before profiles existed).
+
+    profile = get_profile()
+    model = load_model("small", profile)
+    segments, info = model.transcribe(path, **transcribe_options(profile))
+
+Calibration transcribes a sample of clips with every profile, measures
+speed and WER (evaluation.calculate_metrics) and keeps the fastest
+profile whose WER is within a tolerance of the most accurate one:
+
+    python -m asr.inference_profiles calibrate data/clean_audio/Hindi \\
+        data/transcripts/Hindi/reference.txt --clips 20 --tolerance 0.01 --save
+    python -m asr.inference_profiles list
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from asr.model_registry import clear, get_model
+
+ENV_VAR = "ASR_PROFILE"
+CALIBRATION_FILE = os.environ.get("ASR_PROFILE_FILE", "models/asr_profile.json")
+DEFAULT_PROFILE = "default"
+
+PROFILES = {
+    # faster-whisper defaults (the model's stored compute type, beam 5)
+    "default": {"device": "cpu", "compute_type": "default", "cpu_threads": 0, "num_workers": 1,
+                "beam_size": 5, "vad_filter": False},
+    "cpu_float32": {"device": "cpu", "compute_type": "float32", "cpu_threads": None, "num_workers": 1,
+                    "beam_size": 5, "vad_filter": False},
+    "cpu_int8_float32": {"device": "cpu", "compute_type": "int8_float32", "cpu_threads": None, "num_workers": 1,
+                         "beam_size": 5, "vad_filter": False},
+    "cpu_int8": {"device": "cpu", "compute_type": "int8", "cpu_threads": None, "num_workers": 1,
+                 "beam_size": 5, "vad_filter": False},
+    # Greedy decoding: fastest, most likely to lose accuracy
+    "cpu_int8_greedy": {"device": "cpu", "compute_type": "int8", "cpu_threads": None, "num_workers": 1,
+                        "beam_size": 1, "vad_filter": False},
+    # Silero inside faster-whisper skips silence (raw, unsegmented audio)
+    "cpu_int8_vad": {"device": "cpu", "compute_type": "int8", "cpu_threads": None, "num_workers": 1,
+                     "beam_size": 5, "vad_filter": True},
+    # Two transcribe() calls at once on one model, half the threads each
+    "cpu_int8_2workers": {"device": "cpu", "compute_type": "int8", "cpu_threads": None, "num_workers": 2,
+                          "beam_size": 5, "vad_filter": False},
+    # GPU (what opti_prepo.py used in Colab)
+    "cuda_int8": {"device": "cuda", "compute_type": "int8", "cpu_threads": 0, "num_workers": 1,
+                  "beam_size": 5, "vad_filter": False},
+}
+
+# transcribe() options whose faster-whisper defaults the profiles may change
+TRANSCRIBE_DEFAULTS = {"beam_size": 5, "vad_filter": False}
+
+
+@lru_cache(maxsize=None)
+def _calibrated(path):
+    """Profile name saved by the last calibration, or None"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["profile"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def get_profile(name=None):
+    """Profile dict (with its "name") for name, ASR_PROFILE, the calibrated choice or the default"""
+    name = name or os.environ.get(ENV_VAR) or _calibrated(CALIBRATION_FILE) or DEFAULT_PROFILE
+    if name not in PROFILES:
+        raise KeyError(f"unknown ASR profile {name!r} (known: {', '.join(PROFILES)})")
+    return dict(PROFILES[name], name=name)
+
+
+def model_options(profile, cpu_threads=None):
+    """get_model() keyword arguments; cpu_threads overrides the profile (e.g. per worker process)"""
+    threads = profile["cpu_threads"] if cpu_threads is None else cpu_threads
+    if threads is None:
+        threads = max(1, (os.cpu_count() or 1) // profile["num_workers"])
+    options = {"device": profile["device"], "compute_type": profile["compute_type"]}
+    if threads:
+        options["cpu_threads"] = threads
+    if profile["num_workers"] > 1:
+        options["num_workers"] = profile["num_workers"]
+    return options
+
+
+def load_model(size, profile, cpu_threads=None):
+    return get_model(size, **model_options(profile, cpu_threads))
+
+
+def transcribe_options(profile):
+    """transcribe() keyword arguments of the profile"""
+    return {k: profile[k] for k in TRANSCRIBE_DEFAULTS}
+
+
+def cache_params(size, profile):
+    """Stage cache parameters of a transcript; default decoding options are left out so older keys stay valid"""
+    params = {"model": size, "device": profile["device"], "compute_type": profile["compute_type"]}
+    params.update({k: v for k, v in transcribe_options(profile).items() if v != TRANSCRIBE_DEFAULTS[k]})
+    return params
+
+
+# ---------------- calibration ----------------
+
+def sample_clips(clip_dir, count):
+    """count WAV files spread evenly over the sorted directory"""
+    files = sorted(f for f in os.listdir(clip_dir) if f.lower().endswith(".wav"))
+    step = max(1, len(files) // max(count, 1))
+    return [os.path.join(clip_dir, f) for f in files[::step][:count]]
+
+
+def measure(profile, clips, references, model_size="small", language=None):
+    """
+    Transcribe clips with one profile (num_workers clips at a time).
+    Returns load time, wall time, audio seconds and mean WER / CER.
+    """
+    from evaluation.calculate_metrics import calculate_metrics
+
+    clear()
+    start = time.perf_counter()
+    model = load_model(model_size, profile)
+    load_s = time.perf_counter() - start
+
+    options = transcribe_options(profile)
+
+    def run(path):
+        segments, info = model.transcribe(path, language=language, **options)
+        return " ".join(segment.text.strip() for segment in segments), info.duration
+
+    # Warm-up so one-off allocation is not billed to the first clip
+    run(clips[0])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(profile["num_workers"]) as pool:
+        outputs = list(pool.map(run, clips))
+    wall_s = time.perf_counter() - start
+
+    audio_s = sum(duration for _, duration in outputs)
+    scores = [calculate_metrics(ref, text) for ref, (text, _) in zip(references, outputs)]
+    return {
+        "profile": profile["name"],
+        "load_s": round(load_s, 2),
+        "wall_s": round(wall_s, 2),
+        "audio_s": round(audio_s, 2),
+        "rtf": round(wall_s / max(audio_s, 1e-9), 4),
+        "wer": round(sum(s[0] for s in scores) / len(scores), 4),
+        "cer": round(sum(s[1] for s in scores) / len(scores), 4),
+    }
+
+
+def choose(results, tolerance):
+    """Fastest result whose WER is within tolerance (absolute) of the best WER"""
+    best_wer = min(r["wer"] for r in results)
+    eligible = [r for r in results if r["wer"] <= best_wer + tolerance]
+    return min(eligible, key=lambda r: r["rtf"])
+
+
+def calibrate(clip_dir, reference_file, profiles=None, clips=20, tolerance=0.01,
+              model_size="small", language=None):
+    """Measure each profile on a sample of clips; returns (results, chosen result)"""
+    from evaluation.load_reference import ReferenceStore
+
+    paths = sample_clips(clip_dir, clips)
+    if not paths:
+        raise ValueError(f"no .wav clips in {clip_dir}")
+    with ReferenceStore(reference_file) as store:
+        references = [store.get(os.path.basename(p)) for p in paths]
+
+    names = profiles or [n for n, p in PROFILES.items() if p["device"] == "cpu"]
+    results = []
+    for name in names:
+        print(f"⏱️ {name} ...")
+        try:
+            results.append(measure(get_profile(name), paths, references, model_size, language))
+        except Exception as e:
+            print(f"❌ {name}: {e}")
+    if not results:
+        raise RuntimeError("no profile could be measured")
+    return results, choose(results, tolerance)
+
+
+def print_results(results, chosen, tolerance):
+    print(f"\n{'profile':<20} {'load s':>7} {'RTF':>7} {'x real':>7} {'WER':>7} {'CER':>7}")
+    for r in sorted(results, key=lambda r: r["rtf"]):
+        mark = "  <- chosen" if r is chosen else ""
+        print(f"{r['profile']:<20} {r['load_s']:>7.2f} {r['rtf']:>7.3f} {1 / max(r['rtf'], 1e-9):>7.1f} "
+              f"{r['wer']:>7.4f} {r['cer']:>7.4f}{mark}")
+    print(f"\n✅ Fastest within {tolerance:.3f} WER of the best: {chosen['profile']}")
+
+
+def save_choice(chosen, results, path=CALIBRATION_FILE, **details):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(dict(profile=chosen["profile"], results=results, **details), f, indent=2)
+    _calibrated.cache_clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Whisper inference profiles")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="show the profiles and the one in use")
+
+    cal = sub.add_parser("calibrate", help="time every profile and pick the fastest within a WER tolerance")
+    cal.add_argument("clip_dir", help="folder of 16 kHz WAV clips")
+    cal.add_argument("reference_file", help=".txt / .tsv / .csv references (see evaluation/load_reference.py)")
+    cal.add_argument("--clips", type=int, default=20)
+    cal.add_argument("--tolerance", type=float, default=0.01, help="absolute WER above the best profile")
+    cal.add_argument("--profiles", help="comma separated (default: every CPU profile)")
+    cal.add_argument("--model", default="small")
+    cal.add_argument("--language", help="Whisper language code, e.g. hi")
+    cal.add_argument("--save", action="store_true", help=f"make the choice the default ({CALIBRATION_FILE})")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        current = get_profile()["name"]
+        for name, profile in PROFILES.items():
+            mark = "*" if name == current else " "
+            print(f"{mark} {name:<20} " + " ".join(f"{k}={v}" for k, v in profile.items()))
+        return
+
+    profiles = args.profiles.split(",") if args.profiles else None
+    results, chosen = calibrate(args.clip_dir, args.reference_file, profiles, args.clips,
+                                args.tolerance, args.model, args.language)
+    print_results(results, chosen, args.tolerance)
+    if args.save:
+        save_choice(chosen, results, model=args.model, language=args.language,
+                    clips=args.clips, tolerance=args.tolerance)
+        print("💾 Saved to", CALIBRATION_FILE)
+
+
+if __name__ == "__main__":
+    main()
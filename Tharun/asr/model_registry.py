@@ -0,0 +1,98 @@
+"""
+Shared faster-whisper model registry.
+
+- Models load lazily on first use and are shared by every caller in
+  the process, keyed by (size, device, compute_type, extra options)
+- Thread-safe: concurrent first calls for the same key load it once
+- Least recently used models are evicted when more than MAX_MODELS are
+  loaded or the estimated memory goes over MEMORY_BUDGET_MB
+"""
+
+import threading
+from collections import OrderedDict
+
+from stage_profiler import profile_stage
+
+MAX_MODELS = 2
+MEMORY_BUDGET_MB = None      # e.g. 4000; None = only MAX_MODELS applies
+
+# Rough float32 footprint per model size (MB); int8 is about a quarter
+MODEL_SIZE_MB = {
+    "tiny": 150, "base": 290, "small": 970,
+    "medium": 3000, "large-v2": 6200, "large-v3": 6200,
+}
+
+_models = OrderedDict()          # key -> model, most recently used last
+_loading_locks = {}
+_lock = threading.Lock()
+
+
+def _make_key(size, device, compute_type, options):
+    return (size, device, compute_type, tuple(sorted(options.items())))
+
+
+def estimate_mb(key):
+    size, _, compute_type, _ = key
+    mb = MODEL_SIZE_MB.get(size, MODEL_SIZE_MB["large-v3"])
+    if compute_type.startswith("int8"):
+        mb //= 4
+    elif "float16" in compute_type:
+        mb //= 2
+    return mb
+
+
+def _evict():
+    """Drop least recently used models until within limits (caller holds _lock)"""
+    while len(_models) > 1:
+        over_count = len(_models) > MAX_MODELS
+        over_memory = (
+            MEMORY_BUDGET_MB is not None
+            and sum(estimate_mb(k) for k in _models) > MEMORY_BUDGET_MB
+        )
+        if not (over_count or over_memory):
+            break
+        _models.popitem(last=False)
+
+
+def get_model(size="small", device="cpu", compute_type="default", **options):
+    """
+    Return a shared WhisperModel, loading it on first use.
+    options are passed to WhisperModel (e.g. cpu_threads, num_workers).
+    """
+    key = _make_key(size, device, compute_type, options)
+
+    with _lock:
+        if key in _models:
+            _models.move_to_end(key)
+            return _models[key]
+        key_lock = _loading_locks.setdefault(key, threading.Lock())
+
+    # Load outside the registry lock so other keys are not blocked
+    with key_lock:
+        with _lock:
+            if key in _models:
+                _models.move_to_end(key)
+                return _models[key]
+
+        from faster_whisper import WhisperModel
+        with profile_stage("asr.load_model", model=size, compute_type=compute_type):
+            model = WhisperModel(size, device=device, compute_type=compute_type, **options)
+
+        with _lock:
+            _models[key] = model
+            _evict()
+            _loading_locks.pop(key, None)
+
+    return model
+
+
+def loaded_models():
+    """Keys of the models currently held, least recently used first"""
+    with _lock:
+        return list(_models)
+
+
+def clear():
+    """Release every cached model"""
+    with _lock:
+        _models.clear()
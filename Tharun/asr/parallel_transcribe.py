@@ -0,0 +1,218 @@
+"""
+Parallel, resumable hypothesis generation.
+
+- Work is sharded by file across N worker processes
+- Each worker loads its own WhisperModel with cpu_threads = cores / N,
+  using an inference profile (compute type, beam size, VAD filter; see
+  inference_profiles.py)
+- Progress is checkpointed to a JSON-lines manifest, so a killed run
+  picks up where it stopped
+- Hypotheses are written atomically (see save_hypothesis.py)
+- Optionally, transcripts are cached by audio content + model settings
+  (see audio_pipeline/stage_cache.py), so unchanged audio is never
+  transcribed twice even when the manifest is deleted
+- Audio comes from WAV files or, with store_dir, from a sharded audio
+  store (see audio_pipeline/audio_store.py) that each worker memory-maps
+"""
+
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import time
+from multiprocessing.pool import ThreadPool
+
+from asr.inference_profiles import cache_params, get_profile, load_model, transcribe_options
+from asr.save_hypothesis import save_hypothesis_text
+from audio_pipeline.audio_store import AudioStore
+from audio_pipeline.stage_cache import StageCache
+from stage_profiler import profile_stage
+
+# Model, settings and cache owned by the current worker process
+_worker_model = None
+_worker_params = None
+_worker_options = None
+_worker_cache = None
+_worker_store = None
+
+
+def load_manifest(manifest_path):
+    """
+    Return the set of file names whose latest manifest entry is "done"
+    """
+    status = {}
+    if not os.path.exists(manifest_path):
+        return set()
+
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Last line may be torn if the run was killed mid-write
+                continue
+            status[entry["file"]] = entry["status"]
+
+    return {name for name, s in status.items() if s == "done"}
+
+
+def append_manifest(manifest_path, entry):
+    """Append one entry and flush it to disk"""
+    with open(manifest_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def threads_per_worker(num_workers):
+    """Split the machine's cores evenly between workers"""
+    return max(1, (os.cpu_count() or 1) // num_workers)
+
+
+def _init_worker(model_size, profile, cpu_threads, cache_dir=None, store_dir=None):
+    global _worker_model, _worker_params, _worker_options, _worker_cache, _worker_store
+
+    _worker_params = cache_params(model_size, profile)
+    _worker_options = transcribe_options(profile)
+    if cache_dir:
+        _worker_cache = StageCache(cache_dir)
+    if store_dir:
+        _worker_store = AudioStore(store_dir)
+
+    _worker_model = load_model(model_size, profile, cpu_threads)
+
+
+def _transcribe_text(audio, name):
+    """audio: WAV path or 16 kHz float32 samples"""
+    with profile_stage("asr.transcribe", file=name) as stage:
+        segments, info = _worker_model.transcribe(audio, **_worker_options)
+        text = " ".join([segment.text for segment in segments])
+        stage["audio_s"] = info.duration
+    return text
+
+
+def _load_audio(source):
+    """(audio for Whisper, cache key or None) of a WAV path or store id"""
+    if _worker_store is None:
+        key = _worker_cache.audio_key(source) if _worker_cache is not None else None
+        return source, key
+
+    audio, sr = _worker_store.get(source, as_float=True)
+    if sr != 16000:
+        raise ValueError(f"{source}: stored at {sr} Hz, Whisper needs 16000 Hz")
+    key = hashlib.sha256(audio.data).hexdigest() if _worker_cache is not None else None
+    return audio, key
+
+
+def _transcribe_one(job):
+    source, name, hyp_txt_path = job
+    start = time.time()
+
+    try:
+        audio, key = _load_audio(source)
+        if _worker_cache is not None:
+            _, text = _worker_cache.run(
+                key, "whisper", _worker_params,
+                _transcribe_text, audio, name
+            )
+        else:
+            text = _transcribe_text(audio, name)
+        save_hypothesis_text(text, hyp_txt_path)
+        return {
+            "file": name,
+            "status": "done",
+            "hypothesis": hyp_txt_path,
+            "seconds": round(time.time() - start, 3)
+        }
+    except Exception as e:
+        return {
+            "file": name,
+            "status": "failed",
+            "error": str(e),
+            "seconds": round(time.time() - start, 3)
+        }
+
+
+def run_transcription(wav_paths, hypothesis_dir, manifest_path,
+                      num_workers=1, model_size="small",
+                      device=None, compute_type=None, cache_dir=None,
+                      store_dir=None, profile=None):
+    """
+    Transcribe wav_paths into hypothesis_dir, skipping files the
+    manifest already marks as done. Returns (done, failed) counts
+    for this run.
+
+    profile: inference profile name (None = ASR_PROFILE / calibrated /
+    default); device and compute_type override the profile's.
+
+    With store_dir, wav_paths are utterance ids in that audio store;
+    they are recorded in the manifest as "<id>.wav" like WAV files.
+    """
+    os.makedirs(hypothesis_dir, exist_ok=True)
+    completed = load_manifest(manifest_path)
+
+    jobs = []
+    for source in wav_paths:
+        wav_file = source + ".wav" if store_dir else os.path.basename(source)
+        if wav_file in completed:
+            continue
+        hyp_txt_path = os.path.join(
+            hypothesis_dir,
+            os.path.splitext(wav_file)[0] + ".txt"
+        )
+        jobs.append((source, wav_file, hyp_txt_path))
+
+    print(f"📋 Manifest: {len(completed)} done, {len(jobs)} pending")
+    if not jobs:
+        return 0, 0
+
+    profile = get_profile(profile)
+    profile.update({k: v for k, v in (("device", device), ("compute_type", compute_type)) if v})
+    print(f"⚙️ ASR profile: {profile['name']} ({profile['compute_type']}, beam {profile['beam_size']})")
+
+    num_workers = max(1, min(num_workers, len(jobs)))
+    # A fixed cpu_threads in the profile wins over the even split
+    cpu_threads = profile["cpu_threads"] or threads_per_worker(num_workers * profile["num_workers"])
+    init_args = (model_size, profile, cpu_threads, cache_dir, store_dir)
+
+    done = failed = 0
+
+    if num_workers == 1 and profile["num_workers"] > 1:
+        # One model serving several transcribe() calls at once
+        _init_worker(*init_args)
+        pool = ThreadPool(profile["num_workers"])
+        results = pool.imap_unordered(_transcribe_one, jobs)
+    elif num_workers == 1:
+        _init_worker(*init_args)
+        results = map(_transcribe_one, jobs)
+        pool = None
+    else:
+        # spawn: workers must not inherit the parent's torch/ctranslate2 state
+        pool = mp.get_context("spawn").Pool(
+            num_workers,
+            initializer=_init_worker,
+            initargs=init_args
+        )
+        results = pool.imap_unordered(_transcribe_one, jobs)
+
+    try:
+        for entry in results:
+            # Only the parent writes the manifest, so no locking is needed
+            append_manifest(manifest_path, entry)
+
+            if entry["status"] == "done":
+                done += 1
+                print(f"📝 {entry['file']} ({entry['seconds']}s)")
+            else:
+                failed += 1
+                print(f"❌ {entry['file']}: {entry['error']}")
+    finally:
+        if pool is not None:
+            # All results are consumed (or we are aborting), so stop workers now
+            pool.terminate()
+            pool.join()
+
+    return done, failed
@@ -1,7 +1,17 @@
 import os
 
 def save_hypothesis_text(text, save_path):
+    """
+    Write hypothesis text atomically: the text goes to a temp file
+    in the same folder which then replaces save_path, so a killed
+    run never leaves a half-written hypothesis behind.
+    """
     os.makedirs(os.path.dirname(save_path), exist_ok=True)
 
-    with open(save_path, "w", encoding="utf-8") as f:
+    tmp_path = f"{save_path}.tmp.{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
         f.write(text.strip())
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, save_path)
@@ -0,0 +1,364 @@
+"""
+Streaming (live) ASR with incremental VAD.
+
+PCM frames of any size come in from a generator or a socket; for each
+frame feed() returns the events it produced:
+
+    {"type": "partial", "text": ..., "start_s": ..., "end_s": ..., "latency_s": ...}
+    {"type": "final",   "text": ..., "start_s": ..., "end_s": ..., "latency_s": ..., "rtf": ...}
+
+- Silero VAD (same model and threshold as audio_pipeline/vad.py) runs
+  on every 32 ms window as it arrives, with the hysteresis of
+  get_speech_timestamps (speech above threshold, silence below
+  threshold - 0.15)
+- an utterance ends after endpoint_silence_ms of silence, or when it
+  reaches max_utterance_s (kept under Whisper's 30 s window)
+- while an utterance is open, a greedy partial hypothesis is decoded
+  every partial_interval_s of new audio; the final one uses beam search
+- audio lives in a ring buffer of max_utterance_s + padding, so memory
+  does not grow with the length of the call
+- latency_s is the wall time from the arrival of the newest audio the
+  hypothesis covers to the moment it is emitted
+
+File replay at real-time pace (offline latency test):
+
+    python -m asr.streaming_asr replay call.wav [--language hi] [--speed 1.0]
+
+TCP server (raw 16-bit mono PCM in, JSON lines out; one thread per call):
+
+    python -m asr.streaming_asr serve [--port 9090] [--sample-rate 16000]
+"""
+
+import argparse
+import json
+import socketserver
+import sys
+import time
+
+import numpy as np
+
+from asr.model_registry import get_model
+from audio_pipeline.streaming_preprocess import StreamingResampler
+from audio_pipeline.vad import VAD_PARAMS, new_vad_model
+from stage_profiler import profile_stage
+
+SAMPLE_RATE = 16000
+VAD_WINDOW = 512                 # Silero v5 window at 16 kHz (32 ms)
+SPEECH_PAD_MS = 200              # audio kept before the detected start
+ENDPOINT_SILENCE_MS = 600
+PARTIAL_INTERVAL_S = 1.0
+MAX_UTTERANCE_S = 25.0
+
+
+class RingBuffer:
+    """
+    Fixed-size float32 buffer addressed by absolute sample index.
+    Only the newest `capacity` samples can be read back.
+    """
+
+    def __init__(self, capacity):
+        self.data = np.zeros(capacity, dtype=np.float32)
+        self.capacity = capacity
+        self.end = 0                 # absolute index one past the newest sample
+
+    @property
+    def start(self):
+        return max(0, self.end - self.capacity)
+
+    def write(self, samples):
+        samples = samples[-self.capacity:]
+        pos = self.end % self.capacity
+        first = min(len(samples), self.capacity - pos)
+        self.data[pos:pos + first] = samples[:first]
+        self.data[:len(samples) - first] = samples[first:]
+        self.end += len(samples)
+
+    def read(self, start, stop):
+        """Copy of samples [start, stop), clipped to what is still buffered"""
+        start = max(start, self.start)
+        stop = min(stop, self.end)
+        if stop <= start:
+            return np.zeros(0, dtype=np.float32)
+        a, b = start % self.capacity, stop % self.capacity
+        if a < b:
+            return self.data[a:b].copy()
+        return np.concatenate([self.data[a:], self.data[:b]])
+
+
+def to_float32(pcm):
+    """float32 samples from int16 PCM bytes / arrays or float arrays"""
+    if isinstance(pcm, (bytes, bytearray, memoryview)):
+        pcm = np.frombuffer(pcm, dtype="<i2")
+    pcm = np.asarray(pcm)
+    if pcm.dtype == np.int16:
+        return pcm.astype(np.float32) / 32768
+    return pcm.astype(np.float32, copy=False)
+
+
+class StreamingTranscriber:
+    """One live stream: feed() frames, then flush() at the end of the call"""
+
+    def __init__(self, model_size="small", language=None, sample_rate=SAMPLE_RATE,
+                 device="cpu", compute_type="default", beam_size=5,
+                 threshold=VAD_PARAMS["threshold"], endpoint_silence_ms=ENDPOINT_SILENCE_MS,
+                 partial_interval_s=PARTIAL_INTERVAL_S, max_utterance_s=MAX_UTTERANCE_S,
+                 asr_model=None, vad_model=None):
+        self.model = asr_model or get_model(model_size, device=device, compute_type=compute_type)
+        # Own VAD instance: Silero keeps RNN state between windows
+        self.vad = vad_model or new_vad_model()
+        self.vad.reset_states()
+
+        self.language = language
+        self.beam_size = beam_size
+        self.threshold = threshold
+        self.resampler = StreamingResampler(sample_rate, SAMPLE_RATE) if sample_rate != SAMPLE_RATE else None
+
+        self.pad = SPEECH_PAD_MS * SAMPLE_RATE // 1000
+        self.endpoint_samples = endpoint_silence_ms * SAMPLE_RATE // 1000
+        self.partial_samples = int(partial_interval_s * SAMPLE_RATE)
+        self.max_samples = int(max_utterance_s * SAMPLE_RATE)
+
+        self.ring = RingBuffer(self.max_samples + self.pad + VAD_WINDOW)
+        self.pending = np.zeros(0, dtype=np.float32)   # samples not yet seen by the VAD
+        self.arrivals = []                             # (absolute end sample, wall time) of recent frames
+
+        self.utt_start = None        # absolute sample where the open utterance starts
+        self.speech_end = 0          # end of the last voiced window
+        self.final_end = 0           # end of the last finalised utterance
+        self.last_partial = 0
+
+        self.audio_s = 0.0
+        self.decode_s = 0.0
+        self.counts = {"partial": 0, "final": 0}
+
+    # ---------------- decoding ----------------
+
+    def _arrival(self, sample):
+        """Wall time at which absolute sample `sample` was fed"""
+        for end, wall in self.arrivals:
+            if end >= sample:
+                return wall
+        return time.time()
+
+    def _decode(self, kind, start, stop):
+        audio = self.ring.read(start, stop)
+        began = time.perf_counter()
+        with profile_stage(f"asr.stream_{kind}", len(audio) / SAMPLE_RATE):
+            segments, info = self.model.transcribe(
+                audio,
+                language=self.language,
+                beam_size=self.beam_size if kind == "final" else 1,
+                condition_on_previous_text=False,
+                without_timestamps=True,
+            )
+            text = " ".join(s.text.strip() for s in segments).strip()
+        elapsed = time.perf_counter() - began
+
+        if self.language is None and info.language_probability > 0.5:
+            # Keep the language once it is known; partials then skip detection
+            self.language = info.language
+
+        self.decode_s += elapsed
+        self.counts[kind] += 1
+        event = {
+            "type": kind,
+            "text": text,
+            "start_s": round(start / SAMPLE_RATE, 3),
+            "end_s": round(stop / SAMPLE_RATE, 3),
+            "latency_s": round(time.time() - self._arrival(stop), 3),
+        }
+        if kind == "final":
+            event["rtf"] = round(elapsed / max(len(audio) / SAMPLE_RATE, 1e-6), 3)
+        return event
+
+    def _finish(self, stop):
+        event = self._decode("final", self.utt_start, stop)
+        self.utt_start = None
+        self.final_end = stop
+        self.vad.reset_states()
+        return event
+
+    # ---------------- VAD ----------------
+
+    def _speech_prob(self, window):
+        import torch
+
+        with torch.no_grad():
+            return self.vad(torch.from_numpy(window), SAMPLE_RATE).item()
+
+    def _step(self, window_end, prob, events):
+        """Advance the endpoint state machine by one VAD window"""
+        if self.utt_start is None:
+            if prob >= self.threshold:
+                # Padding never reaches back into audio already finalised
+                self.utt_start = max(self.ring.start, self.final_end, window_end - VAD_WINDOW - self.pad)
+                self.speech_end = window_end
+                self.last_partial = window_end
+            return
+
+        if prob >= self.threshold - 0.15:
+            # Between the two thresholds still counts as speech (hysteresis)
+            self.speech_end = window_end
+
+        if window_end - self.speech_end >= self.endpoint_samples:
+            events.append(self._finish(self.speech_end))
+        elif window_end - self.utt_start >= self.max_samples:
+            events.append(self._finish(window_end))
+        elif window_end - self.last_partial >= self.partial_samples and self.speech_end > self.last_partial:
+            self.last_partial = window_end
+            events.append(self._decode("partial", self.utt_start, window_end))
+
+    # ---------------- public ----------------
+
+    def _consume(self, samples):
+        """Buffer 16 kHz samples and run the VAD over every complete window"""
+        self.ring.write(samples)
+        self.audio_s += len(samples) / SAMPLE_RATE
+        self.arrivals.append((self.ring.end, time.time()))
+        # Only frames inside the ring buffer can still be decoded
+        while len(self.arrivals) > 1 and self.arrivals[0][0] < self.ring.start:
+            self.arrivals.pop(0)
+
+        self.pending = np.concatenate([self.pending, samples])
+        consumed = self.ring.end - len(self.pending)
+        events = []
+        n_windows = len(self.pending) // VAD_WINDOW
+        for i in range(n_windows):
+            window = self.pending[i * VAD_WINDOW:(i + 1) * VAD_WINDOW]
+            window_end = consumed + (i + 1) * VAD_WINDOW
+            self._step(window_end, self._speech_prob(window), events)
+        self.pending = self.pending[n_windows * VAD_WINDOW:]
+        return events
+
+    def feed(self, pcm):
+        """Add a frame (int16 bytes / array or float32 array); returns new events"""
+        samples = to_float32(pcm)
+        if self.resampler is not None:
+            samples = self.resampler.process(samples)
+        return self._consume(samples)
+
+    def flush(self):
+        """End of stream: finalise the open utterance, if any"""
+        events = []
+        if self.resampler is not None:
+            events += self._consume(self.resampler.flush())
+        if self.utt_start is not None:
+            events.append(self._finish(self.ring.end))
+        return events
+
+    def stats(self):
+        return {
+            "audio_s": round(self.audio_s, 3),
+            "decode_s": round(self.decode_s, 3),
+            "rtf": round(self.decode_s / self.audio_s, 3) if self.audio_s else None,
+            "partials": self.counts["partial"],
+            "finals": self.counts["final"],
+        }
+
+
+def transcribe_stream(frames, **kwargs):
+    """Yield events for an iterable of PCM frames, then the end-of-stream events"""
+    transcriber = StreamingTranscriber(**kwargs)
+    for frame in frames:
+        yield from transcriber.feed(frame)
+    yield from transcriber.flush()
+    yield {"type": "stats", **transcriber.stats()}
+
+
+# ---------------- drivers ----------------
+
+def replay_file(path, frame_ms=20, speed=1.0):
+    """
+    Yield (frames of float32 at the file's rate) paced like live audio;
+    speed=0 replays as fast as possible. Returns via StopIteration.
+    """
+    import soundfile as sf
+
+    info = sf.info(path)
+    frame = max(1, int(info.samplerate * frame_ms / 1000))
+    began = time.perf_counter()
+    sent = 0
+    for block in sf.blocks(path, blocksize=frame, dtype="float32", always_2d=True):
+        if speed > 0:
+            due = began + sent / info.samplerate / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        sent += len(block)
+        yield block.mean(axis=1)
+
+
+def socket_frames(sock, frame_bytes=640):
+    """Yield int16 PCM frames read from a socket until it closes"""
+    leftover = b""
+    while True:
+        data = sock.recv(frame_bytes)
+        if not data:
+            break
+        data = leftover + data
+        cut = len(data) - len(data) % 2
+        leftover = data[cut:]
+        if cut:
+            yield data[:cut]
+
+
+def serve(host="127.0.0.1", port=9090, **kwargs):
+    """Raw 16-bit mono PCM per connection in, JSON-lines events out"""
+
+    class Handler(socketserver.BaseRequestHandler):
+        def handle(self):
+            for event in transcribe_stream(socket_frames(self.request), **kwargs):
+                self.request.sendall((json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8"))
+
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    with socketserver.ThreadingTCPServer((host, port), Handler) as server:
+        print(f"🎙️ Streaming ASR on {host}:{port}")
+        server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming ASR")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    replay = sub.add_parser("replay", help="replay a file at real-time pace")
+    replay.add_argument("path")
+    replay.add_argument("--speed", type=float, default=1.0, help="1.0 = real time, 0 = no pacing")
+
+    server = sub.add_parser("serve", help="TCP server for raw PCM streams")
+    server.add_argument("--host", default="127.0.0.1")
+    server.add_argument("--port", type=int, default=9090)
+    server.add_argument("--sample-rate", type=int, default=SAMPLE_RATE)
+
+    for p in (replay, server):
+        p.add_argument("--model", default="small")
+        p.add_argument("--language")
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.host, args.port, model_size=args.model, language=args.language,
+              sample_rate=args.sample_rate)
+        return
+
+    import soundfile as sf
+    sample_rate = sf.info(args.path).samplerate
+    latencies = []
+    for event in transcribe_stream(replay_file(args.path, speed=args.speed),
+                                   model_size=args.model, language=args.language,
+                                   sample_rate=sample_rate):
+        if event["type"] == "stats":
+            print(f"\n⏱️ audio {event['audio_s']}s | decode {event['decode_s']}s | RTF {event['rtf']} "
+                  f"| {event['partials']} partials, {event['finals']} finals")
+        else:
+            if event["type"] == "final":
+                latencies.append(event["latency_s"])
+            mark = "✅" if event["type"] == "final" else "…"
+            print(f"{mark} [{event['start_s']:7.2f}-{event['end_s']:7.2f}] "
+                  f"({event['latency_s']:.2f}s) {event['text']}")
+
+    if latencies:
+        print(f"Final latency: p50 {np.percentile(latencies, 50):.2f}s  p90 {np.percentile(latencies, 90):.2f}s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
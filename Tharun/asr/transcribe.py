@@ -1,9 +1,16 @@
-from faster_whisper import WhisperModel
+from asr.inference_profiles import get_profile, load_model, transcribe_options
+from stage_profiler import profile_stage
 
-# load model once
-model = WhisperModel("small", device="cpu")
+MODEL_SIZE = "small"
+ASR_PROFILE = None   # name in asr/inference_profiles.py; None = ASR_PROFILE env / calibrated / default
 
-def transcribe_audio(wav_path):
-    segments, _ = model.transcribe(wav_path)
-    text = " ".join([segment.text for segment in segments])
+def transcribe_audio(wav_path, profile=ASR_PROFILE):
+    # model is loaded on first call and shared through the registry
+    profile = get_profile(profile)
+    model = load_model(MODEL_SIZE, profile)
+    with profile_stage("asr.transcribe_audio") as stage:
+        segments, info = model.transcribe(wav_path, **transcribe_options(profile))
+        # segments is lazy: decoding happens while joining
+        text = " ".join([segment.text for segment in segments])
+        stage["audio_s"] = info.duration
     return text.strip()
@@ -1,6 +1,10 @@
-from faster_whisper import WhisperModel
+from asr.model_registry import get_model
+from stage_profiler import profile_stage
 
 def transcribe_whisper(audio_path):
-    model = WhisperModel("base", device="cpu")
-    segments, _ = model.transcribe(audio_path)
-    return " ".join(seg.text.strip() for seg in segments)
+    model = get_model("base", device="cpu")
+    with profile_stage("asr.transcribe_whisper") as stage:
+        segments, info = model.transcribe(audio_path)
+        text = " ".join(seg.text.strip() for seg in segments)
+        stage["audio_s"] = info.duration
+    return text
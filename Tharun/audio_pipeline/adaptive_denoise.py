@@ -0,0 +1,398 @@
+"""
+Adaptive noise reduction: denoise only when it is worth it.
+
+noisereduce is the most expensive DSP step and on clean audio it tends to
+hurt WER. Here one STFT is computed per file and used for both:
+
+1. the estimate: SNR of speech frames against the VAD non-speech frames
+   (within the speech band), and how much the noise level moves between
+   those frames (noise flux, dB)
+2. the reduction: the same spectral gates as noisereduce (stationary and
+   non-stationary, same defaults), applied to that STFT and inverted once
+
+The STFT is taken over y with PADDING zeros on each side, as noisereduce
+pads every chunk, so the non-stationary running mean sees the same edges
+and the output follows nr.reduce_noise (which also cuts files longer than
+600000 samples into separately padded chunks; this does not).
+
+Per file, or per chunk_seconds of audio, the mode is
+
+    skip           SNR >= SKIP_ABOVE_SNR_DB (or no speech)
+    stationary     steady noise (flux <= STATIONARY_MAX_FLUX_DB): threshold
+                   from the noise frames' spectrum, no running mean to filter
+    nonstationary  anything else (noisereduce's default gate)
+
+Every decision (SNR, flux, mode, time spent) can be appended to a JSON
+lines log, enabled with enable_log(path) or the DENOISE_LOG environment
+variable (worker processes inherit it). Join it with evaluate.py's
+per-utterance results to see time saved against WER change:
+
+    python -m audio_pipeline.adaptive_denoise denoise_log.jsonl \\
+        [per_utterance.jsonl [baseline_per_utterance.jsonl]]
+"""
+
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from .vad import speech_mask
+from lazy import LazyModule
+from stage_profiler import profiled, samples_seconds
+
+signal = LazyModule("scipy.signal")
+
+# Same analysis as noisereduce.reduce_noise defaults
+N_FFT = 1024
+HOP = N_FFT // 4
+N_STD_THRESH_STATIONARY = 1.5
+TIME_CONSTANT_S = 2.0
+THRESH_N_MULT_NONSTATIONARY = 2
+SIGMOID_SLOPE_NONSTATIONARY = 10
+FREQ_MASK_SMOOTH_HZ = 500
+TIME_MASK_SMOOTH_MS = 50
+PADDING = 30000                   # zeros on each side of the signal
+
+# Decision
+SKIP_ABOVE_SNR_DB = 25.0          # same gate as opti_prepo.py
+STATIONARY_MAX_FLUX_DB = 3.0      # std of noise frame level, dB
+SPEECH_BAND_HZ = (100, 4000)
+MIN_NOISE_FRAMES = 20             # ~0.3 s at 16 kHz; fewer -> use the whole file's noise
+QUIET_PERCENTILE = 10             # no VAD noise frames at all -> quietest 10% of frames
+CHUNK_SECONDS = None              # None = one decision per file
+
+LOG_ENV_VAR = "DENOISE_LOG"
+_log_path = os.environ.get(LOG_ENV_VAR) or None
+
+
+# ---------------- STFT ----------------
+
+def stft(y):
+    _, _, spec = signal.stft(y, nfft=N_FFT, nperseg=N_FFT, noverlap=N_FFT - HOP, padded=False)
+    return spec
+
+
+def istft(spec, length):
+    _, y = signal.istft(spec, nfft=N_FFT, nperseg=N_FFT, noverlap=N_FFT - HOP)
+    out = np.zeros(length, dtype=np.float32)
+    out[:min(length, len(y))] = y[:length]
+    return out
+
+
+def amp_to_db(x, top_db=80.0):
+    x_db = 20 * np.log10(np.abs(x) + np.finfo(np.float64).eps)
+    return np.maximum(x_db, np.max(x_db, axis=-1, keepdims=True) - top_db)
+
+
+def smoothing_filter(sr):
+    """noisereduce's triangular mask smoothing filter (freq x time)"""
+    n_grad_freq = int(FREQ_MASK_SMOOTH_HZ / (sr / (N_FFT / 2)))
+    n_grad_time = int(TIME_MASK_SMOOTH_MS / (HOP / sr * 1000))
+
+    def ramp(n):
+        return np.concatenate([np.linspace(0, 1, n + 1, endpoint=False), np.linspace(1, 0, n + 2)])[1:-1]
+
+    kernel = np.outer(ramp(n_grad_freq), ramp(n_grad_time))
+    return kernel / kernel.sum()
+
+
+# ---------------- estimate ----------------
+
+def frame_labels(n_frames, n_samples, timestamps, offset=0):
+    """
+    (speech, noise) boolean masks over STFT frames. A frame is speech if
+    its centre is inside a segment, noise if its window touches no segment.
+    offset: sample position of the first frame's centre
+    """
+    is_speech = speech_mask(n_samples + 1, timestamps)
+    covered = np.concatenate([[0], np.cumsum(is_speech)])
+
+    centres = offset + np.arange(n_frames) * HOP
+    lo = np.clip(centres - N_FFT // 2, 0, n_samples)
+    hi = np.clip(centres + N_FFT // 2, 0, n_samples)
+
+    speech = is_speech[np.minimum(centres, n_samples)]
+    noise = (covered[hi] - covered[lo]) == 0
+    return speech, noise
+
+
+def band_power(spec, sr):
+    """Power per frame within SPEECH_BAND_HZ"""
+    freqs = np.arange(spec.shape[0]) * sr / N_FFT
+    band = (freqs >= SPEECH_BAND_HZ[0]) & (freqs <= SPEECH_BAND_HZ[1])
+    mag = np.abs(spec[band])
+    return np.einsum("ft,ft->t", mag, mag)
+
+
+def choose_mode(snr_db, flux_db):
+    if snr_db is None or snr_db >= SKIP_ABOVE_SNR_DB:
+        return "skip"
+    if flux_db <= STATIONARY_MAX_FLUX_DB:
+        return "stationary"
+    return "nonstationary"
+
+
+def decide(power, speech, noise, fallback_noise=None):
+    """
+    SNR / noise flux of one stretch of frames and the mode for it.
+    fallback_noise: noise frame powers to use when this stretch has too few.
+    """
+    noise_power = power[noise]
+    source = "vad"
+    if len(noise_power) < MIN_NOISE_FRAMES and fallback_noise is not None and len(fallback_noise):
+        noise_power, source = fallback_noise, "file"
+    speech_power = power[speech]
+
+    if not len(speech_power):
+        return {"mode": "skip", "snr_db": None, "flux_db": None,
+                "noise_frames": int(noise.sum()), "noise_source": "no speech"}
+    if not len(noise_power):
+        # Speech wall to wall: the quietest frames are the best noise guess
+        noise_power = power[power <= np.percentile(power, QUIET_PERCENTILE)]
+        source = "quietest"
+
+    eps = 1e-12
+    snr_db = float(10 * np.log10((speech_power.mean() + eps) / (noise_power.mean() + eps)))
+    flux_db = float(np.std(10 * np.log10(noise_power + eps)))
+    return {"mode": choose_mode(snr_db, flux_db), "snr_db": round(snr_db, 2),
+            "flux_db": round(flux_db, 2), "noise_frames": int(noise.sum()), "noise_source": source}
+
+
+# ---------------- gates ----------------
+
+def stationary_mask(spec, noise_spec):
+    """Binary gate above mean + n_std * std of the noise frames (dB, per bin)"""
+    noise_db = amp_to_db(noise_spec)
+    thresh = noise_db.mean(axis=1) + noise_db.std(axis=1) * N_STD_THRESH_STATIONARY
+    return (amp_to_db(spec) > thresh[:, None]).astype(np.float32)
+
+
+def nonstationary_mask(spec, sr):
+    """Sigmoid gate against a ~TIME_CONSTANT_S running mean of each bin"""
+    mag = np.abs(spec)
+    t_frames = TIME_CONSTANT_S * sr / HOP
+    b = (np.sqrt(1 + 4 * t_frames ** 2) - 1) / (2 * t_frames ** 2)
+    smooth = signal.filtfilt([b], [1, b - 1], mag, axis=-1, padtype=None)
+    above = (mag - smooth) / smooth
+    return 1 / (1 + np.exp(-(above - THRESH_N_MULT_NONSTATIONARY) * SIGMOID_SLOPE_NONSTATIONARY))
+
+
+# ---------------- stage ----------------
+
+def require_vad():
+    """Fail fast when the Silero VAD the estimate relies on cannot be loaded"""
+    import importlib.util
+
+    if importlib.util.find_spec("torch") is None:
+        raise RuntimeError("adaptive denoise needs the Silero VAD (pip install torch silero-vad); "
+                           "set ADAPTIVE_DENOISE = False to run noisereduce on every file instead")
+
+
+def summarize_chunks(chunks):
+    """File-level mode for a list of chunk decisions"""
+    modes = {c["mode"] for c in chunks}
+    return modes.pop() if len(modes) == 1 else "mixed"
+
+
+@profiled("audio.adaptive_denoise", samples_seconds)
+def adaptive_denoise(y, sr, timestamps=None, chunk_seconds=CHUNK_SECONDS, vad_params=None):
+    """
+    Denoise y if, and how, the SNR estimate says so.
+
+    timestamps: Silero speech timestamps of y (samples); None runs the VAD
+    chunk_seconds: decide per chunk of this length instead of per file
+    vad_params: Silero parameters when the VAD is run here (default vad.VAD_PARAMS)
+
+    Returns (audio, decision). audio is y itself when everything is skipped.
+    """
+    start = time.perf_counter()
+    y = np.ascontiguousarray(y, dtype=np.float32)
+
+    if len(y) < N_FFT:
+        speech_s = sum(t["end"] - t["start"] for t in timestamps or []) / sr
+        return y, {"mode": "skip", "audio_s": round(len(y) / sr, 3), "speech_s": round(speech_s, 3),
+                   "snr_db": None, "flux_db": None, "noise_frames": 0, "noise_source": "too short",
+                   "analysis_s": 0.0, "denoise_s": 0.0}
+
+    if timestamps is None:
+        require_vad()
+        from .front_end import speech_timestamps
+        from .vad import VAD_PARAMS
+        timestamps = speech_timestamps(y, sr, **(vad_params or VAD_PARAMS))
+
+    spec = stft(np.pad(y, PADDING))
+    # The estimate only uses frames centred inside y, not the padding
+    first = -(-PADDING // HOP)
+    n_frames = (PADDING + len(y)) // HOP - first + 1
+    analysis = spec[:, first:first + n_frames]
+    speech, noise = frame_labels(n_frames, len(y), timestamps, offset=first * HOP - PADDING)
+    power = band_power(analysis, sr)
+
+    step = int(chunk_seconds * sr / HOP) if chunk_seconds else n_frames
+    step = max(step, 1)
+    chunks = []
+    for lo in range(0, n_frames, step):
+        hi = min(lo + step, n_frames)
+        chunk = decide(power[lo:hi], speech[lo:hi], noise[lo:hi], fallback_noise=power[noise])
+        chunk.update(lo=lo, hi=hi, start_s=round(lo * HOP / sr, 2))
+        chunks.append(chunk)
+
+    decision = {
+        "mode": summarize_chunks(chunks),
+        "audio_s": round(len(y) / sr, 3),
+        "speech_s": round(sum(t["end"] - t["start"] for t in timestamps) / sr, 3),
+    }
+    file_level = chunks[0] if len(chunks) == 1 else decide(power, speech, noise)
+    decision.update({k: file_level[k] for k in ("snr_db", "flux_db", "noise_frames", "noise_source")})
+    decision["analysis_s"] = round(time.perf_counter() - start, 4)
+
+    if all(c["mode"] == "skip" for c in chunks):
+        decision["denoise_s"] = 0.0
+        if len(chunks) > 1:
+            decision["chunks"] = [{k: c[k] for k in ("start_s", "mode", "snr_db")} for c in chunks]
+        return y, decision
+
+    start = time.perf_counter()
+    mask = np.ones(spec.shape, dtype=np.float32)
+    full_nonstationary = None
+
+    for c in chunks:
+        # Columns in the padded STFT; the padding goes with the outer chunks
+        cols = c["cols"] = slice(0 if c is chunks[0] else first + c["lo"],
+                                 spec.shape[1] if c is chunks[-1] else first + c["hi"])
+        if c["mode"] == "stationary":
+            ref = np.zeros_like(noise)
+            ref[c["lo"]:c["hi"]] = noise[c["lo"]:c["hi"]]
+            if ref.sum() < MIN_NOISE_FRAMES:
+                ref = noise
+            if not ref.any():
+                ref = power <= np.percentile(power, QUIET_PERCENTILE)
+            mask[:, cols] = stationary_mask(spec[:, cols], analysis[:, ref])
+        elif c["mode"] == "nonstationary":
+            if full_nonstationary is None:
+                # Running mean needs the context on both sides of the chunk
+                full_nonstationary = nonstationary_mask(spec, sr)
+            mask[:, cols] = full_nonstationary[:, cols]
+
+    mask = signal.fftconvolve(mask, smoothing_filter(sr), mode="same")
+    for c in chunks:
+        if c["mode"] == "skip":
+            mask[:, c["cols"]] = 1.0
+
+    out = istft(spec * mask, len(y) + 2 * PADDING)[PADDING:PADDING + len(y)].copy()
+    decision["denoise_s"] = round(time.perf_counter() - start, 4)
+    if len(chunks) > 1:
+        decision["chunks"] = [{k: c[k] for k in ("start_s", "mode", "snr_db")} for c in chunks]
+    return out, decision
+
+
+def merge_decisions(chunks):
+    """One file-level decision from per-window decisions (streaming path)"""
+    snrs = [c["snr_db"] for c in chunks if c["snr_db"] is not None]
+    fluxes = [c["flux_db"] for c in chunks if c["flux_db"] is not None]
+    return {
+        "mode": summarize_chunks(chunks) if chunks else "skip",
+        "audio_s": round(sum(c["audio_s"] for c in chunks), 3),
+        "snr_db": round(float(np.median(snrs)), 2) if snrs else None,
+        "flux_db": round(float(np.median(fluxes)), 2) if fluxes else None,
+        "analysis_s": round(sum(c["analysis_s"] for c in chunks), 4),
+        "denoise_s": round(sum(c["denoise_s"] for c in chunks), 4),
+        "chunks": [{k: c[k] for k in ("start_s", "mode", "snr_db")} for c in chunks],
+    }
+
+
+# ---------------- decision log ----------------
+
+def enable_log(path):
+    """Append decisions to path (also for child processes)"""
+    global _log_path
+    _log_path = path
+    os.environ[LOG_ENV_VAR] = path
+
+
+def log_decision(utt_id, decision):
+    """Append one decision, if the log is enabled"""
+    if _log_path is None or decision is None:
+        return
+    os.makedirs(os.path.dirname(_log_path) or ".", exist_ok=True)
+    # One short line per write with O_APPEND, so workers do not interleave
+    with open(_log_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"id": utt_id, **decision}) + "\n")
+
+
+def _read_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize_log(log_path, results_path=None, baseline_path=None):
+    """
+    Per mode: files, audio hours, SNR, time spent, and the estimated time
+    saved against denoising everything non-stationarily (the old path).
+    With evaluate.py per-utterance results, also the WER of each group;
+    with a baseline run (always denoised), the WER change per group.
+    """
+    decisions = {}
+    for record in _read_jsonl(log_path):
+        decisions[record["id"]] = record
+    wer = {r["id"]: r for r in _read_jsonl(results_path)} if results_path else {}
+    base = {r["id"]: r for r in _read_jsonl(baseline_path)} if baseline_path else {}
+
+    # Measured reduction cost per audio second (non-stationary if there is
+    # any, else any reduction) prices what skipping saved
+    ns = [d for d in decisions.values() if d["mode"] == "nonstationary" and d["audio_s"]]
+    ns = ns or [d for d in decisions.values() if d["denoise_s"] and d["audio_s"]]
+    ns_rate = sum(d["denoise_s"] for d in ns) / sum(d["audio_s"] for d in ns) if ns else None
+
+    groups = {}
+    for utt_id, d in decisions.items():
+        g = groups.setdefault(d["mode"], {"files": 0, "audio_s": 0.0, "snr": [], "spent_s": 0.0,
+                                          "saved_s": 0.0, "errors": 0, "words": 0,
+                                          "base_errors": 0, "base_words": 0})
+        g["files"] += 1
+        g["audio_s"] += d["audio_s"]
+        if d["snr_db"] is not None:
+            g["snr"].append(d["snr_db"])
+        g["spent_s"] += d["analysis_s"] + d["denoise_s"]
+        if ns_rate is not None:
+            g["saved_s"] += d["audio_s"] * ns_rate - d["denoise_s"] - d["analysis_s"]
+
+        for key, table in (("", wer), ("base_", base)):
+            row = table.get(utt_id)
+            if row:
+                g[key + "errors"] += row["word_sub"] + row["word_del"] + row["word_ins"]
+                g[key + "words"] += row["ref_words"]
+
+    summary = {}
+    for mode, g in groups.items():
+        summary[mode] = {
+            "files": g["files"],
+            "audio_h": g["audio_s"] / 3600,
+            "median_snr_db": float(np.median(g["snr"])) if g["snr"] else None,
+            "spent_s": g["spent_s"],
+            "saved_s": g["saved_s"] if ns_rate is not None else None,
+            "wer": g["errors"] / g["words"] if g["words"] else None,
+            "baseline_wer": g["base_errors"] / g["base_words"] if g["base_words"] else None,
+        }
+    return summary
+
+
+def print_log_report(log_path, results_path=None, baseline_path=None):
+    summary = summarize_log(log_path, results_path, baseline_path)
+
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else "-"
+
+    print(f"{'mode':<14} {'files':>6} {'audio h':>8} {'SNR dB':>7} {'spent s':>8} "
+          f"{'saved s':>8} {'WER':>7} {'base WER':>8} {'dWER':>7}")
+    for mode, s in sorted(summary.items()):
+        delta = s["wer"] - s["baseline_wer"] if s["wer"] is not None and s["baseline_wer"] is not None else None
+        print(f"{mode:<14} {s['files']:>6} {s['audio_h']:>8.2f} {fmt(s['median_snr_db'], '7.1f')} "
+              f"{s['spent_s']:>8.1f} {fmt(s['saved_s'], '8.1f')} {fmt(s['wer'], '7.4f')} "
+              f"{fmt(s['baseline_wer'], '8.4f')} {fmt(delta, '+7.4f')}")
+
+
+if __name__ == "__main__":
+    print_log_report(*sys.argv[1:4])
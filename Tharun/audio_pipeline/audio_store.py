@@ -0,0 +1,333 @@
+"""
+Sharded, memory-mapped store for clean audio.
+
+One WAV per utterance means one open/stat/close per clip; with hundreds
+of thousands of clips the filesystem dominates. Here clips are packed
+into a few large shard files that are np.memmap'ed once, and every clip
+read is a zero-copy slice of the mapping.
+
+Layout of a store directory:
+
+    index.json          dtype, sample format and the list of shards
+    shard_00000.bin     header | payloads | index table | ids
+
+Shard file:
+    header   magic, version, dtype code, record count, offsets of the
+             index table and the ids blob (HEADER_SIZE bytes)
+    payload  samples of each clip (int16 or float32), each clip aligned
+             to ALIGN bytes
+    index    one INDEX_DTYPE row per clip: offset, length (samples), sr,
+             position of the id in the ids blob
+    ids      UTF-8 utterance ids, concatenated
+
+Shards are written to a temporary name and renamed when complete, so a
+reader never sees a half-written shard.
+
+    python -m audio_pipeline.audio_store pack data/clean_audio/Hindi data/clean_store/Hindi
+    python -m audio_pipeline.audio_store unpack data/clean_store/Hindi data/clean_audio/Hindi
+    python -m audio_pipeline.audio_store info data/clean_store/Hindi
+"""
+
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+MAGIC = b"GGSTORE1"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQQQ")   # magic, version, dtype, count, index off, ids off, ids len
+HEADER_SIZE = 64
+ALIGN = 64
+
+DTYPES = {"int16": 0, "float32": 1}
+DTYPE_CODES = {code: name for name, code in DTYPES.items()}
+
+INDEX_DTYPE = np.dtype([
+    ("offset", "<u8"),
+    ("length", "<u8"),
+    ("sr", "<u4"),
+    ("id_offset", "<u8"),
+    ("id_length", "<u4"),
+])
+
+SHARD_MAX_BYTES = 512 * 1024 ** 2
+INDEX_FILE = "index.json"
+
+
+def _shard_name(number):
+    return f"shard_{number:05d}.bin"
+
+
+def to_dtype(audio, dtype):
+    """Convert float audio in [-1, 1] or int16 PCM to the store's sample type"""
+    audio = np.asarray(audio)
+    if dtype == "int16":
+        if audio.dtype == np.int16:
+            return audio
+        return (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+    if audio.dtype == np.int16:
+        return audio.astype(np.float32) / 32768
+    return audio.astype(np.float32, copy=False)
+
+
+# ---------------- writing ----------------
+
+class _ShardWriter:
+
+    def __init__(self, path, dtype):
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.dtype = dtype
+        self.rows = []
+        self.ids = bytearray()
+        self.f = open(self.tmp_path, "wb")
+        self.f.write(b"\0" * HEADER_SIZE)
+        self.size = HEADER_SIZE
+
+    def add(self, utt_id, samples, sr):
+        pad = -self.size % ALIGN
+        if pad:
+            self.f.write(b"\0" * pad)
+            self.size += pad
+
+        data = np.ascontiguousarray(samples).tobytes()
+        encoded = utt_id.encode("utf-8")
+        self.rows.append((self.size, len(samples), sr, len(self.ids), len(encoded)))
+        self.ids += encoded
+
+        self.f.write(data)
+        self.size += len(data)
+
+    def close(self):
+        index = np.array(self.rows, dtype=INDEX_DTYPE)
+        index_offset = self.size + (-self.size % ALIGN)
+        self.f.write(b"\0" * (index_offset - self.size))
+        self.f.write(index.tobytes())
+        ids_offset = index_offset + index.nbytes
+        self.f.write(bytes(self.ids))
+
+        self.f.seek(0)
+        self.f.write(HEADER.pack(MAGIC, VERSION, DTYPES[self.dtype], len(self.rows),
+                                 index_offset, ids_offset, len(self.ids)))
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.f.close()
+        os.replace(self.tmp_path, self.path)
+        return len(self.rows)
+
+
+class AudioStoreWriter:
+    """
+    Append clips to a new store, starting a new shard every
+    shard_max_bytes. Use as a context manager or call close().
+    """
+
+    def __init__(self, root, dtype="int16", shard_max_bytes=SHARD_MAX_BYTES):
+        if dtype not in DTYPES:
+            raise ValueError(f"dtype must be one of {list(DTYPES)}")
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.dtype = dtype
+        self.shard_max_bytes = shard_max_bytes
+        self.shards = []
+        self._shard = None
+        self._ids = set()
+
+    def add(self, utt_id, audio, sr):
+        if utt_id in self._ids:
+            raise ValueError(f"duplicate utterance id: {utt_id}")
+        self._ids.add(utt_id)
+
+        samples = to_dtype(audio, self.dtype)
+        if self._shard is not None and self._shard.size + samples.nbytes > self.shard_max_bytes:
+            self._finish_shard()
+        if self._shard is None:
+            name = _shard_name(len(self.shards))
+            self._shard = _ShardWriter(os.path.join(self.root, name), self.dtype)
+        self._shard.add(utt_id, samples, sr)
+
+    def _finish_shard(self):
+        count = self._shard.close()
+        self.shards.append({"file": os.path.basename(self._shard.path), "count": count})
+        self._shard = None
+
+    def close(self):
+        if self._shard is not None:
+            self._finish_shard()
+
+        tmp_path = os.path.join(self.root, INDEX_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": VERSION, "dtype": self.dtype, "shards": self.shards}, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.root, INDEX_FILE))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        elif self._shard is not None:
+            self._shard.f.close()
+            os.remove(self._shard.tmp_path)
+
+
+# ---------------- reading ----------------
+
+class _Shard:
+
+    def __init__(self, path):
+        self.data = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, version, dtype, count, index_offset, ids_offset, ids_length = HEADER.unpack(
+            bytes(self.data[:HEADER.size])
+        )
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not an audio store shard")
+
+        self.dtype = np.dtype(DTYPE_CODES[dtype])
+        self.index = self.data[index_offset:index_offset + count * INDEX_DTYPE.itemsize].view(INDEX_DTYPE)
+        self.ids_blob = self.data[ids_offset:ids_offset + ids_length]
+
+    def ids(self):
+        blob = self.ids_blob.tobytes()
+        return [
+            blob[start:start + length].decode("utf-8")
+            for start, length in zip(self.index["id_offset"].tolist(), self.index["id_length"].tolist())
+        ]
+
+    def samples(self, row):
+        entry = self.index[row]
+        start = int(entry["offset"])
+        stop = start + int(entry["length"]) * self.dtype.itemsize
+        return self.data[start:stop].view(self.dtype), int(entry["sr"])
+
+
+class AudioStore:
+    """
+    Read-only view of a store. Clips come back as zero-copy slices of the
+    memory-mapped shards (read-only arrays); as_float=True converts int16
+    payloads to float32 in [-1, 1] (a copy).
+
+        with AudioStore("data/clean_store/Hindi") as store:
+            for utt_id, audio, sr in store.iter_clips(as_float=True):
+                ...
+            audio, sr = store.get("Hindi_0001")
+    """
+
+    def __init__(self, root):
+        with open(os.path.join(root, INDEX_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        self.root = root
+        self.dtype = meta["dtype"]
+        self._shards = [_Shard(os.path.join(root, s["file"])) for s in meta["shards"]]
+
+        self._ids = []
+        self._rows = []            # global index -> (shard, row)
+        for number, shard in enumerate(self._shards):
+            ids = shard.ids()
+            self._ids += ids
+            self._rows += [(number, row) for row in range(len(ids))]
+        self._lookup = {utt_id: i for i, utt_id in enumerate(self._ids)}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, utt_id):
+        return utt_id in self._lookup
+
+    def ids(self):
+        return list(self._ids)
+
+    def _read(self, i, as_float):
+        shard, row = self._rows[i]
+        audio, sr = self._shards[shard].samples(row)
+        if as_float and audio.dtype != np.float32:
+            audio = to_dtype(audio, "float32")
+        return audio, sr
+
+    def get(self, utt_id, as_float=False):
+        """(audio, sr) of one clip; KeyError if the id is not stored"""
+        return self._read(self._lookup[utt_id], as_float)
+
+    def __getitem__(self, i):
+        audio, sr = self._read(i, False)
+        return self._ids[i], audio, sr
+
+    def iter_clips(self, as_float=False):
+        """(id, audio, sr) for every clip, in store order"""
+        for i, utt_id in enumerate(self._ids):
+            audio, sr = self._read(i, as_float)
+            yield utt_id, audio, sr
+
+    def __iter__(self):
+        return self.iter_clips()
+
+    def durations(self):
+        """Length of every clip in seconds, in store order"""
+        return np.concatenate([
+            shard.index["length"] / shard.index["sr"] for shard in self._shards
+        ]) if self._shards else np.zeros(0)
+
+    def close(self):
+        # The mappings are released once the last slice handed out is gone
+        self._shards = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---------------- converters ----------------
+
+def pack_wav_dir(wav_dir, root, dtype="int16", shard_max_bytes=SHARD_MAX_BYTES):
+    """Pack every WAV in wav_dir (id = file name without .wav). Returns the clip count."""
+    import soundfile as sf
+
+    files = sorted(f for f in os.listdir(wav_dir) if f.lower().endswith(".wav"))
+    with AudioStoreWriter(root, dtype, shard_max_bytes) as writer:
+        for file in files:
+            audio, sr = sf.read(os.path.join(wav_dir, file), dtype=dtype)
+            if audio.ndim > 1:
+                audio = to_dtype(audio.mean(axis=1), dtype)
+            writer.add(os.path.splitext(file)[0], audio, sr)
+    return len(files)
+
+
+def unpack_to_wav_dir(root, wav_dir):
+    """Write every clip back as <id>.wav (16-bit PCM). Returns the clip count."""
+    import soundfile as sf
+
+    os.makedirs(wav_dir, exist_ok=True)
+    with AudioStore(root) as store:
+        for utt_id, audio, sr in store:
+            sf.write(os.path.join(wav_dir, utt_id + ".wav"), audio, sr, subtype="PCM_16")
+        return len(store)
+
+
+def main():
+    usage = ("usage: python -m audio_pipeline.audio_store pack WAV_DIR STORE_DIR [--float32]\n"
+             "       python -m audio_pipeline.audio_store unpack STORE_DIR WAV_DIR\n"
+             "       python -m audio_pipeline.audio_store info STORE_DIR")
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+
+    if len(args) == 3 and args[0] == "pack":
+        dtype = "float32" if "--float32" in sys.argv else "int16"
+        print(f"✅ Packed {pack_wav_dir(args[1], args[2], dtype)} clips into {args[2]}")
+    elif len(args) == 3 and args[0] == "unpack":
+        print(f"✅ Wrote {unpack_to_wav_dir(args[1], args[2])} WAV files to {args[2]}")
+    elif len(args) == 2 and args[0] == "info":
+        with AudioStore(args[1]) as store:
+            print(f"Clips: {len(store)} | dtype: {store.dtype} | shards: {len(store._shards)} "
+                  f"| audio: {store.durations().sum() / 3600:.2f} h")
+    else:
+        print(usage)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,339 @@
+"""
+Batched Silero VAD for many files.
+
+get_speech_timestamps() runs the model one 32 ms window at a time for one
+file, so on a large corpus VAD costs almost as much as ASR. Here:
+
+- files are sorted by length and taken BATCH_SIZE at a time (a "wave");
+  each wave is copied once into a reused (files x samples) buffer, zero
+  padded like Silero pads the last window, and viewed as
+  (files x windows x window) without further copies
+- Silero runs on one (files x window) slice per step: one model call per
+  window for the whole wave, each row keeping its own RNN state and context
+- threshold / neg_threshold / min_silence / min_speech hysteresis and the
+  speech padding are applied to each file's probabilities with NumPy
+  (max_speech_duration_s falls back to the original frame loop)
+
+The timestamps are the same as get_speech_timestamps() with the same
+parameters, because each row sees the same windows in the same order.
+Shorter files in a wave are padded up to the longest, so sorting by
+length keeps the wasted windows low (stats()["utilisation"]).
+
+    python -m audio_pipeline.batched_vad data/clean_audio/Hindi timestamps.jsonl
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from lazy import LazyModule, once
+from stage_profiler import profiled
+
+librosa = LazyModule("librosa")
+
+
+BATCH_SIZE = 64
+SAMPLE_RATE = 16000
+
+# get_speech_timestamps() defaults
+DEFAULTS = dict(
+    threshold=0.5,
+    min_speech_duration_ms=250,
+    max_speech_duration_s=float("inf"),
+    min_silence_duration_ms=100,
+    speech_pad_ms=30,
+    neg_threshold=None,
+)
+
+
+@once
+def load_batch_model():
+    """Silero instance used only by this module (its batch state is not shared)"""
+    from .vad import new_vad_model
+
+    return new_vad_model()
+
+
+def _window(sr):
+    return 512 if sr == 16000 else 256
+
+
+def _model_rate(sr):
+    """(rate Silero runs at, decimation step) as get_speech_timestamps chooses them"""
+    if sr > 16000 and sr % 16000 == 0:
+        return 16000, sr // 16000
+    if sr not in (8000, 16000):
+        raise ValueError("Silero VAD supports 8000 Hz, 16000 Hz or multiples of 16000 Hz")
+    return sr, 1
+
+
+# ---------------- probabilities ----------------
+
+class BatchedVAD:
+    """Speech probabilities and timestamps for many clips, BATCH_SIZE clips per model call"""
+
+    def __init__(self, model=None, batch_size=BATCH_SIZE):
+        self.model = model
+        self.batch_size = batch_size
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self.counts = {"clips": 0, "windows": 0, "padded_windows": 0, "model_calls": 0, "audio_s": 0.0}
+
+    def _probs_step(self, frames, sr):
+        """Silero on one (rows x window) view; returns one probability per row"""
+        import torch
+
+        if self.model is None:
+            self.model = load_batch_model()
+        with torch.no_grad():
+            return self.model(torch.from_numpy(frames), sr).numpy().reshape(-1)
+
+    def _reset(self):
+        # State is re-created for the new batch size on the next call
+        if self.model is None:
+            self.model = load_batch_model()
+        self.model.reset_states()
+
+    def _wave(self, clips, sr):
+        """Probabilities of clips (already at the model rate) that run as one batch"""
+        window = _window(sr)
+        n_windows = max(-(-len(c) // window) for c in clips)
+        size = len(clips) * n_windows * window
+        if len(self._buffer) < size:
+            self._buffer = np.zeros(size, dtype=np.float32)
+
+        block = self._buffer[:size].reshape(len(clips), n_windows * window)
+        for row, clip in enumerate(clips):
+            block[row, :len(clip)] = clip
+            block[row, len(clip):] = 0.0
+        frames = block.reshape(len(clips), n_windows, window)
+
+        self._reset()
+        probs = np.empty((len(clips), n_windows), dtype=np.float32)
+        for t in range(n_windows):
+            probs[:, t] = self._probs_step(frames[:, t], sr)
+
+        used = sum(-(-len(c) // window) for c in clips)
+        self.counts["windows"] += used
+        self.counts["padded_windows"] += len(clips) * n_windows - used
+        self.counts["model_calls"] += n_windows
+        return [probs[row, :-(-len(clip) // window)] for row, clip in enumerate(clips)]
+
+    @profiled("audio.vad_batch_probs")
+    def speech_probs(self, clips, sr=SAMPLE_RATE):
+        """
+        Per-window speech probabilities for each clip, in input order.
+        Clips at a multiple of 16 kHz are decimated as get_speech_timestamps does.
+        """
+        sr, step = _model_rate(sr)
+        clips = [np.asarray(c, dtype=np.float32)[::step] for c in clips]
+        order = sorted(range(len(clips)), key=lambda i: len(clips[i]), reverse=True)
+
+        out = [np.zeros(0, dtype=np.float32)] * len(clips)
+        for start in range(0, len(order), self.batch_size):
+            rows = [i for i in order[start:start + self.batch_size] if len(clips[i])]
+            if rows:
+                for i, probs in zip(rows, self._wave([clips[i] for i in rows], sr)):
+                    out[i] = probs
+
+        self.counts["clips"] += len(clips)
+        self.counts["audio_s"] += sum(len(c) for c in clips) / sr
+        return out
+
+    def timestamps(self, clips, sr=SAMPLE_RATE, **params):
+        """get_speech_timestamps(clip, model, sampling_rate=sr, **params) for every clip"""
+        model_sr, step = _model_rate(sr)
+        probs = self.speech_probs(clips, sr)
+        return [
+            speech_segments(p, -(-len(clip) // step), model_sr, step, **params)
+            for p, clip in zip(probs, clips)
+        ]
+
+    def stats(self):
+        total = self.counts["windows"] + self.counts["padded_windows"]
+        return dict(self.counts, utilisation=round(self.counts["windows"] / total, 3) if total else None)
+
+
+# ---------------- hysteresis ----------------
+
+def _speech_runs(probs, threshold, neg_threshold, min_silence_samples, window):
+    """
+    (start window, end sample or None if still open) of every triggered run.
+    A run starts at a window >= threshold and ends at the first window
+    below neg_threshold that is min_silence_samples after the first
+    below-neg window following the run's last window >= threshold.
+    """
+    n = len(probs)
+    index = np.arange(n)
+    strong = probs >= threshold
+    weak = probs < neg_threshold
+
+    last_strong = np.maximum.accumulate(np.where(strong, index, -1))
+    # First weak window at or after each position (n = none)
+    next_weak = np.append(np.minimum.accumulate(np.where(weak, index, n)[::-1])[::-1], n)
+    silence_start = next_weak[last_strong + 1]
+    closes = np.flatnonzero(weak & (last_strong >= 0) & ((index - silence_start) * window >= min_silence_samples))
+    starts = np.flatnonzero(strong)
+
+    runs = []
+    pos = 0
+    while True:
+        k = np.searchsorted(starts, pos)
+        if k == len(starts):
+            return runs
+        start = int(starts[k])
+        c = np.searchsorted(closes, start + 1)
+        if c == len(closes):
+            runs.append((start, None))
+            return runs
+        runs.append((start, int(silence_start[closes[c]]) * window))
+        pos = int(closes[c]) + 1
+
+
+def _speech_runs_loop(probs, threshold, neg_threshold, min_silence_samples, min_speech_samples,
+                      max_speech_samples, window, sr):
+    """get_speech_timestamps' frame loop (needed for max_speech_duration_s); returns (speeches, open segment)"""
+    min_silence_at_max_speech = sr * 98 / 1000
+    triggered = False
+    speeches = []
+    current = {}
+    temp_end = prev_end = next_start = 0
+
+    for i, prob in enumerate(probs):
+        if prob >= threshold and temp_end:
+            temp_end = 0
+            if next_start < prev_end:
+                next_start = window * i
+        if prob >= threshold and not triggered:
+            triggered = True
+            current["start"] = window * i
+            continue
+        if triggered and window * i - current["start"] > max_speech_samples:
+            if prev_end:
+                current["end"] = prev_end
+                speeches.append(current)
+                current = {}
+                if next_start < prev_end:
+                    triggered = False
+                else:
+                    current["start"] = next_start
+                prev_end = next_start = temp_end = 0
+            else:
+                current["end"] = window * i
+                speeches.append(current)
+                current = {}
+                prev_end = next_start = temp_end = 0
+                triggered = False
+                continue
+        if prob < neg_threshold and triggered:
+            if not temp_end:
+                temp_end = window * i
+            if window * i - temp_end > min_silence_at_max_speech:
+                prev_end = temp_end
+            if window * i - temp_end < min_silence_samples:
+                continue
+            current["end"] = temp_end
+            if current["end"] - current["start"] > min_speech_samples:
+                speeches.append(current)
+            current = {}
+            prev_end = next_start = temp_end = 0
+            triggered = False
+
+    return speeches, current
+
+
+def speech_segments(probs, num_samples, sr=SAMPLE_RATE, step=1, threshold=0.5, min_speech_duration_ms=250,
+                    max_speech_duration_s=float("inf"), min_silence_duration_ms=100, speech_pad_ms=30,
+                    neg_threshold=None):
+    """
+    Timestamps (in samples of the original rate) from per-window probabilities,
+    with get_speech_timestamps' rules. num_samples is the length at the model rate.
+    """
+    window = _window(sr)
+    neg_threshold = max(threshold - 0.15, 0.01) if neg_threshold is None else neg_threshold
+    min_speech_samples = sr * min_speech_duration_ms / 1000
+    speech_pad_samples = sr * speech_pad_ms / 1000
+    max_speech_samples = sr * max_speech_duration_s - window - 2 * speech_pad_samples
+    min_silence_samples = sr * min_silence_duration_ms / 1000
+    probs = np.asarray(probs)
+
+    if np.isfinite(max_speech_samples):
+        speeches, current = _speech_runs_loop(probs, threshold, neg_threshold, min_silence_samples,
+                                              min_speech_samples, max_speech_samples, window, sr)
+        starts = [s["start"] for s in speeches]
+        ends = [s["end"] for s in speeches]
+        if current and num_samples - current["start"] > min_speech_samples:
+            starts.append(current["start"])
+            ends.append(num_samples)
+    else:
+        starts, ends = [], []
+        for start_window, end in _speech_runs(probs, threshold, neg_threshold, min_silence_samples, window):
+            start = start_window * window
+            end = num_samples if end is None else end
+            if end - start > min_speech_samples:
+                starts.append(start)
+                ends.append(end)
+
+    if not starts:
+        return []
+
+    # Speech padding: half the gap when two segments are closer than two pads
+    starts = np.array(starts, dtype=np.int64)
+    ends = np.array(ends, dtype=np.int64)
+    gaps = starts[1:] - ends[:-1]
+    close = gaps < 2 * speech_pad_samples
+    new_starts = starts.copy()
+    new_ends = ends.copy()
+    new_starts[0] = int(max(0, starts[0] - speech_pad_samples))
+    new_ends[:-1] = np.where(close, ends[:-1] + gaps // 2,
+                             np.minimum(num_samples, ends[:-1] + speech_pad_samples).astype(np.int64))
+    new_starts[1:] = np.where(close, np.maximum(0, starts[1:] - gaps // 2),
+                              np.maximum(0, starts[1:] - speech_pad_samples).astype(np.int64))
+    new_ends[-1] = int(min(num_samples, ends[-1] + speech_pad_samples))
+
+    return [{"start": int(s) * step, "end": int(e) * step} for s, e in zip(new_starts, new_ends)]
+
+
+# ---------------- corpus ----------------
+
+def batch_speech_timestamps(clips, sr=SAMPLE_RATE, batch_size=BATCH_SIZE, **params):
+    """Timestamps for a list of clips (one list of dicts per clip, in order)"""
+    return BatchedVAD(batch_size=batch_size).timestamps(clips, sr, **params)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched Silero VAD over a folder of audio files")
+    parser.add_argument("audio_dir")
+    parser.add_argument("output", help="JSON lines: {id, timestamps}")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--files-per-batch", type=int, default=1024, help="files held in memory at a time")
+    parser.add_argument("--threshold", type=float, default=DEFAULTS["threshold"])
+    parser.add_argument("--min-speech-ms", type=int, default=DEFAULTS["min_speech_duration_ms"])
+    parser.add_argument("--min-silence-ms", type=int, default=DEFAULTS["min_silence_duration_ms"])
+    args = parser.parse_args()
+
+    params = {"threshold": args.threshold, "min_speech_duration_ms": args.min_speech_ms,
+              "min_silence_duration_ms": args.min_silence_ms}
+    files = sorted(f for f in os.listdir(args.audio_dir) if f.lower().endswith((".wav", ".mp3", ".flac")))
+    vad = BatchedVAD(batch_size=args.batch_size)
+
+    start = time.time()
+    cpu = time.process_time()
+    with open(args.output, "w", encoding="utf-8") as out:
+        for i in range(0, len(files), args.files_per_batch):
+            names = files[i:i + args.files_per_batch]
+            clips = [librosa.load(os.path.join(args.audio_dir, f), sr=SAMPLE_RATE, mono=True)[0] for f in names]
+            for name, timestamps in zip(names, vad.timestamps(clips, SAMPLE_RATE, **params)):
+                out.write(json.dumps({"id": os.path.splitext(name)[0], "timestamps": timestamps}) + "\n")
+
+    stats = vad.stats()
+    cpu_min = (time.process_time() - cpu) / 60
+    print(f"✅ {stats['clips']} files, {stats['audio_s'] / 3600:.2f} h of audio in {time.time() - start:.1f}s "
+          f"({stats['audio_s'] / 3600 / max(cpu_min, 1e-9):.2f} h per CPU-minute, "
+          f"window utilisation {stats['utilisation']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,12 @@
-import librosa
 import soundfile as sf
 
+from lazy import LazyModule
+from stage_profiler import profiled
+
+librosa = LazyModule("librosa")
+
+
+@profiled("audio.convert_wav")
 def convert_wav(mp3_path, wav_path):
     audio, sr = librosa.load(mp3_path, sr=16000, mono=True)
     sf.write(wav_path, audio, sr)
@@ -0,0 +1,202 @@
+"""
+Fused audio front end shared by the Tharun pipeline and opti_prepo.py.
+
+resample -> loudness -> VAD -> denoise -> peak normalisation on one
+float32 buffer:
+
+- gains are applied in place, no intermediate copies
+- Silero reads the buffer through torch.from_numpy (shared memory) and
+  speech is cut out with NumPy slices instead of collect_chunks(...).numpy()
+- peak / noise / speech energy come from one pass over the samples
+  (dot products on slices, no temporary squared arrays)
+- stages are skipped when the stats say they would do nothing
+  (same sample rate, loudness already on target, SNR above the gate)
+- with adaptive_denoise, the denoise mode comes from adaptive_denoise.py
+  (SNR against the VAD non-speech frames, one shared STFT)
+
+process() returns the output together with the stats, the stages it
+skipped and the time spent in each stage.
+"""
+
+import time
+
+import numpy as np
+
+from stage_profiler import profiled, samples_seconds
+
+
+TARGET_SR = 16000
+NOISE_SECONDS = 0.5
+LOUDNESS_TOLERANCE_DB = 0.5
+
+
+def to_float32(y):
+    """Contiguous float32 view of y (copies only if it has to)"""
+    return np.ascontiguousarray(y, dtype=np.float32)
+
+
+@profiled("front_end.resample", samples_seconds)
+def resample(y, sr, target_sr=TARGET_SR):
+    if sr == target_sr:
+        return y
+    import librosa
+    return to_float32(librosa.resample(y=y, orig_sr=sr, target_sr=target_sr))
+
+
+@profiled("front_end.loudness", samples_seconds)
+def normalize_loudness(y, sr, target_lufs, tolerance_db=LOUDNESS_TOLERANCE_DB):
+    """
+    Scale y in place to target integrated loudness (LUFS).
+    Returns (y, measured loudness, applied gain in dB).
+    """
+    import pyloudnorm as pyln
+
+    loudness = pyln.Meter(sr).integrated_loudness(y)
+    gain_db = target_lufs - loudness
+
+    if not np.isfinite(gain_db) or abs(gain_db) <= tolerance_db:
+        return y, loudness, 0.0
+
+    y *= np.float32(10.0 ** (gain_db / 20.0))
+    return y, loudness, gain_db
+
+
+@profiled("front_end.vad", samples_seconds)
+def speech_timestamps(y, sr, model=None, **vad_params):
+    """
+    Silero timestamps, reading y through a shared tensor view.
+    model: Silero instance to use instead of the shared one (each thread
+    needs its own, the model keeps RNN state between windows)
+    """
+    import torch
+    from .vad import load_vad
+
+    shared, get_speech_timestamps = load_vad()
+    model = shared if model is None else model
+    return get_speech_timestamps(torch.from_numpy(y), model, sampling_rate=sr, **vad_params)
+
+
+def mean_energy(segments):
+    """Mean squared amplitude over a list of arrays"""
+    length = sum(len(s) for s in segments)
+    return sum(float(np.dot(s, s)) for s in segments) / max(length, 1)
+
+
+def estimate_snr(noise, speech):
+    """SNR in dB between a noise array and a speech array (or list of arrays)"""
+    speech = speech if isinstance(speech, list) else [speech]
+    return float(10 * np.log10((mean_energy(speech) + 1e-9) / (mean_energy([noise]) + 1e-9)))
+
+
+@profiled("front_end.stats", samples_seconds)
+def signal_stats(y, sr, timestamps=None, noise_seconds=NOISE_SECONDS):
+    """
+    Peak of the speech segments (whole signal without timestamps), SNR of
+    the speech against the first noise_seconds, and the speech ratio
+    """
+    noise = y[:int(noise_seconds * sr)]
+    segments = [y[t['start']:t['end']] for t in timestamps] if timestamps else [y]
+
+    return {
+        "peak": max((float(np.max(np.abs(s))) for s in segments if len(s)), default=0.0),
+        "snr_db": estimate_snr(noise, segments),
+        "speech_ratio": sum(len(s) for s in segments) / max(len(y), 1),
+    }
+
+
+@profiled("front_end.denoise", samples_seconds)
+def denoise(y, sr):
+    import noisereduce as nr
+    return to_float32(nr.reduce_noise(y=y, sr=sr))
+
+
+@profiled("front_end.peak_normalize")
+def peak_normalize(y, peak=None):
+    """Scale y in place so its peak is 1"""
+    peak = float(np.max(np.abs(y))) if peak is None else peak
+    if peak > 0 and peak != 1.0:
+        y *= np.float32(1.0 / peak)
+    return y
+
+
+@profiled("front_end.process", samples_seconds)
+def process(y, sr, target_sr=TARGET_SR, target_lufs=None, vad_params=None,
+            denoise_below_snr_db=None, always_denoise=False, adaptive_denoise=False,
+            normalize_peak=False, vad_model=None):
+    """
+    Run the enabled stages on y (works in place when y is float32).
+
+    target_lufs: loudness target, None to skip
+    vad_params: dict of Silero parameters, None to skip VAD
+    denoise_below_snr_db: denoise only when SNR is below this
+    always_denoise: denoise unconditionally (Tharun pipeline behaviour)
+    adaptive_denoise: skip / stationary / non-stationary reduction chosen
+        from the VAD noise frames, done before the speech is cut out
+        (info["denoise"] holds the decision)
+    normalize_peak: scale the output to peak 1
+    vad_model: Silero instance for this thread (default: the shared one)
+
+    Returns (audio or None if VAD found no speech, info dict).
+    """
+    timings = {}
+    skipped = []
+    info = {"timings": timings, "skipped": skipped}
+
+    def timed(stage, fn, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        timings[stage] = time.perf_counter() - start
+        return result
+
+    y = to_float32(y)
+
+    if sr != target_sr:
+        y = timed("resample", resample, y, sr, target_sr)
+        sr = target_sr
+    else:
+        skipped.append("resample")
+
+    if target_lufs is not None:
+        y, info["loudness"], info["gain_db"] = timed("loudness", normalize_loudness, y, sr, target_lufs)
+        if info["gain_db"] == 0.0:
+            skipped.append("loudness")
+
+    timestamps = None
+    if vad_params is not None:
+        timestamps = timed("vad", speech_timestamps, y, sr, vad_model, **vad_params)
+        info["timestamps"] = timestamps
+        if not timestamps:
+            return None, info
+
+    stats = timed("stats", signal_stats, y, sr, timestamps)
+    info.update(stats)
+
+    if adaptive_denoise:
+        from . import adaptive_denoise as adaptive
+        # The noise frames are only there until the speech is cut out
+        y, info["denoise"] = timed("denoise", adaptive.adaptive_denoise, y, sr, timestamps)
+        if info["denoise"]["mode"] == "skip":
+            skipped.append("denoise")
+        else:
+            stats["peak"] = None
+
+    if timestamps is not None:
+        from .vad import collect_speech
+        y = timed("collect", collect_speech, y, timestamps)
+
+    if adaptive_denoise:
+        pass  # done above
+    elif always_denoise or (denoise_below_snr_db is not None and stats["snr_db"] < denoise_below_snr_db):
+        y = timed("denoise", denoise, y, sr)
+        # Denoising changes the peak
+        stats["peak"] = None
+    else:
+        skipped.append("denoise")
+
+    if normalize_peak:
+        if stats["peak"] == 1.0:
+            skipped.append("peak_normalize")
+        else:
+            y = timed("peak_normalize", peak_normalize, y, stats["peak"])
+
+    return y, info
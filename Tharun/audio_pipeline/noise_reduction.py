@@ -1,4 +1,9 @@
-import noisereduce as nr
+from lazy import LazyModule
+from stage_profiler import profiled, samples_seconds
 
+nr = LazyModule("noisereduce")
+
+
+@profiled("audio.reduce_noise", samples_seconds)
 def reduce_noise(audio, sr):
     return nr.reduce_noise(y=audio, sr=sr)
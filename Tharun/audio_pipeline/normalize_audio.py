@@ -1,4 +1,8 @@
 import numpy as np
 
+from stage_profiler import profiled
+
+
+@profiled("audio.normalize_audio")
 def normalize_audio(audio):
     return audio / max(abs(audio))
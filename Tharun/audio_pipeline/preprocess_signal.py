@@ -1,7 +1,20 @@
-from .noise_reduction import reduce_noise
-from .normalize_audio import normalize_audio
+import numpy as np
 
-def preprocess_signal(audio, sr):
-    audio = reduce_noise(audio, sr)
-    audio = normalize_audio(audio)
+from .adaptive_denoise import log_decision
+from .front_end import process
+from stage_profiler import profiled, samples_seconds
+
+
+@profiled("audio.preprocess_signal", samples_seconds)
+def preprocess_signal(audio, sr, adaptive_denoise=False, name=None):
+    # Noise reduction + volume normalization through the shared front end.
+    # adaptive_denoise: only denoise when the SNR estimate asks for it;
+    # the decision is logged under name (see adaptive_denoise.py).
+    # process() scales float32 input in place, so it gets a copy: the
+    # caller's array is left as it was
+    audio, info = process(np.array(audio, dtype=np.float32), sr, target_sr=sr,
+                          always_denoise=not adaptive_denoise, adaptive_denoise=adaptive_denoise,
+                          normalize_peak=True)
+    if adaptive_denoise:
+        log_decision(name, info["denoise"])
     return audio
@@ -0,0 +1,147 @@
+"""
+Content-addressed on-disk cache for preprocessing and ASR stages.
+
+Keys form a chain:
+
+    key_0 = hash(audio file bytes)
+    key_n = hash(key_{n-1} + stage name + stage parameters)
+
+so changing a parameter of one stage only changes the keys of that
+stage and the ones after it; a parameter sweep recomputes just the
+downstream stages. NumPy arrays are stored as .npy, anything else as
+JSON. The least recently used entries are evicted once the cache goes
+over max_bytes.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+MISSING = object()
+
+
+def file_hash(path, block_size=1 << 20):
+    """sha256 of a file's contents, read in blocks"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def stage_key(prev_key, stage, params=None):
+    """Key of a stage given the key of its input and its parameters"""
+    payload = json.dumps([prev_key, stage, params or {}], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class StageCache:
+
+    def __init__(self, root, max_bytes=10 * 1024 ** 3):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._file_hashes = {}     # (path, size, mtime) -> content hash
+        os.makedirs(root, exist_ok=True)
+        # Unknown until the first put scans the directory (in evict), so
+        # opening the cache in every worker process costs nothing
+        self.total_bytes = None
+
+    def _entries(self):
+        """(path, size, last used) for every cached file"""
+        for sub in os.listdir(self.root):
+            sub_dir = os.path.join(self.root, sub)
+            if not os.path.isdir(sub_dir):
+                continue
+            for name in os.listdir(sub_dir):
+                if ".tmp" in name:
+                    continue
+                path = os.path.join(sub_dir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _path(self, key, ext):
+        return os.path.join(self.root, key[:2], key + ext)
+
+    def audio_key(self, path):
+        """Content hash of an audio file (remembered per path/size/mtime)"""
+        stat = os.stat(path)
+        ident = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        if ident not in self._file_hashes:
+            self._file_hashes[ident] = file_hash(path)
+        return self._file_hashes[ident]
+
+    def get(self, key):
+        """Cached value for key, or MISSING"""
+        for ext in (".npy", ".json"):
+            path = self._path(key, ext)
+            try:
+                if ext == ".npy":
+                    value = np.load(path)
+                else:
+                    with open(path, "r", encoding="utf-8") as f:
+                        value = json.load(f)
+            except FileNotFoundError:
+                continue
+
+            # Mark as recently used for LRU eviction
+            os.utime(path)
+            return value
+
+        return MISSING
+
+    def put(self, key, value):
+        is_array = isinstance(value, np.ndarray)
+        path = self._path(key, ".npy" if is_array else ".json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            old_size = os.path.getsize(path)
+        except FileNotFoundError:
+            old_size = 0
+
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        if is_array:
+            with open(tmp_path, "wb") as f:
+                np.save(f, value)
+        else:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        if self.total_bytes is None:
+            self.evict()
+            return
+        # An overwrite only adds the difference
+        self.total_bytes += os.path.getsize(path) - old_size
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Scan the cache, then remove least recently used entries until under max_bytes"""
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        self.total_bytes = sum(size for _, size, _ in entries)
+
+        for path, size, _ in entries:
+            if self.total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                self.total_bytes -= size
+            except FileNotFoundError:
+                pass
+
+    def run(self, prev_key, stage, params, fn, *args):
+        """
+        Run one stage through the cache.
+        Returns (key, value); fn(*args) is only called on a miss.
+        """
+        key = stage_key(prev_key, stage, params)
+        value = self.get(key)
+        if value is MISSING:
+            value = fn(*args)
+            self.put(key, value)
+        return key, value
@@ -0,0 +1,504 @@
+"""
+Streaming audio preprocessing.
+
+Same steps as audio_pipeline.preprocess_audio (decode -> 16 kHz mono ->
+noise reduction -> peak normalisation) but done block by block, so
+memory stays bounded however long the recording is:
+
+- decode: soundfile reads fixed-size blocks
+- resample: stateful polyphase FIR (same filter as scipy.signal.resample_poly)
+- noise reduction: noisereduce on overlapping windows, padding trimmed
+  (or, with adaptive_denoise, skip / stationary / non-stationary chosen
+  per window by adaptive_denoise.py)
+- normalisation: running peak (or, with target_lufs, integrated loudness
+  measured block by block), applied in a second pass over a scratch file
+"""
+
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from math import gcd
+
+import numpy as np
+import soundfile as sf
+
+from . import adaptive_denoise as adaptive
+from .audio_store import AudioStoreWriter, to_dtype
+from lazy import LazyModule
+from stage_profiler import profiled
+
+# Imported on first use, so importing this module stays cheap
+nr = LazyModule("noisereduce")
+pyln = LazyModule("pyloudnorm")
+signal = LazyModule("scipy.signal")
+
+
+TARGET_SR = 16000
+
+BLOCK_SIZE = 65536            # decode block, in source samples
+NR_CHUNK_SECONDS = 10         # noise reduction window (centre part)
+NR_PAD_SECONDS = 10           # context on each side, trimmed after reduction
+STORE_AHEAD = 2               # clips per worker in flight when writing an audio store
+
+
+class StreamingResampler:
+    """
+    Polyphase resampler that can be fed one block at a time.
+
+    Uses the same Kaiser FIR and delay compensation as
+    scipy.signal.resample_poly, so the concatenated output matches
+    resample_poly(whole_signal, up, down) up to float rounding.
+    """
+
+    def __init__(self, orig_sr, target_sr):
+        g = gcd(orig_sr, target_sr)
+        self.up = target_sr // g
+        self.down = orig_sr // g
+
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.buffer_start = 0     # input index of buffer[0]
+        self.total_in = 0
+        self.next_out = 0
+
+        if self.up == self.down:
+            return
+
+        max_rate = max(self.up, self.down)
+        self.half_len = 10 * max_rate
+        h = signal.firwin(2 * self.half_len + 1, 1.0 / max_rate, window=("kaiser", 5.0))
+        h = h * self.up
+
+        # Polyphase matrix: phases[p, j] = h[p + j * up]
+        self.taps = -(-len(h) // self.up)
+        h = np.concatenate([h, np.zeros(self.taps * self.up - len(h))])
+        self.phases = h.reshape(self.taps, self.up).T.astype(np.float32)
+
+    def _base(self, n):
+        return (n * self.down + self.half_len) // self.up
+
+    def _compute(self, n_stop):
+        n = np.arange(self.next_out, n_stop)
+        if len(n) == 0:
+            return np.zeros(0, dtype=np.float32)
+
+        m = n * self.down + self.half_len
+        base = m // self.up
+        phase = m % self.up
+
+        # Input indices needed by each output sample; outside [0, total_in) is zero
+        idx = base[:, None] - np.arange(self.taps)[None, :] - self.buffer_start
+        valid = (idx >= 0) & (idx < len(self.buffer))
+        samples = np.where(valid, self.buffer[np.clip(idx, 0, max(len(self.buffer) - 1, 0))], 0.0)
+
+        out = np.einsum("ij,ij->i", samples, self.phases[phase]).astype(np.float32)
+        self.next_out = n_stop
+
+        # Drop input nobody will need again
+        keep_from = self._base(self.next_out) - self.taps + 1 - self.buffer_start
+        if keep_from > 0:
+            self.buffer = self.buffer[keep_from:]
+            self.buffer_start += keep_from
+
+        return out
+
+    def process(self, block):
+        """Feed a block of input samples, return the output ready so far"""
+        if self.up == self.down:
+            return block.astype(np.float32, copy=False)
+
+        self.buffer = np.concatenate([self.buffer, block.astype(np.float32, copy=False)])
+        self.total_in += len(block)
+
+        # Output n is ready once its newest input sample has arrived
+        n_stop = (self.total_in * self.up - self.half_len - 1) // self.down + 1
+        return self._compute(max(n_stop, self.next_out))
+
+    def flush(self):
+        """Return the remaining output once the input has ended"""
+        if self.up == self.down:
+            return np.zeros(0, dtype=np.float32)
+
+        n_total = -(-self.total_in * self.up // self.down)
+        return self._compute(n_total)
+
+
+class StreamingNoiseReducer:
+    """
+    Runs noisereduce over windows of chunk + padding on each side and keeps
+    only the centre chunk, so every output sample sees the same context as
+    in a whole-signal run. The non-stationary gate smooths over ~2 s, so
+    10 s of padding keeps the difference from a whole-signal run < 0.1%.
+
+    adaptive_denoise=True decides per window whether and how to reduce
+    (see adaptive_denoise.py); the decisions are kept in self.decisions.
+    The VAD it needs sees every sample once: it runs over chunk-sized
+    pieces as they arrive (a segment cut at a piece edge is joined again)
+    and each window gets its slice of the timestamps.
+    """
+
+    def __init__(self, sr, chunk_seconds=NR_CHUNK_SECONDS, pad_seconds=NR_PAD_SECONDS,
+                 adaptive_denoise=False):
+        self.sr = sr
+        self.chunk = int(chunk_seconds * sr)
+        self.pad = int(pad_seconds * sr)
+        self.adaptive = adaptive_denoise
+        self.decisions = []
+        if adaptive_denoise:
+            adaptive.require_vad()
+
+        self.timestamps = []      # speech segments so far, in stream samples
+        self.vad_done = 0         # samples the VAD has seen
+
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.buffer_start = 0     # sample index of buffer[0]
+        self.emitted = 0          # samples already returned
+
+    def _reduce(self, stop):
+        start = max(0, self.emitted - self.pad)
+        window = self.buffer[start - self.buffer_start:stop - self.buffer_start]
+        end = min(self.emitted + self.chunk, stop)
+
+        if self.adaptive:
+            self._run_vad(stop)
+            reduced, decision = adaptive.adaptive_denoise(window, self.sr, self._window_timestamps(start, stop))
+            decision.update(start_s=round(self.emitted / self.sr, 2),
+                            audio_s=round((end - self.emitted) / self.sr, 3))
+            self.decisions.append(decision)
+        else:
+            reduced = nr.reduce_noise(y=window, sr=self.sr)
+
+        out = reduced[self.emitted - start:end - start]
+        self.emitted = end
+
+        # Keep left context for the next window
+        keep_from = max(0, self.emitted - self.pad) - self.buffer_start
+        self.buffer = self.buffer[keep_from:]
+        self.buffer_start += keep_from
+        self.timestamps = [t for t in self.timestamps if t["end"] > self.buffer_start]
+
+        return out.astype(np.float32, copy=False)
+
+    def _run_vad(self, stop):
+        """Extend self.timestamps up to sample stop, VAD on each new piece once"""
+        from .front_end import speech_timestamps
+        from .vad import VAD_PARAMS
+
+        while self.vad_done < stop:
+            end = min(self.vad_done + self.chunk, stop)
+            piece = self.buffer[self.vad_done - self.buffer_start:end - self.buffer_start]
+            for t in speech_timestamps(piece, self.sr, **VAD_PARAMS):
+                seg_start, seg_end = t["start"] + self.vad_done, t["end"] + self.vad_done
+                if self.timestamps and self.timestamps[-1]["end"] >= seg_start:
+                    self.timestamps[-1]["end"] = seg_end
+                else:
+                    self.timestamps.append({"start": seg_start, "end": seg_end})
+            self.vad_done = end
+
+    def _window_timestamps(self, start, stop):
+        """self.timestamps clipped to [start, stop), relative to start"""
+        return [{"start": max(t["start"], start) - start, "end": min(t["end"], stop) - start}
+                for t in self.timestamps if t["end"] > start and t["start"] < stop]
+
+    def process(self, block):
+        self.buffer = np.concatenate([self.buffer, block])
+        available = self.buffer_start + len(self.buffer)
+
+        outputs = []
+        while available >= self.emitted + self.chunk + self.pad:
+            outputs.append(self._reduce(self.emitted + self.chunk + self.pad))
+
+        if not outputs:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(outputs)
+
+    def flush(self):
+        available = self.buffer_start + len(self.buffer)
+
+        outputs = []
+        while self.emitted < available:
+            outputs.append(self._reduce(available))
+
+        if not outputs:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(outputs)
+
+
+class StreamingLoudness:
+    """
+    Integrated loudness (ITU-R BS.1770, as pyloudnorm.Meter) fed one block
+    at a time. The K-weighting filters keep their state between blocks and
+    only the running energy at each gating block edge is kept (two numbers
+    per 100 ms), so the result matches Meter.integrated_loudness on the
+    whole signal without holding it.
+    """
+
+    def __init__(self, sr):
+        meter = pyln.Meter(sr)
+        self.sr = sr
+        self.block = meter.block_size
+        self.step = 1.0 - meter.overlap
+        self.filters = [(f.b, f.a, f.passband_gain) for f in meter._filters.values()]
+        self.state = [np.zeros(max(len(a), len(b)) - 1) for b, a, _ in self.filters]
+
+        self.length = 0
+        self.energy = 0.0         # sum of squares of the weighted signal so far
+        self.edges = {}           # sample index -> energy before it
+        self.next_lower = 0       # gating blocks whose lower / upper edge is still ahead
+        self.next_upper = 0
+
+    def _bounds(self, j):
+        # Same expressions as Meter.integrated_loudness, so the edges land on the same samples
+        lower = int(self.block * (j * self.step) * self.sr)
+        upper = int(self.block * (j * self.step + 1) * self.sr)
+        return lower, upper
+
+    def _record(self, edge, start, cumulative):
+        self.edges[edge] = self.energy if edge == start else float(cumulative[edge - start - 1])
+
+    def process(self, block):
+        weighted = np.asarray(block, dtype=np.float64)
+        for i, (b, a, gain) in enumerate(self.filters):
+            filtered, self.state[i] = signal.lfilter(b, a, weighted, zi=self.state[i])
+            weighted = gain * filtered
+        cumulative = self.energy + np.cumsum(weighted * weighted)
+
+        start, end = self.length, self.length + len(weighted)
+        while self._bounds(self.next_lower)[0] <= end:
+            self._record(self._bounds(self.next_lower)[0], start, cumulative)
+            self.next_lower += 1
+        while self._bounds(self.next_upper)[1] <= end:
+            self._record(self._bounds(self.next_upper)[1], start, cumulative)
+            self.next_upper += 1
+
+        self.length = end
+        if len(cumulative):
+            self.energy = float(cumulative[-1])
+
+    def loudness(self):
+        """LUFS of everything fed so far (-inf when shorter than one gating block or silent)"""
+        if self.length < self.block * self.sr:
+            return float("-inf")
+        seconds = self.length / self.sr
+        n_blocks = int(np.round((seconds - self.block) / (self.block * self.step))) + 1
+
+        z = np.empty(n_blocks)
+        for j in range(n_blocks):
+            lower, upper = self._bounds(j)
+            upper_energy = self.edges[upper] if upper <= self.length else self.energy
+            z[j] = (upper_energy - self.edges[lower]) / (self.block * self.sr)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            block_lufs = -0.691 + 10.0 * np.log10(z)
+            gated = z[block_lufs >= -70.0]
+            relative = -0.691 + 10.0 * np.log10(gated.mean()) - 10.0 if len(gated) else float("nan")
+            gated = z[(block_lufs > relative) & (block_lufs > -70.0)]
+            return float(-0.691 + 10.0 * np.log10(gated.mean() if len(gated) else 0.0))
+
+
+def output_gain(peak, lufs=None, target_lufs=None):
+    """
+    Gain applied in pass 2: 1 / peak, or with target_lufs the gain to that
+    loudness, capped so the peak stays at 1 (the output is 16-bit PCM)
+    """
+    peak_gain = 1.0 / peak if peak > 0 else 1.0
+    if target_lufs is None or lufs is None or not np.isfinite(lufs):
+        return peak_gain
+    return min(10.0 ** ((target_lufs - lufs) / 20.0), peak_gain)
+
+
+def iter_audio_blocks(path, block_size=BLOCK_SIZE):
+    """
+    Yield (mono float32 block, sample rate) from an audio file.
+    Falls back to a full librosa decode if libsndfile cannot read the format.
+    """
+    try:
+        f = sf.SoundFile(path)
+    except RuntimeError:
+        import librosa
+        audio, sr = librosa.load(path, sr=None, mono=True)
+        for start in range(0, len(audio), block_size):
+            yield audio[start:start + block_size], sr
+        return
+
+    with f:
+        for block in f.blocks(blocksize=block_size, dtype="float32", always_2d=True):
+            yield block.mean(axis=1), f.samplerate
+
+
+def _stream_to_scratch(in_path, scratch_path, target_sr, block_size, adaptive_denoise, target_lufs):
+    """
+    Pass 1: decode, resample, denoise into a float32 scratch file.
+    Returns (pass 2 gain, length, per-window denoise decisions).
+    """
+    resampler = None
+    reducer = StreamingNoiseReducer(target_sr, adaptive_denoise=adaptive_denoise)
+    meter = StreamingLoudness(target_sr) if target_lufs is not None else None
+    peak = 0.0
+    length = 0
+
+    with sf.SoundFile(scratch_path, "w", samplerate=target_sr,
+                      channels=1, subtype="FLOAT") as scratch:
+
+        def write(samples):
+            nonlocal peak, length
+            if len(samples):
+                peak = max(peak, float(np.max(np.abs(samples))))
+                length += len(samples)
+                scratch.write(samples)
+                if meter is not None:
+                    meter.process(samples)
+
+        for block, sr in iter_audio_blocks(in_path, block_size):
+            if resampler is None:
+                resampler = StreamingResampler(sr, target_sr)
+            write(reducer.process(resampler.process(block)))
+
+        if resampler is not None:
+            write(reducer.process(resampler.flush()))
+        write(reducer.flush())
+
+    lufs = meter.loudness() if meter is not None else None
+    return output_gain(peak, lufs, target_lufs), length, reducer.decisions
+
+
+def _log_decisions(in_path, decisions):
+    name = os.path.splitext(os.path.basename(in_path))[0]
+    adaptive.log_decision(name, adaptive.merge_decisions(decisions))
+
+
+@profiled("audio.preprocess_file_streaming")
+def preprocess_file_streaming(in_path, out_path, target_sr=TARGET_SR,
+                              block_size=BLOCK_SIZE, adaptive_denoise=False, target_lufs=None):
+    """
+    Stream one file through resample -> noise reduction -> peak normalisation
+    and write a 16-bit WAV to out_path. Returns the number of output samples.
+    With adaptive_denoise the per-window decisions go to the denoise log.
+    With target_lufs the output is normalised to that loudness instead
+    (see output_gain).
+    """
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    scratch_path = out_path + ".partial.wav"
+    tmp_path = out_path + ".tmp.wav"
+
+    gain, length, decisions = _stream_to_scratch(in_path, scratch_path, target_sr, block_size,
+                                                 adaptive_denoise, target_lufs)
+
+    # Pass 2: apply the gain and write the final WAV atomically
+    with sf.SoundFile(scratch_path) as scratch, \
+            sf.SoundFile(tmp_path, "w", samplerate=target_sr, channels=1) as out:
+        for block in scratch.blocks(blocksize=block_size, dtype="float32"):
+            out.write(block * gain)
+
+    os.replace(tmp_path, out_path)
+    os.remove(scratch_path)
+
+    if adaptive_denoise:
+        _log_decisions(in_path, decisions)
+
+    return length
+
+
+@profiled("audio.preprocess_to_array")
+def preprocess_to_array(in_path, target_sr=TARGET_SR, block_size=BLOCK_SIZE,
+                        adaptive_denoise=False, target_lufs=None, dtype="int16"):
+    """
+    Same as preprocess_file_streaming but returns (samples, sr) in the audio
+    store's sample type instead of writing a WAV. Only the scratch file and
+    the final samples are held, not the float signal.
+    """
+    fd, scratch_path = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+    try:
+        gain, length, decisions = _stream_to_scratch(in_path, scratch_path, target_sr, block_size,
+                                                     adaptive_denoise, target_lufs)
+        gain = np.float32(gain)
+        samples = np.empty(length, dtype=dtype)
+        pos = 0
+        with sf.SoundFile(scratch_path) as scratch:
+            for block in scratch.blocks(blocksize=block_size, dtype="float32"):
+                samples[pos:pos + len(block)] = to_dtype(block * gain, dtype)
+                pos += len(block)
+    finally:
+        os.remove(scratch_path)
+
+    if adaptive_denoise:
+        _log_decisions(in_path, decisions)
+
+    return samples, target_sr
+
+
+def _preprocess_job(job):
+    in_path, out_path, adaptive_denoise, target_lufs = job
+    try:
+        preprocess_file_streaming(in_path, out_path, adaptive_denoise=adaptive_denoise, target_lufs=target_lufs)
+        return os.path.basename(in_path), None
+    except Exception as e:
+        return os.path.basename(in_path), str(e) or e.__class__.__name__
+
+
+def _preprocess_to_array_job(job):
+    """Preprocess and hand the int16 samples back to the parent"""
+    in_path, adaptive_denoise, target_lufs = job
+    try:
+        clip = preprocess_to_array(in_path, adaptive_denoise=adaptive_denoise, target_lufs=target_lufs)
+        return os.path.basename(in_path), clip, None
+    except Exception as e:
+        return os.path.basename(in_path), None, str(e) or e.__class__.__name__
+
+
+def run_streaming_preprocessing(raw_dir, clean_dir, num_workers=None, store_dir=None,
+                                adaptive_denoise=False, target_lufs=None):
+    """
+    Preprocess every MP3 in raw_dir into clean_dir, one file per
+    worker process. With store_dir, clips go into a sharded audio store
+    (see audio_store.py) instead of one WAV each; only the parent
+    process writes to it, and at most STORE_AHEAD clips per worker are in
+    flight so memory stays bounded. Returns the list of files that failed.
+    """
+    if adaptive_denoise:
+        adaptive.require_vad()
+    files = sorted(f for f in os.listdir(raw_dir) if f.lower().endswith(".mp3"))
+    failed = []
+
+    if store_dir:
+        ahead = STORE_AHEAD * (num_workers or os.cpu_count() or 1)
+        jobs = iter([(os.path.join(raw_dir, f), adaptive_denoise, target_lufs) for f in files])
+        with ProcessPoolExecutor(max_workers=num_workers) as pool, \
+                AudioStoreWriter(store_dir) as writer:
+            pending = deque()
+            while True:
+                # Keep the pool busy, but never more than `ahead` clips queued or waiting
+                for job in jobs:
+                    pending.append(pool.submit(_preprocess_to_array_job, job))
+                    if len(pending) >= ahead:
+                        break
+                if not pending:
+                    break
+                file, clip, error = pending.popleft().result()
+                if error:
+                    print(f"❌ {file}: {error}")
+                    failed.append(file)
+                else:
+                    writer.add(os.path.splitext(file)[0], *clip)
+                    print("Preprocessed:", file)
+        return failed
+
+    os.makedirs(clean_dir, exist_ok=True)
+
+    jobs = [
+        (os.path.join(raw_dir, file),
+         os.path.join(clean_dir, file.replace(".mp3", ".wav")),
+         adaptive_denoise, target_lufs)
+        for file in files
+    ]
+
+    with ProcessPoolExecutor(max_workers=num_workers) as pool:
+        for file, error in pool.map(_preprocess_job, jobs):
+            if error:
+                print(f"❌ {file}: {error}")
+                failed.append(file)
+            else:
+                print("Preprocessed:", file)
+
+    return failed
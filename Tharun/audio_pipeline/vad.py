@@ -1,41 +1,162 @@
-import torch
+import os
+
 import numpy as np
-from silero_vad import get_speech_timestamps
+from lazy import once
+from stage_profiler import profiled, samples_seconds
+
+# Local copy of the Silero weights, used first so VAD works offline.
+# Save one with: python -m audio_pipeline.vad --cache
+SILERO_PATH = os.environ.get("SILERO_VAD_PATH", "models/silero_vad.jit")
+
+def _hub_vad():
+    """(model, utils) from torch.hub; downloads once, then uses the hub cache"""
+    import torch
+    return torch.hub.load('snakers4/silero-vad', 'silero_vad', force_reload=False)
+
+def new_vad_model():
+    """
+    A new Silero model instance (with its own RNN state):
+    SILERO_PATH if present, else the weights bundled with the silero-vad
+    package, else torch.hub (downloads once; a copy is then saved to SILERO_PATH)
+    """
+    if os.path.exists(SILERO_PATH):
+        import torch
+        return torch.jit.load(SILERO_PATH, map_location="cpu").eval()
+
+    try:
+        from silero_vad import load_silero_vad
+        return load_silero_vad()
+    except ImportError:
+        pass
+
+    model, _ = _hub_vad()
+    try:
+        save_vad(model)
+    except OSError as e:
+        print(f"  ⚠ Could not save Silero VAD to {SILERO_PATH}: {e}")
+    return model
+
+@once
+def load_vad():
+    """(model, get_speech_timestamps) shared by the batch VAD, loaded on first use"""
+    model = new_vad_model()
+    try:
+        from silero_vad import get_speech_timestamps
+    except ImportError:
+        # torch.hub utils: (get_speech_timestamps, save_audio, read_audio, ...)
+        get_speech_timestamps = _hub_vad()[1][0]
+
+    return model, get_speech_timestamps
+
+def save_vad(model=None, path=SILERO_PATH):
+    """Write the Silero TorchScript model to path for offline use"""
+    import torch
+
+    model = model if model is not None else load_vad()[0]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    torch.jit.save(model, path + ".tmp")
+    os.replace(path + ".tmp", path)
+    return path
+
+def __getattr__(name):
+    # Old code used vad.model / vad.get_speech_timestamps as module globals
+    if name == "model":
+        return load_vad()[0]
+    if name == "get_speech_timestamps":
+        return load_vad()[1]
+    raise AttributeError(name)
 
-model, utils = torch.hub.load(
-    'snakers4/silero-vad',
-    'silero_vad',
-    force_reload=False
+VAD_PARAMS = dict(
+    threshold=0.3,           # LESS aggressive
+    min_speech_duration_ms=250,
+    min_silence_duration_ms=100
 )
 
-(get_speech_timestamps, _, _, _, _) = utils
+def speech_mask(num_samples, timestamps):
+    """Boolean mask that is True inside every speech segment"""
+    mask = np.zeros(num_samples, dtype=bool)
+    for t in timestamps:
+        mask[t['start']:t['end']] = True
+    return mask
+
+def collect_speech(audio, timestamps):
+    """
+    Concatenate the speech segments of audio into one preallocated
+    buffer (copying slice views, no per-sample Python objects)
+    """
+    total = sum(t['end'] - t['start'] for t in timestamps)
+    speech = np.empty(total, dtype=audio.dtype)
+
+    pos = 0
+    for t in timestamps:
+        segment = audio[t['start']:t['end']]
+        speech[pos:pos + len(segment)] = segment
+        pos += len(segment)
+
+    return speech[:pos]
 
-def apply_vad(audio, sr):
+@profiled("audio.vad", samples_seconds)
+def apply_vad(audio, sr, return_timestamps=False):
+    """
+    Keep only the speech parts of audio.
+    With return_timestamps=True returns (speech, timestamps) so later
+    stages can reuse the segments.
+    """
     # Defensive check
     if audio is None or len(audio) == 0:
-        return audio
+        return (audio, []) if return_timestamps else audio
 
-    audio = np.array(audio)
+    audio = np.asarray(audio)
+    model, get_speech_timestamps = load_vad()
 
     timestamps = get_speech_timestamps(
         audio,
         model,
         sampling_rate=sr,
-        threshold=0.3,           # LESS aggressive
-        min_speech_duration_ms=250,
-        min_silence_duration_ms=100
+        **VAD_PARAMS
     )
 
     # 🔑 Fallback: if VAD removes everything, return original audio
     if not timestamps:
         print("  ⚠ VAD found no speech, returning original audio")
-        return audio
+        return (audio, []) if return_timestamps else audio
 
-    speech = []
-    for t in timestamps:
-        speech.extend(audio[t['start']:t['end']])
+    speech = collect_speech(audio, timestamps)
 
-    return np.array(speech)
+    return (speech, timestamps) if return_timestamps else speech
+
+@profiled("audio.vad_batch")
+def apply_vad_batch(clips, sr, batch_size=None):
+    """
+    Run VAD over a list of clips, many clips per Silero call
+    (audio_pipeline/batched_vad.py, same timestamps as apply_vad).
+    Returns a list of (speech, timestamps).
+    """
+    from .batched_vad import BATCH_SIZE, BatchedVAD
+
+    clips = [np.asarray(clip) if clip is not None else clip for clip in clips]
+    active = [i for i, clip in enumerate(clips) if clip is not None and len(clip)]
+    # Own model (batched_vad.load_batch_model): batching resets and resizes
+    # the RNN state, which must not hit the shared apply_vad model
+    vad = BatchedVAD(batch_size=batch_size or BATCH_SIZE)
+    found = dict(zip(active, vad.timestamps([clips[i] for i in active], sr, **VAD_PARAMS)))
+
+    results = []
+    for i, clip in enumerate(clips):
+        timestamps = found.get(i, [])
+        if not timestamps:
+            if i in found:
+                print("  ⚠ VAD found no speech, returning original audio")
+            results.append((clip, []))
+        else:
+            results.append((collect_speech(clip, timestamps), timestamps))
+    return results
 
 def energy_vad(audio, threshold=0.01):
     return audio if np.mean(np.abs(audio)) > threshold else audio
+
+if __name__ == "__main__":
+    import sys
+
+    if "--cache" in sys.argv:
+        print("✅ Silero VAD saved to", save_vad())
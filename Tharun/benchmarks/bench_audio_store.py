@@ -0,0 +1,66 @@
+"""
+Reading many short clips: WAV directory (listdir + open per file) vs the
+sharded memory-mapped audio store.
+
+    python -m benchmarks.bench_audio_store [num_clips] [seconds_per_clip]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+
+from audio_pipeline.audio_store import AudioStore, pack_wav_dir
+from benchmarks import synthetic
+
+SR = 16000
+
+
+def read_wav_dir(wav_dir):
+    total = peak = 0
+    for file in sorted(os.listdir(wav_dir)):
+        if file.endswith(".wav"):
+            audio, _ = sf.read(os.path.join(wav_dir, file), dtype="int16")
+            total += len(audio)
+            peak = max(peak, int(np.abs(audio).max()))
+    return total, peak
+
+
+def read_store(store_dir):
+    total = peak = 0
+    with AudioStore(store_dir) as store:
+        for _, audio, _ in store:
+            total += len(audio)
+            # Touch every sample so the mapped pages are really read
+            peak = max(peak, int(np.abs(audio).max()))
+    return total, peak
+
+
+def main():
+    num_clips = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+
+    clip = synthetic.add_noise(synthetic.speech_like(seconds, SR), 20)
+    with tempfile.TemporaryDirectory() as tmp:
+        wav_dir = os.path.join(tmp, "wav")
+        store_dir = os.path.join(tmp, "store")
+        os.makedirs(wav_dir)
+        for i in range(num_clips):
+            sf.write(os.path.join(wav_dir, f"clip_{i:07d}.wav"), np.roll(clip, i), SR, subtype="PCM_16")
+
+        start = time.perf_counter()
+        pack_wav_dir(wav_dir, store_dir)
+        print(f"Clips: {num_clips} x {seconds:g}s | pack: {time.perf_counter() - start:.2f}s")
+
+        for name, fn, path in [("wav directory", read_wav_dir, wav_dir), ("audio store", read_store, store_dir)]:
+            start = time.perf_counter()
+            samples, _ = fn(path)
+            elapsed = time.perf_counter() - start
+            print(f"  {name:<14}: {num_clips / elapsed:9.0f} clips/s  ({samples / SR / 3600:.2f} h of audio)")
+
+
+if __name__ == "__main__":
+    main()
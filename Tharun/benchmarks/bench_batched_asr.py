@@ -0,0 +1,49 @@
+"""
+CPU benchmark: per-file transcribe_audio loop vs batched decoding.
+
+Run from the Tharun folder on a folder of short clips:
+
+    python -m benchmarks.bench_batched_asr data/clean_audio/Hindi [max_files] [language]
+"""
+
+import os
+import sys
+import time
+
+from asr.batched_transcribe import transcribe_batch
+from asr.model_registry import get_model
+from asr.transcribe import MODEL_SIZE, transcribe_audio
+
+BATCH_SIZES = [1, 4, 8, 16, 32]
+
+
+def main():
+    clip_dir = sys.argv[1]
+    max_files = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    language = sys.argv[3] if len(sys.argv) > 3 else None
+
+    paths = sorted(
+        os.path.join(clip_dir, f) for f in os.listdir(clip_dir)
+        if f.lower().endswith(".wav")
+    )[:max_files]
+
+    # Load the model up front so neither path pays for it
+    get_model(MODEL_SIZE, device="cpu")
+
+    print(f"Clips: {len(paths)} | Model: {MODEL_SIZE}")
+
+    start = time.perf_counter()
+    for path in paths:
+        transcribe_audio(path)
+    elapsed = time.perf_counter() - start
+    print(f"  per-file loop  : {len(paths) / elapsed:6.2f} files/s")
+
+    for batch_size in BATCH_SIZES:
+        start = time.perf_counter()
+        transcribe_batch(paths, [language] * len(paths), batch_size=batch_size, model_size=MODEL_SIZE)
+        elapsed = time.perf_counter() - start
+        print(f"  batch_size={batch_size:<4}: {len(paths) / elapsed:6.2f} files/s")
+
+
+if __name__ == "__main__":
+    main()
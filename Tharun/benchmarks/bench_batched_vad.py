@@ -0,0 +1,56 @@
+"""
+Silero VAD per file (get_speech_timestamps) vs batched (audio_pipeline.batched_vad),
+in hours of audio per CPU-minute, on synthetic clips.
+
+Needs torch and Silero (like the vad benchmark of the suite):
+
+    python -m benchmarks.bench_batched_vad [clips] [batch_size ...]
+"""
+
+import sys
+import time
+
+from audio_pipeline.batched_vad import BatchedVAD
+from audio_pipeline.vad import VAD_PARAMS, load_vad
+from benchmarks import synthetic
+
+SR = 16000
+
+
+def timed(label, audio_s, fn):
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    out = fn()
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    print(f"  {label:<28} {wall:7.2f}s wall {cpu:7.2f}s CPU  "
+          f"{audio_s / 3600 / (cpu / 60):7.2f} h audio / CPU-minute  {audio_s / wall:7.0f}x realtime")
+    return out
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    batch_sizes = [int(b) for b in sys.argv[2:]] or [16, 64, 256]
+
+    clips = synthetic.audio_clips(count, 2.0, 20.0, sr=SR)
+    audio_s = sum(len(c) for c in clips) / SR
+    print(f"Clips: {count} ({audio_s / 3600:.2f} h of audio)")
+
+    import torch
+
+    model, get_speech_timestamps = load_vad()
+    get_speech_timestamps(torch.from_numpy(clips[0]), model, sampling_rate=SR, **VAD_PARAMS)
+    expected = timed("per file", audio_s, lambda: [
+        get_speech_timestamps(torch.from_numpy(c), model, sampling_rate=SR, **VAD_PARAMS) for c in clips
+    ])
+
+    for batch_size in batch_sizes:
+        vad = BatchedVAD(model, batch_size)
+        got = timed(f"batched, {batch_size} per call", audio_s, lambda: vad.timestamps(clips, SR, **VAD_PARAMS))
+        stats = vad.stats()
+        print(f"  {'':<28} {stats['model_calls']} model calls, window utilisation {stats['utilisation']}, "
+              f"same timestamps: {got == expected}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Bootstrap CIs, paired test and group-by on a large synthetic error table.
+
+    python -m benchmarks.bench_error_table [rows] [iterations]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from evaluation.error_table import ErrorTable, bootstrap_ci, compare, summarize
+
+
+def synthetic_table(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    ref_words = rng.integers(3, 30, rows)
+    ref_chars = ref_words * 5
+    columns = {
+        "id": np.array([f"utt_{i:08d}" for i in range(rows)]),
+        "word_sub": rng.binomial(ref_words, 0.15),
+        "word_ins": rng.binomial(3, 0.1, rows),
+        "word_del": rng.binomial(ref_words, 0.05),
+        "ref_words": ref_words,
+        "char_sub": rng.binomial(ref_chars, 0.07),
+        "char_ins": rng.binomial(5, 0.1, rows),
+        "char_del": rng.binomial(ref_chars, 0.02),
+        "ref_chars": ref_chars,
+        "utterances": np.ones(rows, dtype=np.int32),
+    }
+    columns["sentence_errors"] = (columns["word_sub"] + columns["word_ins"] + columns["word_del"] > 0)
+    table = ErrorTable({k: v if k == "id" else v.astype(np.int32) for k, v in columns.items()})
+    table.add_column("speaker", np.array([f"spk{i % 200}" for i in range(rows)]))
+    table.add_column("snr_db", rng.uniform(0, 40, rows))
+    table.bucket("snr_db", [10, 20, 30])
+    return table
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"  {label:<40} {time.perf_counter() - start:7.2f}s")
+    return result
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    table = synthetic_table(rows)
+    candidate = synthetic_table(rows, seed=1)
+    candidate.columns["id"] = table["id"]
+    print(f"Rows: {rows} | iterations: {iterations}")
+
+    num, den = table.errors("wer")
+    timed("bootstrap CI (WER)", lambda: bootstrap_ci(num, den, iterations))
+    timed("bootstrap CIs (WER/CER/SER), all + 4 SNR slices", lambda: summarize(table, ["snr_db_bucket"], iterations=iterations))
+    timed("group by speaker x SNR bucket", lambda: table.group_by("speaker", "snr_db_bucket"))
+    timed("paired test (WER/CER/SER)", lambda: compare(table, candidate, iterations=iterations))
+
+
+if __name__ == "__main__":
+    main()
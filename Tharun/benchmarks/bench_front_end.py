@@ -0,0 +1,79 @@
+"""
+Per-stage time and peak memory of the shared audio front end.
+
+Synthetic 44.1 kHz audio (tone bursts + noise) goes through resample ->
+loudness -> VAD -> stats -> denoise -> peak normalisation, one stage at
+a time, each measured with tracemalloc (NumPy allocations).
+
+    python -m benchmarks.bench_front_end [seconds] [--no-vad]
+"""
+
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from audio_pipeline import front_end
+
+SOURCE_SR = 44100
+TARGET_LUFS = -20.0
+VAD_PARAMS = {"threshold": 0.5, "min_speech_duration_ms": 250, "min_silence_duration_ms": 100}
+
+
+def synthetic_audio(seconds, sr=SOURCE_SR, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    bursts = (np.sin(2 * np.pi * 0.4 * t) > 0).astype(np.float32)
+    tone = 0.3 * np.sin(2 * np.pi * 180 * t) * bursts
+    return (tone + 0.03 * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def measure(name, fn, *args, **kwargs):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {name:<15} {elapsed * 1000:9.1f} ms  peak {peak / 1e6:8.1f} MB")
+    return result
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1][0].isdigit() else 60
+    use_vad = "--no-vad" not in sys.argv
+
+    # Warm up imports / JIT so they are not timed as part of a stage
+    warm = front_end.resample(synthetic_audio(1), SOURCE_SR)
+    front_end.normalize_loudness(warm, front_end.TARGET_SR, TARGET_LUFS)
+    front_end.denoise(warm, front_end.TARGET_SR)
+    if use_vad:
+        front_end.speech_timestamps(warm, front_end.TARGET_SR, **VAD_PARAMS)
+
+    y = synthetic_audio(seconds)
+    print(f"Audio: {seconds:g}s @ {SOURCE_SR} Hz ({y.nbytes / 1e6:.1f} MB float32)")
+
+    y = measure("resample", front_end.resample, y, SOURCE_SR)
+    sr = front_end.TARGET_SR
+    y, _, _ = measure("loudness", front_end.normalize_loudness, y, sr, TARGET_LUFS)
+
+    timestamps = None
+    if use_vad:
+        timestamps = measure("vad", front_end.speech_timestamps, y, sr, **VAD_PARAMS)
+
+    stats = measure("stats", front_end.signal_stats, y, sr, timestamps)
+
+    speech = y
+    if timestamps:
+        from audio_pipeline.vad import collect_speech
+        speech = measure("collect", collect_speech, y, timestamps)
+
+    speech = measure("denoise", front_end.denoise, speech, sr)
+    measure("peak_normalize", front_end.peak_normalize, speech)
+
+    print(f"  SNR {stats['snr_db']:.1f} dB, speech ratio {stats['speech_ratio']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
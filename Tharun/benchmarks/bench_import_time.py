@@ -0,0 +1,78 @@
+"""
+Import-time cost of each entry module, measured in a fresh interpreter.
+
+For every module: wall time of the import and which heavy libraries it
+pulled in. With lazy loading, importing evaluation code or the ASR
+wrappers should not load torch / faster-whisper / librosa / fastText.
+
+    python -m benchmarks.bench_import_time [repeats]
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+THARUN_DIR = os.path.dirname(HERE)
+TEXT_TASK_DIR = os.path.join(THARUN_DIR, "..", "Shrikant", "Text task")
+
+MODULES = [
+    "evaluate",
+    "evaluation.corpus_metrics",
+    "main",
+    "asr.transcribe",
+    "asr.parallel_transcribe",
+    "asr.batched_transcribe",
+    "audio_pipeline.vad",
+    "audio_pipeline.audio_pipeline",
+    "audio_pipeline.front_end",
+    "text_pipeline",
+]
+
+HEAVY = ["torch", "faster_whisper", "ctranslate2", "librosa", "noisereduce",
+         "scipy.signal", "fasttext", "silero_vad", "jiwer"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([THARUN_DIR, TEXT_TASK_DIR]))
+    proc = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY)],
+        capture_output=True, text=True, cwd=THARUN_DIR, env=env
+    )
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"
+        return None, error
+    return json.loads(proc.stdout.strip().splitlines()[-1]), None
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    print(f"{'module':<32} {'import ms':>10}  heavy modules loaded")
+    for module in MODULES:
+        runs = []
+        error = None
+        for _ in range(repeats):
+            result, error = measure(module)
+            if result is None:
+                break
+            runs.append(result)
+
+        if not runs:
+            print(f"{module:<32} {'-':>10}  ({error})")
+            continue
+        best = min(r["seconds"] for r in runs) * 1000
+        print(f"{module:<32} {best:>10.1f}  {', '.join(runs[0]['loaded']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
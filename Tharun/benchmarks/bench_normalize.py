@@ -0,0 +1,83 @@
+"""
+Text normalisation throughput on a large generated transcript file.
+
+Compares the old per-line normalize_text with the compiled normaliser
+(per line, cached repeats, normalize_many) and checks they agree.
+
+    python -m benchmarks.bench_normalize [lines]
+"""
+
+import os
+import re
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks import synthetic
+from evaluation.normalize_text import _code_tables, get_normalizer, normalize_file
+
+PUNCTUATION = [",", ".", "?", "!", "।", " -", ":"]
+
+
+def legacy_normalize(text):
+    """normalize_text before the compiled normaliser"""
+    text = text.lower()
+    text = re.sub(r"[^\w\s]", "", text)
+    text = text.replace("क लिए", "के लिए")
+    text = text.replace("लए", "लिए")
+    return " ".join(text.split())
+
+
+def transcript_lines(count, seed=0):
+    """text_corpus lines with punctuation, capitals and the odd "के लिए" like real transcripts"""
+    rng = np.random.default_rng(seed)
+    lines = []
+    for i, text in enumerate(synthetic.text_corpus(count, seed=seed)):
+        words = text.split()
+        if i % 4 == 3:
+            words[0] = words[0].capitalize()
+        for j in rng.choice(len(words), size=min(2, len(words)), replace=False):
+            words[j] += PUNCTUATION[rng.integers(len(PUNCTUATION))]
+        if i % 10 == 0:
+            words.insert(len(words) // 2, "के लिए")
+        lines.append(" ".join(words))
+    return lines
+
+
+def timed(label, lines, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    rate = f"{lines / elapsed:>12,.0f} lines/s" if lines else ""
+    print(f"  {label:<36} {elapsed:7.2f}s  {rate}")
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    lines = transcript_lines(count)
+    normalizer = get_normalizer("hi", "eval")
+    print(f"Lines: {count} ({sum(map(len, lines)) / 1e6:.1f}M characters)")
+
+    timed("code point tables (once)", 0, _code_tables)
+    expected = timed("legacy normalize_text", count, lambda: [legacy_normalize(t) for t in lines])
+    single = timed("normalize (no cache)", count, lambda: [normalizer._normalize(t) for t in lines])
+    many = timed("normalize_many", count, lambda: normalizer.normalize_many(lines))
+
+    repeated = lines[:10_000] * (count // 10_000)
+    timed("normalize, 10k references repeated", len(repeated), lambda: [normalizer.normalize(t) for t in repeated])
+    print(f"  same output as legacy: {single == expected and many == expected}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        in_path = os.path.join(tmp, "lines.txt")
+        with open(in_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        for profile in ("eval", "stage1b"):
+            out_path = os.path.join(tmp, f"{profile}.txt")
+            timed(f"normalize_file ({profile})", count, lambda: normalize_file(in_path, out_path, "hi", profile))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Compare the original whole-file preprocessing with the streaming engine.
+
+Reports wall time, peak RSS, output loudness and the difference between
+the two outputs. Run from the Tharun folder:
+
+    python -m benchmarks.compare_preprocessing path/to/audio.mp3 [target_lufs]
+
+With target_lufs the streaming output is loudness-normalised instead of
+peak-normalised, so the sample difference is not meaningful then.
+"""
+
+import multiprocessing as mp
+import os
+import queue
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+
+
+def _legacy(in_path, out_path):
+    import librosa
+    from audio_pipeline.audio_pipeline import preprocess_audio
+
+    audio, sr = librosa.load(in_path, sr=16000, mono=True)
+    sf.write(out_path, preprocess_audio(audio, sr), sr)
+
+
+def _streaming(in_path, out_path, target_lufs=None):
+    from audio_pipeline.audio_pipeline import ADAPTIVE_DENOISE
+    from audio_pipeline.streaming_preprocess import preprocess_file_streaming
+
+    preprocess_file_streaming(in_path, out_path, adaptive_denoise=ADAPTIVE_DENOISE, target_lufs=target_lufs)
+
+
+def _child(fn, args, results):
+    try:
+        start = time.perf_counter()
+        fn(*args)
+        elapsed = time.perf_counter() - start
+        # ru_maxrss is in KB on Linux
+        results.put((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, None))
+    except Exception as e:
+        results.put((None, None, f"{e.__class__.__name__}: {e}"))
+
+
+def run_isolated(fn, *args, poll_s=5):
+    """
+    Run fn(*args) in a fresh process so peak RSS is measured per path.
+    Returns (seconds, peak RSS MB); raises if fn failed or the process died.
+    """
+    ctx = mp.get_context("spawn")
+    results = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(fn, args, results))
+    proc.start()
+    try:
+        while True:
+            try:
+                elapsed, rss, error = results.get(timeout=poll_s)
+                break
+            except queue.Empty:
+                if not proc.is_alive():
+                    # Killed (e.g. by the OOM killer) before it could report
+                    raise RuntimeError(f"{fn.__name__} exited with code {proc.exitcode}")
+    finally:
+        proc.join(timeout=poll_s)
+        if proc.is_alive():
+            proc.terminate()
+    if error:
+        raise RuntimeError(f"{fn.__name__} failed: {error}")
+    return elapsed, rss
+
+
+def loudness(y, sr=16000):
+    import pyloudnorm as pyln
+
+    return pyln.Meter(sr).integrated_loudness(y) if len(y) >= 0.4 * sr else float("-inf")
+
+
+def main():
+    in_path = sys.argv[1]
+    target_lufs = float(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    outputs = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        runs = [("legacy", _legacy, ()), ("streaming", _streaming, (target_lufs,))]
+        for name, fn, extra in runs:
+            path = os.path.join(tmp, f"{name}.wav")
+            try:
+                seconds, rss = run_isolated(fn, in_path, path, *extra)
+            except RuntimeError as e:
+                print(f"❌ {name}: {e}")
+                continue
+            outputs[name] = (sf.read(path, dtype="float32")[0], seconds, rss)
+
+    print(f"File: {in_path}")
+    for name, (y, seconds, rss) in outputs.items():
+        print(f"  {name:<10}: {seconds:7.2f}s  peak RSS {rss:8.1f} MB  "
+              f"{len(y) / 16000:.1f}s of audio  {loudness(y):6.1f} LUFS")
+    if len(outputs) < 2:
+        return
+
+    legacy, stream = outputs["legacy"][0], outputs["streaming"][0]
+    n = min(len(legacy), len(stream))
+    diff = legacy[:n] - stream[:n]
+    rel_rms = np.sqrt(np.mean(diff ** 2)) / (np.sqrt(np.mean(legacy[:n] ** 2)) + 1e-12)
+    print(f"  length    : {len(legacy)} vs {len(stream)} samples")
+    print(f"  max |diff|: {np.max(np.abs(diff)):.5f}  relative RMS diff: {rel_rms:.5f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+"""
+Reproducible end-to-end benchmark suite, fully offline.
+
+Every benchmark runs on deterministic synthetic data (benchmarks/synthetic.py)
+in its own spawned process, so peak memory is per benchmark and imports
+of one stage do not leak into another. Reported per benchmark:
+throughput, p50/p90/p99 latency per item, peak RSS and, for audio,
+seconds of audio processed per wall second.
+
+    python -m benchmarks.suite                     # run, compare with the baseline
+    python -m benchmarks.suite --save-baseline     # run and store as the new baseline
+    python -m benchmarks.suite --quick --only preprocess,evaluation
+
+Benchmarks whose dependencies or models are missing (torch / Silero,
+a local faster-whisper model, fastText, a LID model) are reported as
+skipped instead of downloading anything. The exit code is 1 when a metric
+is worse than the baseline by more than --tolerance.
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks import synthetic
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TEXT_TASK_DIR = os.path.join(HERE, "..", "..", "Shrikant", "Text task")
+BASELINE_PATH = os.path.join(HERE, "baselines", "baseline.json")
+RESULTS_PATH = os.path.join(HERE, "results", "latest.json")
+
+SR = 16000
+SOURCE_SR = 44100
+
+CONFIGS = {
+    "full": {"clips": 40, "min_seconds": 3.0, "max_seconds": 12.0, "texts": 20000, "pairs": 20000,
+             "asr_clips": 16, "asr_model": "tiny", "seed": 0},
+    "quick": {"clips": 8, "min_seconds": 2.0, "max_seconds": 6.0, "texts": 2000, "pairs": 2000,
+              "asr_clips": 4, "asr_model": "tiny", "seed": 0},
+}
+
+# Metrics compared against the baseline and which direction is better
+HIGHER_IS_BETTER = {"throughput": True, "audio_x_realtime": True,
+                    "p50_ms": False, "p99_ms": False, "peak_rss_mb": False}
+
+
+class Skip(Exception):
+    pass
+
+
+def percentile_ms(latencies, p):
+    return float(np.percentile(latencies, p) * 1000) if latencies else None
+
+
+def timed_loop(fn, items):
+    """(total seconds, per-item latencies) of fn over items"""
+    latencies = []
+    start = time.perf_counter()
+    for item in items:
+        t = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - t)
+    return time.perf_counter() - start, latencies
+
+
+def result(items, unit, total_s, latencies, audio_seconds=None, **extra):
+    out = {
+        "status": "ok",
+        "items": items,
+        "unit": unit,
+        "total_s": round(total_s, 4),
+        "throughput": round(items / total_s, 3) if total_s else None,
+        "p50_ms": percentile_ms(latencies, 50),
+        "p90_ms": percentile_ms(latencies, 90),
+        "p99_ms": percentile_ms(latencies, 99),
+    }
+    if audio_seconds:
+        out["audio_s"] = round(audio_seconds, 2)
+        out["audio_x_realtime"] = round(audio_seconds / total_s, 3)
+    out.update(extra)
+    return out
+
+
+def _clips(config, sr=SR, count=None):
+    return synthetic.audio_clips(
+        count or config["clips"], config["min_seconds"], config["max_seconds"], sr=sr, seed=config["seed"]
+    )
+
+
+# ---------------- benchmarks ----------------
+
+def bench_preprocess(config):
+    """In-memory front end: resample 44.1k -> 16k, loudness, stats, SNR-gated denoise, peak"""
+    from audio_pipeline import front_end
+
+    clips = _clips(config, SOURCE_SR)
+    params = {"target_lufs": -20.0, "denoise_below_snr_db": 15.0, "normalize_peak": True}
+    front_end.process(clips[0][:SOURCE_SR].copy(), SOURCE_SR, **params)
+
+    total, latencies = timed_loop(lambda y: front_end.process(y.copy(), SOURCE_SR, **params), clips)
+    return result(len(clips), "clips", total, latencies, sum(len(c) for c in clips) / SOURCE_SR)
+
+
+def bench_streaming_preprocess(config):
+    """File to file: block-wise resample + denoise + peak normalisation"""
+    import soundfile as sf
+    from audio_pipeline.streaming_preprocess import preprocess_file_streaming
+
+    clips = _clips(config, SOURCE_SR)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i, clip in enumerate(clips):
+            path = os.path.join(tmp, f"clip_{i:03d}.wav")
+            sf.write(path, clip, SOURCE_SR)
+            paths.append(path)
+
+        preprocess_file_streaming(paths[0], os.path.join(tmp, "warmup_out.wav"))
+        total, latencies = timed_loop(
+            lambda p: preprocess_file_streaming(p, p.replace(".wav", "_out.wav")), paths
+        )
+    return result(len(clips), "files", total, latencies, sum(len(c) for c in clips) / SOURCE_SR)
+
+
+def bench_vad(config):
+    try:
+        import torch  # noqa: F401
+        from audio_pipeline import front_end
+        front_end.speech_timestamps(np.zeros(SR, dtype=np.float32), SR)
+    except Exception as e:
+        raise Skip(f"Silero VAD unavailable ({e.__class__.__name__}: {e})")
+
+    clips = _clips(config)
+    total, latencies = timed_loop(lambda y: front_end.speech_timestamps(y, SR), clips)
+    return result(len(clips), "clips", total, latencies, sum(len(c) for c in clips) / SR)
+
+
+def bench_vad_batched(config):
+    """Silero on all clips at once, many clips per model call (audio_pipeline/batched_vad.py)"""
+    try:
+        import torch  # noqa: F401
+        from audio_pipeline.batched_vad import BatchedVAD
+        vad = BatchedVAD()
+        vad.timestamps([np.zeros(SR, dtype=np.float32)], SR)
+    except Exception as e:
+        raise Skip(f"Silero VAD unavailable ({e.__class__.__name__}: {e})")
+
+    clips = _clips(config)
+    total, latencies = timed_loop(lambda batch: vad.timestamps(batch, SR), [clips])
+    return result(len(clips), "clips", total, latencies, sum(len(c) for c in clips) / SR)
+
+
+def bench_asr(config):
+    """Whisper on 16 kHz clips; needs the model already in the local cache"""
+    try:
+        from asr.model_registry import get_model
+        model = get_model(config["asr_model"], device="cpu", compute_type="int8", local_files_only=True)
+    except Exception as e:
+        raise Skip(f"no local '{config['asr_model']}' model ({e.__class__.__name__})")
+
+    def transcribe(y):
+        segments, _ = model.transcribe(y, language="hi", beam_size=1)
+        return " ".join(s.text for s in segments)
+
+    clips = _clips(config, count=config["asr_clips"])
+    transcribe(clips[0][:SR])
+    total, latencies = timed_loop(transcribe, clips)
+    return result(len(clips), "clips", total, latencies, sum(len(c) for c in clips) / SR,
+                  model=config["asr_model"])
+
+
+def bench_evaluation(config):
+    """Corpus WER/CER/SER over synthetic reference / hypothesis pairs"""
+    from evaluation.corpus_metrics import ErrorCounts, utterance_counts
+
+    pairs = synthetic.reference_pairs(config["pairs"], seed=config["seed"])
+    totals = ErrorCounts()
+    total, latencies = timed_loop(lambda p: totals.add(utterance_counts(p[1], p[2])), pairs)
+    return result(len(pairs), "utterances", total, latencies,
+                  wer=round(totals.wer, 4), cer=round(totals.cer, 4))
+
+
+def _text_pipeline():
+    if TEXT_TASK_DIR not in sys.path:
+        sys.path.insert(0, TEXT_TASK_DIR)
+    try:
+        import text_pipeline
+    except ImportError as e:
+        raise Skip(f"text_pipeline unavailable ({e})")
+    return text_pipeline
+
+
+def bench_stage1b(config):
+    """Stage 1B validation per language (no LID model needed)"""
+    text_pipeline = _text_pipeline()
+
+    latencies = []
+    total = 0.0
+    count = 0
+    for i, language in enumerate(("hi", "kn", "te")):
+        stage = text_pipeline.Stage1BTextValidation(language)
+        texts = synthetic.sentences(language, config["texts"] // 3, seed=config["seed"] + i)
+        stage.validate_text(texts[0])
+        elapsed, lat = timed_loop(stage.validate_text, texts)
+        total += elapsed
+        latencies += lat
+        count += len(texts)
+    return result(count, "texts", total, latencies)
+
+
+def bench_text_pipeline(config):
+    """ProductionPipeline.process per text and process_batch (needs --lid-model)"""
+    text_pipeline = _text_pipeline()
+    if not config.get("lid_model") or not os.path.exists(config["lid_model"]):
+        raise Skip("no LID model (pass --lid-model path/to/lid.176.bin)")
+
+    pipeline = text_pipeline.ProductionPipeline(lid_model_path=config["lid_model"])
+    texts = synthetic.text_corpus(config["texts"], seed=config["seed"])
+    pipeline.process_batch(texts[:64])
+
+    total, latencies = timed_loop(pipeline.process, texts)
+    start = time.perf_counter()
+    pipeline.process_batch(texts, batch_size=1024)
+    batch_throughput = len(texts) / (time.perf_counter() - start)
+
+    return result(len(texts), "texts", total, latencies, batch_throughput=round(batch_throughput, 1))
+
+
+BENCHMARKS = {
+    "preprocess": bench_preprocess,
+    "streaming_preprocess": bench_streaming_preprocess,
+    "vad": bench_vad,
+    "vad_batched": bench_vad_batched,
+    "asr": bench_asr,
+    "evaluation": bench_evaluation,
+    "stage1b": bench_stage1b,
+    "text_pipeline": bench_text_pipeline,
+}
+
+
+def _run_benchmark(name, config):
+    """Runs in a fresh process so peak RSS belongs to this benchmark alone"""
+    try:
+        out = BENCHMARKS[name](config)
+    except Skip as e:
+        return {"status": "skipped", "reason": str(e)}
+    # ru_maxrss is KB on Linux
+    out["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return out
+
+
+# ---------------- baseline ----------------
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=HERE).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def compare(current, baseline, tolerance):
+    """List of (benchmark, metric, baseline value, current value) regressions"""
+    regressions = []
+    for name, res in current.items():
+        base = baseline.get(name, {})
+        if res.get("status") != "ok" or base.get("status") != "ok":
+            continue
+        for metric, higher_is_better in HIGHER_IS_BETTER.items():
+            old, new = base.get(metric), res.get(metric)
+            if not old or new is None:
+                continue
+            change = (old - new) / old if higher_is_better else (new - old) / old
+            if change > tolerance:
+                regressions.append((name, metric, old, new))
+    return regressions
+
+
+def print_results(results, baseline):
+    print(f"{'benchmark':<22} {'items':>7} {'throughput':>16} {'x realtime':>10} "
+          f"{'p50 ms':>9} {'p99 ms':>9} {'peak MB':>8} {'vs base':>8}")
+    for name, res in results.items():
+        if res["status"] != "ok":
+            print(f"{name:<22} skipped: {res['reason']}")
+            continue
+        base = baseline.get(name, {})
+        delta = "-"
+        if base.get("throughput"):
+            delta = f"{(res['throughput'] / base['throughput'] - 1) * 100:+.0f}%"
+        realtime = f"{res['audio_x_realtime']:.1f}" if res.get("audio_x_realtime") else "-"
+        print(f"{name:<22} {res['items']:>7} {res['throughput']:>9.1f} {res['unit'] + '/s':<6} "
+              f"{realtime:>10} {res['p50_ms']:>9.2f} {res['p99_ms']:>9.2f} "
+              f"{res['peak_rss_mb']:>8.0f} {delta:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite on synthetic data")
+    parser.add_argument("--quick", action="store_true", help="small inputs, for a fast check")
+    parser.add_argument("--only", help="comma-separated benchmark names")
+    parser.add_argument("--lid-model", help="fastText LID model for the text_pipeline benchmark")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--output", default=RESULTS_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="allowed relative slowdown / memory growth before a regression is reported")
+    args = parser.parse_args()
+
+    config = dict(CONFIGS["quick" if args.quick else "full"], lid_model=args.lid_model)
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        stored_config = stored.get("config", {})
+        if all(stored_config.get(key) == config[key] for key in CONFIGS["full"]):
+            baseline = stored["results"]
+        else:
+            print("⚠️ Baseline was recorded with a different config, not comparing")
+
+    ctx = mp.get_context("spawn")
+    results = {}
+    for name in names:
+        print(f"▶️ {name}", flush=True)
+        with ctx.Pool(1) as pool:
+            results[name] = pool.apply(_run_benchmark, (name, config))
+
+    print()
+    print_results(results, baseline)
+
+    report = {"env": environment(), "config": config, "results": results}
+    for path in [args.output] + ([args.baseline] if args.save_baseline else []):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    print(f"\n📝 Results: {args.output}")
+
+    if args.save_baseline:
+        print(f"📌 Saved baseline: {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for name, metric, old, new in regressions:
+        print(f"❌ REGRESSION {name}.{metric}: {old:.3f} -> {new:.3f}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Deterministic synthetic data for the benchmark suite (no downloads).
+
+- audio: voiced "syllables" (harmonic tones with a pitch contour and a
+  syllable-rate envelope) separated by pauses, mixed with white noise at
+  a chosen SNR
+- text: Hindi / Kannada / Telugu words built from consonant + vowel-sign
+  syllables of each script's Unicode block, plus English / romanised
+  filler so LID and Stage 1B see mixed input
+"""
+
+import unicodedata
+
+import numpy as np
+
+# First code point of each script's Unicode block
+SCRIPT_BLOCKS = {"hi": 0x0900, "kn": 0x0C80, "te": 0x0C00}
+
+LATIN_WORDS = ["good", "morning", "how", "are", "you", "today", "kl", "ka", "mausm", "hai", "ok", "please"]
+
+
+# ---------------- audio ----------------
+
+def speech_like(seconds, sr=16000, rng=None, f0=140.0):
+    """Voiced segments of 0.1-0.4 s syllables with 0.2-0.8 s pauses in between"""
+    rng = rng or np.random.default_rng(0)
+    n = int(seconds * sr)
+    y = np.zeros(n, dtype=np.float32)
+
+    pos = int(rng.uniform(0.2, 0.6) * sr)
+    while pos < n:
+        # A word: a few syllables back to back
+        for _ in range(rng.integers(1, 4)):
+            length = min(int(rng.uniform(0.1, 0.4) * sr), n - pos)
+            if length <= 0:
+                break
+            t = np.arange(length) / sr
+            pitch = f0 * (1 + 0.15 * np.sin(2 * np.pi * rng.uniform(1, 4) * t))
+            phase = 2 * np.pi * np.cumsum(pitch) / sr
+            voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+            envelope = np.sin(np.pi * np.arange(length) / length) ** 2
+            y[pos:pos + length] = 0.3 * voiced * envelope
+            pos += length
+        pos += int(rng.uniform(0.2, 0.8) * sr)
+    return y
+
+
+def add_noise(y, snr_db, rng=None):
+    """White noise scaled so speech power / noise power == snr_db"""
+    rng = rng or np.random.default_rng(0)
+    speech = y[np.abs(y) > 1e-4]
+    power = float(np.mean(speech ** 2)) if len(speech) else 1e-4
+    noise = rng.standard_normal(len(y)).astype(np.float32)
+    noise *= np.float32(np.sqrt(power / 10 ** (snr_db / 10)))
+    return y + noise
+
+
+def audio_clips(count, min_seconds=3.0, max_seconds=10.0, sr=16000, snr_db=(5, 30), seed=0):
+    """count noisy clips with lengths and SNRs drawn uniformly from the ranges"""
+    rng = np.random.default_rng(seed)
+    clips = []
+    for _ in range(count):
+        seconds = rng.uniform(min_seconds, max_seconds)
+        y = speech_like(seconds, sr, rng, f0=rng.uniform(100, 220))
+        clips.append(add_noise(y, rng.uniform(*snr_db), rng))
+    return clips
+
+
+# ---------------- text ----------------
+
+def _script_letters(language):
+    """(consonants, common vowel signs) of a script, taken from its Unicode block"""
+    base = SCRIPT_BLOCKS[language]
+    consonants, signs = [], []
+    for code in range(base, base + 0x80):
+        name = unicodedata.name(chr(code), "")
+        if " LETTER " in name and 0x15 <= code - base <= 0x39:
+            consonants.append(chr(code))
+        elif " VOWEL SIGN " in name and 0x3E <= code - base <= 0x4C:
+            signs.append(chr(code))
+    return consonants, signs
+
+
+def make_vocabulary(language, size=500, seed=0):
+    """size distinct pseudo-words of 1-4 syllables in the language's script"""
+    rng = np.random.default_rng(seed)
+    consonants, signs = _script_letters(language)
+    words = set()
+    while len(words) < size:
+        syllables = []
+        for _ in range(rng.integers(1, 5)):
+            syllable = consonants[rng.integers(len(consonants))]
+            if rng.random() < 0.7:
+                syllable += signs[rng.integers(len(signs))]
+            syllables.append(syllable)
+        words.add("".join(syllables))
+    return sorted(words)
+
+
+def sentences(language, count, min_words=3, max_words=12, seed=0):
+    rng = np.random.default_rng(seed)
+    vocabulary = LATIN_WORDS if language == "en" else make_vocabulary(language, seed=seed)
+    return [
+        " ".join(vocabulary[i] for i in rng.integers(len(vocabulary), size=rng.integers(min_words, max_words + 1)))
+        for _ in range(count)
+    ]
+
+
+def text_corpus(count, languages=("hi", "kn", "te", "en"), seed=0):
+    """Interleaved sentences across languages, count in total"""
+    per_language = [sentences(lang, count // len(languages) + 1, seed=seed + i) for i, lang in enumerate(languages)]
+    mixed = [text for group in zip(*per_language) for text in group]
+    return mixed[:count]
+
+
+def corrupt(text, rng, sub=0.08, dele=0.04, ins=0.04):
+    """Hypothesis-like copy of text with random word substitutions / deletions / insertions"""
+    words = text.split()
+    out = []
+    for word in words:
+        r = rng.random()
+        if r < dele:
+            continue
+        if r < dele + sub:
+            word = word[::-1] if len(word) > 1 else word + word
+        out.append(word)
+        if rng.random() < ins:
+            out.append(words[rng.integers(len(words))])
+    return " ".join(out)
+
+
+def reference_pairs(count, languages=("hi", "kn", "te"), seed=0):
+    """(id, reference, hypothesis) triples as evaluate_corpus expects"""
+    rng = np.random.default_rng(seed)
+    references = text_corpus(count, languages, seed)
+    return [(f"utt_{i:06d}", ref, corrupt(ref, rng)) for i, ref in enumerate(references)]
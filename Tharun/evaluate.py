@@ -3,13 +3,19 @@ PHASE 2: ASR Evaluation
 
 - Uses stored hypothesis files
 - Uses a SINGLE reference file (line-wise)
-- Calculates WER / CER / SER
+- Calculates corpus-level WER / CER / SER (errors summed over all files)
+- Writes per-utterance results to RESULTS_FILE and the error counts as a
+  columnar table to RESULTS_TABLE, and prints bootstrap confidence
+  intervals (slices / paired comparisons: python -m evaluation.error_table)
 """
 
 import os
 
-from evaluation.load_reference import load_reference_from_single_file
-from evaluation.calculate_metrics import calculate_metrics
+from audio_pipeline.audio_store import AudioStore
+from evaluation.load_reference import ReferenceStore
+from evaluation.corpus_metrics import evaluate_corpus
+from evaluation.error_table import ErrorTableBuilder, print_summary, summarize
+import stage_profiler
 
 
 # =======================
@@ -19,66 +25,107 @@ from evaluation.calculate_metrics import calculate_metrics
 LANGUAGE = "Hindi"
 
 HYPOTHESIS_DIR = f"data/hypothesis/{LANGUAGE}"
+# .txt (one line per file, Hindi_0001 -> line 1), .tsv (id<TAB>text)
+# or .csv (audio_file,transcript)
 REFERENCE_FILE = f"data/transcripts/{LANGUAGE}/reference.txt"
 
-MAX_FILES = 10   # change to 1, 5, 50, 100
+RESULTS_FILE = f"data/results/{LANGUAGE}/per_utterance.jsonl"
+RESULTS_TABLE = f"data/results/{LANGUAGE}/errors.npz"
 
-# =======================
+BOOTSTRAP_ITERATIONS = 2000   # 0 = no confidence intervals
+# Metadata joined by utterance id for sliced metrics, e.g. the adaptive
+# denoise log (audio_s, snr_db, mode) or a speakers CSV (id,speaker)
+METADATA_FILES = []
+SLICE_BY = []                 # e.g. ["mode"], ["speaker"]
 
+# Take utterance ids from the sharded audio store used in PHASE 1
+# instead of listing HYPOTHESIS_DIR; None = list the directory
+AUDIO_STORE_DIR = None
 
-def main():
-    print("📊 PHASE 2: Evaluation Started")
-    print("📄 Reference file:", REFERENCE_FILE)
+MAX_FILES = 10   # change to 1, 5, 50, 100
+NUM_WORKERS = 1  # > 1 scores pairs across worker processes
+
+PROFILE_FILE = None  # per-stage timings as JSON lines; None to disable
 
-    total_wer = 0.0
-    total_cer = 0.0
-    total_ser = 0
-    processed = 0
+# =======================
 
-    hyp_files = sorted([
-        f for f in os.listdir(HYPOTHESIS_DIR)
-        if f.endswith(".txt")
-    ])
 
+def iter_pairs(hyp_files, references):
+    """Yield (file id, reference, hypothesis) for each hypothesis file"""
     for hyp_file in hyp_files:
-        if processed >= MAX_FILES:
-            break
-
         hyp_path = os.path.join(HYPOTHESIS_DIR, hyp_file)
 
-        print(f"\n▶️ Evaluating: {hyp_file}")
-
-        # Load hypothesis
-        with open(hyp_path, "r", encoding="utf-8") as f:
-            hypothesis = f.read().strip()
+        # Load hypothesis (store ids may not be transcribed yet)
+        try:
+            with open(hyp_path, "r", encoding="utf-8") as f:
+                hypothesis = f.read().strip()
+        except FileNotFoundError:
+            print("⚠️ No hypothesis for", hyp_file)
+            continue
 
         # Load corresponding reference line
-        reference = load_reference_from_single_file(
-            REFERENCE_FILE,
-            hyp_file.replace(".txt", ".wav")
-        )
+        try:
+            reference = references.get(hyp_file.replace(".txt", ".wav"))
+        except KeyError:
+            print("⚠️ No reference for", hyp_file)
+            continue
 
-        wer, cer, ser = calculate_metrics(reference, hypothesis)
+        yield hyp_file.replace(".txt", ""), reference, hypothesis
 
-        print("Reference :", reference)
-        print("Hypothesis:", hypothesis)
-        print(f"WER: {wer:.2f} | CER: {cer:.2f} | SER: {ser}")
 
-        total_wer += wer
-        total_cer += cer
-        total_ser += ser
-        processed += 1
+def main():
+    print("📊 PHASE 2: Evaluation Started")
+    print("📄 Reference file:", REFERENCE_FILE)
 
-    print("\n📈 FINAL AVERAGE METRICS")
-    print("Files evaluated:", processed)
+    if PROFILE_FILE:
+        stage_profiler.enable(PROFILE_FILE)
 
-    if processed > 0:
-        print(f"Average WER: {total_wer / processed:.2f}")
-        print(f"Average CER: {total_cer / processed:.2f}")
-        print(f"Average SER: {total_ser / processed:.2f}")
+    if AUDIO_STORE_DIR:
+        with AudioStore(AUDIO_STORE_DIR) as store:
+            hyp_files = [utt_id + ".txt" for utt_id in store.ids()[:MAX_FILES]]
+    else:
+        hyp_files = sorted([
+            f for f in os.listdir(HYPOTHESIS_DIR)
+            if f.endswith(".txt")
+        ])[:MAX_FILES]
+
+    os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+
+    # Indexed once; each lookup reads only its own line
+    table = ErrorTableBuilder()
+    with ReferenceStore(REFERENCE_FILE) as references:
+        totals = evaluate_corpus(
+            iter_pairs(hyp_files, references),
+            results_path=RESULTS_FILE,
+            num_workers=NUM_WORKERS,
+            table=table
+        )
+    table = table.build()
+    for path in METADATA_FILES:
+        table.join_file(path)
+    table.save(RESULTS_TABLE)
+
+    print("\n📈 FINAL CORPUS METRICS")
+    print("Files evaluated:", totals.utterances)
+
+    if totals.utterances > 0:
+        print(f"WER: {totals.wer:.4f} "
+              f"(S={totals.word_sub} D={totals.word_del} I={totals.word_ins} N={totals.ref_words})")
+        print(f"CER: {totals.cer:.4f} "
+              f"(S={totals.char_sub} D={totals.char_del} I={totals.char_ins} N={totals.ref_chars})")
+        print(f"SER: {totals.ser:.4f}")
+        print("📝 Per-utterance results:", RESULTS_FILE)
+
+        if BOOTSTRAP_ITERATIONS:
+            print()
+            print_summary(summarize(table, SLICE_BY, iterations=BOOTSTRAP_ITERATIONS))
     else:
         print("❌ No files evaluated")
 
+    if PROFILE_FILE and os.path.exists(PROFILE_FILE):
+        print("\n⏱️ Stage profile:", PROFILE_FILE)
+        stage_profiler.print_report(PROFILE_FILE)
+
 
 if __name__ == "__main__":
     main()
@@ -1,7 +1,8 @@
 import jiwer
 from evaluation.normalize_text import normalize_text
+from stage_profiler import profiled
 
-
+@profiled("eval.calculate_metrics")
 def calculate_metrics(reference_text, hypothesis_text):
     """
     Calculate WER, CER, SER between reference and hypothesis text
@@ -0,0 +1,175 @@
+"""
+Corpus-level WER / CER / SER.
+
+- Each (reference, hypothesis) pair is normalised once and aligned once
+  at word level and once at character level
+- Substitution / insertion / deletion counts are summed over the corpus,
+  so WER = (S + D + I) / N over all reference words (micro average)
+- Pairs are scored across a process pool and per-utterance results are
+  streamed to a JSON-lines file
+"""
+
+import json
+import multiprocessing as mp
+from dataclasses import dataclass, asdict
+from functools import partial
+
+from evaluation.normalize_text import DEFAULT_LANGUAGE, get_normalizer, normalize_text
+from stage_profiler import profiled
+
+
+try:
+    from rapidfuzz.distance import Levenshtein
+except ImportError:   # jiwer < 3 does not bring rapidfuzz
+    Levenshtein = None
+
+
+def _edit_ops_python(ref, hyp):
+    """Plain Levenshtein DP returning (substitutions, insertions, deletions)"""
+    # Each cell holds (cost, sub, ins, del)
+    prev = [(j, 0, j, 0) for j in range(len(hyp) + 1)]
+    for i in range(1, len(ref) + 1):
+        cur = [(i, 0, 0, i)]
+        for j in range(1, len(hyp) + 1):
+            if ref[i - 1] == hyp[j - 1]:
+                cur.append(prev[j - 1])
+                continue
+            c, s, n, d = prev[j - 1]
+            best = (c + 1, s + 1, n, d)
+            c, s, n, d = cur[j - 1]
+            if c + 1 < best[0]:
+                best = (c + 1, s, n + 1, d)
+            c, s, n, d = prev[j]
+            if c + 1 < best[0]:
+                best = (c + 1, s, n, d + 1)
+            cur.append(best)
+        prev = cur
+    return prev[-1][1:]
+
+
+def edit_ops(ref, hyp):
+    """
+    Return (substitutions, insertions, deletions) turning ref into hyp.
+    ref / hyp are sequences (word lists or strings).
+    """
+    if Levenshtein is None:
+        return _edit_ops_python(ref, hyp)
+
+    sub = ins = dele = 0
+    for op in Levenshtein.editops(ref, hyp):
+        tag = op[0]
+        if tag == "replace":
+            sub += 1
+        elif tag == "insert":
+            ins += 1
+        else:
+            dele += 1
+    return sub, ins, dele
+
+
+@dataclass
+class ErrorCounts:
+    """Edit operation counts for one utterance or a whole corpus"""
+    word_sub: int = 0
+    word_ins: int = 0
+    word_del: int = 0
+    ref_words: int = 0
+    char_sub: int = 0
+    char_ins: int = 0
+    char_del: int = 0
+    ref_chars: int = 0
+    sentence_errors: int = 0
+    utterances: int = 0
+
+    def add(self, other):
+        for field in self.__dataclass_fields__:
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+
+    @property
+    def wer(self):
+        errors = self.word_sub + self.word_ins + self.word_del
+        return errors / self.ref_words if self.ref_words else 0.0
+
+    @property
+    def cer(self):
+        errors = self.char_sub + self.char_ins + self.char_del
+        return errors / self.ref_chars if self.ref_chars else 0.0
+
+    @property
+    def ser(self):
+        return self.sentence_errors / self.utterances if self.utterances else 0.0
+
+
+@profiled("eval.utterance_counts")
+def utterance_counts(reference_text, hypothesis_text, normalize=normalize_text):
+    """Normalise once (normalize_text unless given), then count word and character edits"""
+    ref = normalize(reference_text)
+    hyp = normalize(hypothesis_text)
+
+    ref_words = ref.split()
+    w_sub, w_ins, w_del = edit_ops(ref_words, hyp.split())
+    c_sub, c_ins, c_del = edit_ops(ref, hyp)
+
+    return ErrorCounts(
+        w_sub, w_ins, w_del, len(ref_words),
+        c_sub, c_ins, c_del, len(ref),
+        0 if ref == hyp else 1, 1
+    )
+
+
+def _score(pair, language=DEFAULT_LANGUAGE, profile="eval"):
+    utt_id, reference, hypothesis = pair
+    if (language, profile) == (DEFAULT_LANGUAGE, "eval"):
+        normalize = normalize_text
+    else:
+        normalize = get_normalizer(language, profile).normalize
+    return utt_id, reference, hypothesis, utterance_counts(reference, hypothesis, normalize)
+
+
+@profiled("eval.evaluate_corpus")
+def evaluate_corpus(pairs, results_path=None, num_workers=1, chunksize=256, table=None,
+                    language=DEFAULT_LANGUAGE, profile="eval"):
+    """
+    Score an iterable of (utt_id, reference, hypothesis) and return the
+    corpus ErrorCounts. If results_path is set, one JSON line per
+    utterance is written there in input order. table: an
+    error_table.ErrorTableBuilder that receives every utterance's counts.
+    language / profile: normalize_text.PROFILES entry both texts go through
+    """
+    score = partial(_score, language=language, profile=profile)
+    total = ErrorCounts()
+    out = open(results_path, "w", encoding="utf-8") if results_path else None
+
+    if num_workers > 1:
+        pool = mp.get_context("spawn").Pool(num_workers)
+        scored = pool.imap(score, pairs, chunksize=chunksize)
+    else:
+        pool = None
+        scored = map(score, pairs)
+
+    try:
+        for utt_id, reference, hypothesis, counts in scored:
+            total.add(counts)
+            if table is not None:
+                table.add(utt_id, counts)
+
+            if out:
+                row = {
+                    "id": utt_id,
+                    "reference": reference,
+                    "hypothesis": hypothesis,
+                    "wer": round(counts.wer, 4),
+                    "cer": round(counts.cer, 4),
+                    "ser": counts.sentence_errors,
+                }
+                row.update(asdict(counts))
+                del row["sentence_errors"], row["utterances"]
+                out.write(json.dumps(row, ensure_ascii=False) + "\n")
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        if out:
+            out.close()
+
+    return total
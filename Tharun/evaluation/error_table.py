@@ -0,0 +1,392 @@
+"""
+Per-utterance error counts as a NumPy columnar table, with bootstrap
+confidence intervals, paired significance tests and sliced metrics.
+
+- one int32 array per ErrorCounts field plus any metadata columns
+  (duration, SNR bucket, speaker, ...), saved as a single .npz
+- metrics stay micro averages: WER = sum(S + D + I) / sum(N) over the rows
+- resampling is vectorised: identical rows are collapsed first (counts
+  are small integers, so a million utterances have a few thousand
+  distinct rows) and each bootstrap replicate is a multinomial draw over
+  the distinct rows, i.e. exactly a row resample, at O(distinct) cost
+- the paired test flips the sign of per-utterance error differences the
+  same way (binomial draws per distinct |difference|)
+
+    python -m evaluation.error_table summary per_utterance.jsonl [--meta denoise_log.jsonl]
+        [--by speaker] [--bucket snr_db=0,10,20,30] [--iterations 2000]
+    python -m evaluation.error_table compare baseline.jsonl candidate.jsonl [--by ...]
+
+Tables can be given as evaluate.py's per-utterance JSON lines or .npz.
+"""
+
+import argparse
+import csv
+import json
+from array import array
+
+import numpy as np
+
+from evaluation.corpus_metrics import ErrorCounts
+from evaluation.load_reference import utterance_key
+
+COUNT_FIELDS = [f for f in ErrorCounts.__dataclass_fields__]
+
+METRICS = {
+    "wer": (("word_sub", "word_ins", "word_del"), "ref_words"),
+    "cer": (("char_sub", "char_ins", "char_del"), "ref_chars"),
+    "ser": (("sentence_errors",), "utterances"),
+}
+
+ITERATIONS = 2000
+CONFIDENCE = 0.95
+BLOCK = 256               # bootstrap replicates drawn at a time
+
+
+class ErrorTableBuilder:
+    """Collects rows one by one (e.g. from evaluate_corpus) in typed arrays"""
+
+    def __init__(self):
+        self.ids = []
+        self.counts = {f: array("i") for f in COUNT_FIELDS}
+
+    def add(self, utt_id, counts):
+        self.ids.append(utt_id)
+        for f in COUNT_FIELDS:
+            self.counts[f].append(getattr(counts, f))
+
+    def build(self):
+        columns = {"id": np.array(self.ids, dtype=str)}
+        for f in COUNT_FIELDS:
+            columns[f] = np.frombuffer(self.counts[f], dtype=np.int32).copy()
+        return ErrorTable(columns)
+
+
+class ErrorTable:
+    """Columns of equal length: "id", the ErrorCounts fields and metadata"""
+
+    def __init__(self, columns):
+        self.columns = dict(columns)
+
+    def __len__(self):
+        return len(self.columns["id"])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    # ---------------- io ----------------
+
+    @classmethod
+    def from_results(cls, path):
+        """Table from evaluate.py's per-utterance JSON lines"""
+        builder = ErrorTableBuilder()
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    row.setdefault("sentence_errors", row.get("ser", 0))
+                    row.setdefault("utterances", 1)
+                    builder.add(row["id"], ErrorCounts(**{k: row[k] for k in COUNT_FIELDS}))
+        return builder.build()
+
+    @classmethod
+    def load(cls, path):
+        """.npz written by save(), or per-utterance JSON lines"""
+        if not path.endswith(".npz"):
+            return cls.from_results(path)
+        with np.load(path, allow_pickle=False) as data:
+            return cls({name: data[name] for name in data.files})
+
+    def save(self, path):
+        np.savez_compressed(path, **self.columns)
+
+    # ---------------- columns ----------------
+
+    def add_column(self, name, values):
+        values = np.asarray(values)
+        if len(values) != len(self):
+            raise ValueError(f"column {name}: {len(values)} values for {len(self)} rows")
+        self.columns[name] = values
+
+    def join(self, ids, columns):
+        """
+        Add metadata columns given for (possibly other-ordered, partial)
+        ids. Missing rows get NaN (numbers) or "" (text).
+        """
+        keys = np.array([utterance_key(str(i)) for i in ids], dtype=str)
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+
+        pos = np.searchsorted(keys, self.columns["id"])
+        pos = np.minimum(pos, max(len(keys) - 1, 0))
+        found = (keys[pos] == self.columns["id"]) if len(keys) else np.zeros(len(self), dtype=bool)
+
+        for name, values in columns.items():
+            values = np.asarray(values)[order]
+            try:
+                values = values.astype(np.float64)
+                out = np.full(len(self), np.nan)
+            except ValueError:
+                values = values.astype(str)
+                out = np.full(len(self), "", dtype=values.dtype)
+            out[found] = values[pos[found]]
+            self.columns[name] = out
+
+    def join_file(self, path, columns=None):
+        """
+        Metadata from JSON lines (e.g. the adaptive denoise log) or CSV,
+        keyed by "id" (or "audio_file" / the first CSV column)
+        """
+        if path.endswith(".csv"):
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                rows = list(csv.DictReader(f))
+            key = "id" if rows and "id" in rows[0] else ("audio_file" if rows and "audio_file" in rows[0]
+                                                         else (list(rows[0])[0] if rows else "id"))
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+            key = "id"
+
+        names = columns or [k for k in (rows[0] if rows else {})
+                            if k != key and not isinstance(rows[0][k], (dict, list))]
+        self.join([r[key] for r in rows],
+                  {name: [r.get(name) if r.get(name) is not None else np.nan for r in rows] for name in names})
+
+    def bucket(self, column, edges, name=None):
+        """Numeric column -> text buckets such as "10-20" (NaN -> "unknown")"""
+        values = self.columns[column].astype(np.float64)
+        edges = list(edges)
+        labels = np.array([f"<{edges[0]:g}"]
+                          + [f"{lo:g}-{hi:g}" for lo, hi in zip(edges, edges[1:])]
+                          + [f">={edges[-1]:g}", "unknown"])
+        index = np.digitize(values, edges)
+        index[np.isnan(values)] = len(labels) - 1
+        self.columns[name or f"{column}_bucket"] = labels[index]
+
+    # ---------------- metrics ----------------
+
+    def errors(self, metric):
+        """(errors per row, denominator per row) of a metric"""
+        numerators, denominator = METRICS[metric]
+        num = sum(self.columns[f].astype(np.int64) for f in numerators)
+        return num, self.columns[denominator].astype(np.int64)
+
+    def totals(self, rows=None):
+        counts = ErrorCounts()
+        for f in COUNT_FIELDS:
+            column = self.columns[f] if rows is None else self.columns[f][rows]
+            setattr(counts, f, int(column.sum()))
+        return counts
+
+    def group_by(self, *columns):
+        """{group key: row indices}, keys as tuples when grouping by several columns"""
+        keys = [np.unique(self.columns[c], return_inverse=True) for c in columns]
+        combined = np.zeros(len(self), dtype=np.int64)
+        for uniques, inverse in keys:
+            combined = combined * len(uniques) + inverse
+        groups, inverse = np.unique(combined, return_inverse=True)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.cumsum(np.bincount(inverse, minlength=len(groups)))[:-1]
+
+        result = {}
+        for rows in np.split(order, bounds):
+            key = tuple(self.columns[c][rows[0]].item() for c in columns)
+            result[key if len(columns) > 1 else key[0]] = rows
+        return result
+
+
+# ---------------- resampling ----------------
+
+def _ratio(num, den):
+    return np.divide(num, den, out=np.zeros_like(num, dtype=np.float64), where=den > 0)
+
+
+def _collapse(*columns):
+    """Distinct rows (k x len(columns)) and their probability"""
+    # Pack the integer columns into one int64 key: a 1-D unique is ~100x
+    # faster than np.unique(axis=0) on a million rows
+    columns = [np.asarray(c, dtype=np.int64) for c in columns]
+    lows = [int(c.min()) for c in columns]
+    radices = [int(c.max()) - low + 1 for c, low in zip(columns, lows)]
+    if np.prod(radices, dtype=np.float64) >= 2 ** 62:
+        rows, counts = np.unique(np.stack(columns, axis=1), axis=0, return_counts=True)
+        return rows.astype(np.float64), counts / counts.sum()
+
+    key = np.zeros(len(columns[0]), dtype=np.int64)
+    for c, low, radix in zip(columns, lows, radices):
+        key = key * radix + (c - low)
+    keys, counts = np.unique(key, return_counts=True)
+
+    rows = np.empty((len(keys), len(columns)), dtype=np.float64)
+    for i in range(len(columns) - 1, -1, -1):
+        keys, digit = np.divmod(keys, radices[i])
+        rows[:, i] = digit + lows[i]
+    return rows, counts / counts.sum()
+
+
+def bootstrap_ci(num, den, iterations=ITERATIONS, confidence=CONFIDENCE, seed=0):
+    """
+    Percentile bootstrap of sum(num) / sum(den) over rows.
+    Returns (estimate, low, high).
+    """
+    n = len(num)
+    estimate = float(_ratio(np.sum(num), np.sum(den)))
+    if n == 0:
+        return estimate, estimate, estimate
+
+    rng = np.random.default_rng(seed)
+    rows, p = _collapse(num, den)
+    stats = []
+    for start in range(0, iterations, BLOCK):
+        weights = rng.multinomial(n, p, size=min(BLOCK, iterations - start)).astype(np.float64)
+        sums = weights @ rows
+        stats.append(_ratio(sums[:, 0], sums[:, 1]))
+    stats = np.concatenate(stats)
+
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(stats, [alpha, 1 - alpha])
+    return estimate, float(low), float(high)
+
+
+def paired_test(num_a, num_b, den, iterations=ITERATIONS, confidence=CONFIDENCE, seed=0):
+    """
+    B minus A on the same utterances (negative = B makes fewer errors).
+
+    Returns a dict with the difference of the two rates, its paired
+    bootstrap CI, and the two-sided p-value of a sign-flip permutation
+    test (H0: per-utterance differences are symmetric around zero).
+    """
+    n = len(den)
+    total = np.sum(den)
+    diff = np.asarray(num_b, dtype=np.int64) - np.asarray(num_a, dtype=np.int64)
+    observed = float(_ratio(np.sum(diff), total))
+    result = {"a": float(_ratio(np.sum(num_a), total)), "b": float(_ratio(np.sum(num_b), total)),
+              "diff": observed, "low": observed, "high": observed, "p_value": 1.0}
+    if n == 0 or total == 0:
+        return result
+
+    rng = np.random.default_rng(seed)
+
+    # Paired bootstrap: resample utterances, keep A and B together
+    rows, p = _collapse(diff, den)
+    stats = []
+    for start in range(0, iterations, BLOCK):
+        weights = rng.multinomial(n, p, size=min(BLOCK, iterations - start)).astype(np.float64)
+        sums = weights @ rows
+        stats.append(_ratio(sums[:, 0], sums[:, 1]))
+    alpha = (1 - confidence) / 2
+    result["low"], result["high"] = (float(q) for q in np.quantile(np.concatenate(stats), [alpha, 1 - alpha]))
+
+    # Sign flips: for each distinct |d| seen m times, the number of + signs is Binomial(m, 1/2)
+    values, m = np.unique(np.abs(diff[diff != 0]), return_counts=True)
+    if len(values):
+        extreme = 0
+        for start in range(0, iterations, BLOCK):
+            plus = rng.binomial(m, 0.5, size=(min(BLOCK, iterations - start), len(values)))
+            flipped = ((2 * plus - m) @ values) / total
+            extreme += int(np.sum(np.abs(flipped) >= abs(observed) - 1e-12))
+        result["p_value"] = (extreme + 1) / (iterations + 1)
+    return result
+
+
+# ---------------- reports ----------------
+
+def summarize(table, by=(), metrics=("wer", "cer", "ser"), iterations=ITERATIONS, confidence=CONFIDENCE):
+    """[(group, utterances, {metric: (estimate, low, high)})], overall first"""
+    groups = [("all", np.arange(len(table)))]
+    if by:
+        groups += sorted(table.group_by(*by).items(), key=lambda item: str(item[0]))
+
+    rows = []
+    for key, index in groups:
+        cis = {}
+        for metric in metrics:
+            num, den = table.errors(metric)
+            cis[metric] = bootstrap_ci(num[index], den[index], iterations, confidence)
+        rows.append((key, len(index), cis))
+    return rows
+
+
+def print_summary(rows, confidence=CONFIDENCE):
+    metrics = list(rows[0][2]) if rows else []
+    header = "".join(f" {m.upper():>24}" for m in metrics)
+    print(f"{'slice':<24} {'utts':>8}{header}   ({confidence:.0%} bootstrap CI)")
+    for key, n, cis in rows:
+        cells = "".join(f" {e:>7.4f} [{lo:.4f}, {hi:.4f}]" for e, lo, hi in cis.values())
+        print(f"{str(key):<24} {n:>8}{cells}")
+
+
+def align(table_a, table_b):
+    """Row indices of the utterances both tables have, in the same order"""
+    common, index_a, index_b = np.intersect1d(table_a["id"], table_b["id"], return_indices=True)
+    return index_a, index_b
+
+
+def compare(table_a, table_b, by=(), metrics=("wer", "cer", "ser"),
+            iterations=ITERATIONS, confidence=CONFIDENCE):
+    """[(group, utterances, {metric: paired_test result})] of B against A"""
+    index_a, index_b = align(table_a, table_b)
+    groups = [("all", np.arange(len(index_a)))]
+    if by:
+        sub = ErrorTable({c: table_a[c][index_a] for c in ("id",) + tuple(by)})
+        groups += sorted(sub.group_by(*by).items(), key=lambda item: str(item[0]))
+
+    rows = []
+    for key, index in groups:
+        tests = {}
+        for metric in metrics:
+            num_a, den = table_a.errors(metric)
+            num_b, _ = table_b.errors(metric)
+            tests[metric] = paired_test(num_a[index_a][index], num_b[index_b][index], den[index_a][index],
+                                        iterations, confidence)
+        rows.append((key, len(index), tests))
+    return rows
+
+
+def print_comparison(rows, confidence=CONFIDENCE):
+    print(f"{'slice':<24} {'utts':>8} {'metric':>6} {'A':>8} {'B':>8} {'B - A':>9} "
+          f"{'CI ' + format(confidence, '.0%'):>21} {'p':>7}")
+    for key, n, tests in rows:
+        for metric, t in tests.items():
+            print(f"{str(key):<24} {n:>8} {metric:>6} {t['a']:>8.4f} {t['b']:>8.4f} {t['diff']:>+9.4f} "
+                  f"[{t['low']:+.4f}, {t['high']:+.4f}] {t['p_value']:>7.4f}")
+
+
+def _prepare(path, args):
+    table = ErrorTable.load(path)
+    for meta in args.meta:
+        table.join_file(meta)
+    for spec in args.bucket:
+        column, _, edges = spec.partition("=")
+        table.bucket(column, [float(e) for e in edges.split(",")])
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Confidence intervals and slices of per-utterance errors")
+    parser.add_argument("command", choices=["summary", "compare"])
+    parser.add_argument("tables", nargs="+", help="per-utterance .jsonl or .npz (two for compare: A then B)")
+    parser.add_argument("--meta", action="append", default=[], help="metadata .jsonl/.csv keyed by id")
+    parser.add_argument("--bucket", action="append", default=[], help="column=edge,edge,... -> column_bucket")
+    parser.add_argument("--by", action="append", default=[], help="slice by this column")
+    parser.add_argument("--iterations", type=int, default=ITERATIONS)
+    parser.add_argument("--confidence", type=float, default=CONFIDENCE)
+    parser.add_argument("--save", help="write the (joined) table as .npz")
+    args = parser.parse_args()
+
+    if args.command == "summary":
+        table = _prepare(args.tables[0], args)
+        if args.save:
+            table.save(args.save)
+        print_summary(summarize(table, args.by, iterations=args.iterations, confidence=args.confidence),
+                      args.confidence)
+    else:
+        table_a, table_b = (_prepare(path, args) for path in args.tables[:2])
+        print_comparison(compare(table_a, table_b, args.by, iterations=args.iterations,
+                                 confidence=args.confidence), args.confidence)
+
+
+if __name__ == "__main__":
+    main()
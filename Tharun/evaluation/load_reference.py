@@ -1,15 +1,266 @@
+import csv
+import hashlib
+from array import array
+import json
+import mmap
+import os
+
+import numpy as np
+
+from stage_profiler import profiled
+
+INDEX_VERSION = 2         # bump when the index layout or record splitting changes
+
+
+def utterance_key(name):
+    """Hindi_0001.wav / path/to/Hindi_0001.mp3 / Hindi_0001 -> Hindi_0001"""
+    return os.path.splitext(os.path.basename(name.strip()))[0]
+
+
+def _hash_key(key):
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    # 0 marks an empty slot in the table
+    return int.from_bytes(digest, "little") or 1
+
+
+class ReferenceStore:
+    """
+    Reference transcripts read through a memory map and a line-offset index.
+
+    Supported formats:
+    - "txt": one transcript per non-empty line, looked up by position
+      (Hindi_0001 -> line 1), as in load_reference_from_single_file
+    - "tsv": "utt_id<TAB>transcript" per line
+    - "csv": header with audio_file,transcript columns (opti_prepo.py format);
+      quoted transcripts may contain newlines
+
+    The index (byte offset + length per record and, for tsv/csv, an
+    open-addressing hash table of utterance ids) is saved in
+    <file>.index/ and memory-mapped, so lookups are O(1) and memory stays
+    flat whatever the file size. It is rebuilt when the file changes.
+    """
+
+    def __init__(self, path, fmt=None, encoding="utf-8"):
+        self.path = path
+        self.encoding = encoding
+        self.fmt = fmt or self._guess_format(path)
+        self.index_dir = path + ".index"
+
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+        if self.fmt == "csv":
+            self._read_csv_header()
+
+        self._load_or_build_index()
+
+    @staticmethod
+    def _guess_format(path):
+        ext = os.path.splitext(path)[1].lower()
+        return {".csv": "csv", ".tsv": "tsv"}.get(ext, "txt")
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    # ---------- index ----------
+
+    def _source_meta(self):
+        stat = os.stat(self.path)
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                "fmt": self.fmt, "encoding": self.encoding, "version": INDEX_VERSION}
+
+    def _load_or_build_index(self):
+        meta_path = os.path.join(self.index_dir, "meta.json")
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                if json.load(f) == self._source_meta():
+                    self._load_index()
+                    return
+        except (OSError, ValueError):
+            pass
+
+        self._build_index()
+        try:
+            self._save_index(meta_path)
+        except OSError:
+            # Read-only location: keep the index in memory only
+            pass
+
+    def _load_index(self):
+        load = lambda name: np.load(os.path.join(self.index_dir, name), mmap_mode="r")
+        self.offsets = load("offsets.npy")
+        self.lengths = load("lengths.npy")
+        self.table_hash = load("table_hash.npy")
+        self.table_row = load("table_row.npy")
+
+    def _save_index(self, meta_path):
+        os.makedirs(self.index_dir, exist_ok=True)
+        for name, arr in [("offsets", self.offsets), ("lengths", self.lengths),
+                          ("table_hash", self.table_hash), ("table_row", self.table_row)]:
+            np.save(os.path.join(self.index_dir, f"{name}.npy"), arr)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(self._source_meta(), f)
+
+    @profiled("eval.reference_index_build")
+    def _build_index(self):
+        # Compact arrays keep the build cheap for multi-GB files
+        offsets = array("q")
+        lengths = array("i")
+        hashes = array("Q")
+
+        self._file.seek(0)
+        if self.fmt == "csv":
+            records = self._csv_records()
+        else:
+            records = self._line_records()
+
+        for start, length, key in records:
+            offsets.append(start)
+            lengths.append(length)
+            if self.fmt != "txt":
+                hashes.append(_hash_key(key))
+
+        self.offsets = np.frombuffer(offsets, dtype=np.int64)
+        self.lengths = np.frombuffer(lengths, dtype=np.int32)
+
+        # Open-addressing table (linear probing), at most half full
+        size = 1
+        while size < 2 * len(hashes):
+            size *= 2
+        self.table_hash = np.zeros(size, dtype=np.uint64)
+        self.table_row = np.full(size, -1, dtype=np.int64)
+        mask = size - 1
+        for row, h in enumerate(hashes):
+            slot = h & mask
+            while self.table_hash[slot]:
+                slot = (slot + 1) & mask
+            self.table_hash[slot] = h
+            self.table_row[slot] = row
+
+    def _line_records(self):
+        """(offset, length, key) per non-empty line"""
+        pos = 0
+        for raw in self._file:
+            start, pos = pos, pos + len(raw)
+            line = raw.rstrip(b"\r\n")
+            if line.strip():
+                yield start, len(line), self._parse(line.decode(self.encoding))[0]
+
+    def _csv_records(self):
+        """
+        (offset, length, key) per CSV record after the header. csv.reader
+        splits the records, so a quoted transcript may span several lines;
+        the lines it consumed for a row give the row's byte range.
+        """
+        pos = len(self._file.readline())
+        consumed = []
+
+        def lines():
+            nonlocal pos
+            for raw in self._file:
+                consumed.append((pos, raw))
+                pos += len(raw)
+                yield raw.decode(self.encoding)
+
+        for row in csv.reader(lines()):
+            (start, _), (last_start, last) = consumed[0], consumed[-1]
+            consumed.clear()
+            if "".join(row).strip():
+                end = last_start + len(last.rstrip(b"\r\n"))
+                yield start, end - start, utterance_key(row[self._audio_col])
+
+    # ---------- records ----------
+
+    def _parse(self, line):
+        """Return (utterance key or None, transcript) for one record"""
+        if self.fmt == "txt":
+            return None, line.strip()
+        if self.fmt == "tsv":
+            key, _, text = line.partition("\t")
+            return utterance_key(key), text.strip()
+
+        row = next(csv.reader([line]))
+        return utterance_key(row[self._audio_col]), row[self._text_col].strip()
+
+    def _read_csv_header(self):
+        self._file.seek(0)
+        header_line = self._file.readline().decode(self.encoding).lstrip("\ufeff")
+        header = next(csv.reader([header_line]))
+        self._audio_col = header.index("audio_file")
+        self._text_col = header.index("transcript")
+
+    def _record(self, row):
+        start = int(self.offsets[row])
+        raw = self._data[start:start + int(self.lengths[row])]
+        return self._parse(raw.decode(self.encoding))
+
+    def get_by_index(self, index):
+        """Transcript of the index-th record (0-based)"""
+        return self._record(index)[1]
+
+    def get(self, utt_id):
+        """
+        Transcript for an utterance id or audio file name.
+        Raises KeyError if the id is not in the file.
+        """
+        key = utterance_key(utt_id)
+
+        if self.fmt == "txt":
+            # Hindi_0001 -> line 1 -> index 0
+            try:
+                index = int(key.split("_")[1]) - 1
+            except (IndexError, ValueError):
+                raise KeyError(utt_id)
+            if not 0 <= index < len(self):
+                raise KeyError(utt_id)
+            return self.get_by_index(index)
+
+        h = _hash_key(key)
+        mask = len(self.table_hash) - 1
+        slot = h & mask
+        while self.table_hash[slot]:
+            if self.table_hash[slot] == h:
+                found_key, text = self._record(int(self.table_row[slot]))
+                if found_key == key:
+                    return text
+            slot = (slot + 1) & mask
+
+        raise KeyError(utt_id)
+
+    def __getitem__(self, utt_id):
+        return self.get(utt_id)
+
+    def __contains__(self, utt_id):
+        try:
+            self.get(utt_id)
+            return True
+        except KeyError:
+            return False
+
+
+_stores = {}
+
+
 def load_reference_from_single_file(ref_file_path, audio_filename):
     """
     ref_file_path: path to single reference.txt
     audio_filename: Hindi_0001.wav
-    """
-
-    # Read all lines
-    with open(ref_file_path, "r", encoding="utf-8") as f:
-        lines = [line.strip() for line in f if line.strip()]
 
-    # Extract index from filename
-    # Hindi_0001.wav -> 1 -> index 0
-    index = int(audio_filename.split("_")[1].split(".")[0]) - 1
+    The file is indexed once and kept open for later calls.
+    """
+    if ref_file_path not in _stores:
+        _stores[ref_file_path] = ReferenceStore(ref_file_path)
 
-    return lines[index]
+    return _stores[ref_file_path].get(audio_filename)
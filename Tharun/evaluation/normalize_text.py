@@ -1,11 +1,255 @@
+"""
+Text normalisation shared by the evaluation and Stage 1B.
+
+A TextNormalizer compiles one language's rule set once:
+
+- punctuation removal becomes a lookup table over all Unicode code
+  points, applied with numpy to a whole batch of texts at a time
+- the language's phrase fixes (e.g. Hindi "क लिए" -> "के लिए") become one
+  precompiled alternation applied in a single pass
+- case folding, whitespace collapsing and Unicode normalisation (NFC,
+  NFKD, ...) are switched on per profile
+- keep_marks keeps combining marks (vowel signs) when punctuation is
+  removed: "eval" drops them, which the Hindi fixes rely on but which
+  merges different words in e.g. Malayalam ("eval_marks", see
+  scoring_profile)
+
+Steps always run in the order lowercase -> strip punctuation -> rules ->
+collapse whitespace -> Unicode form, so the "eval" profile gives exactly
+the old normalize_text output and WER stays comparable with earlier runs.
+
+normalize() keeps an LRU cache, so references repeated across runs or
+variants are only normalised once. normalize_many() joins a list of
+texts into one string and does every step on that string.
+
+    python -m evaluation.normalize_text in.txt out.txt --language hi --profile eval
+"""
+
+import argparse
 import re
+import sys
+import time
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+
+try:
+    # Imported as Tharun.evaluation.normalize_text (Stage 1B, text service)
+    from ..stage_profiler import profiled
+except ImportError:
+    from stage_profiler import profiled
+
+PUNCT_RE = re.compile(r"[^\w\s]")
+
+# Phrase fixes per language, applied after punctuation removal. That step
+# also drops matras (combining marks are not \w), so "के लिए" arrives as
+# "क लए" and leaves as "क लिए" - the same on reference and hypothesis
+RULES = {
+    "hi": (
+        ("क लिए", "के लिए"),
+        ("लए", "लिए"),
+    ),
+}
+
+PROFILES = {
+    # WER / CER / SER scoring (the original normalize_text)
+    "eval": {"lowercase": True, "strip_punctuation": True, "rules": True, "unicode_form": None},
+    # Scoring for scripts whose vowel signs must survive (no Hindi fixes)
+    "eval_marks": {"lowercase": True, "strip_punctuation": True, "keep_marks": True, "rules": False,
+                   "unicode_form": "NFC"},
+    # Text as written, only whitespace collapsed (what plain jiwer.wer scores)
+    "none": {"lowercase": False, "strip_punctuation": False, "rules": False, "unicode_form": None},
+    # Stage 1B basic cleaning before spell correction
+    "stage1b": {"lowercase": False, "strip_punctuation": False, "rules": False, "unicode_form": "NFKD"},
+}
+
+DEFAULT_LANGUAGE = "hi"   # the Hindi fixes cannot match other scripts
+CACHE_SIZE = 65536
+BATCH_SIZE = 8192         # texts per joined string in normalize_many
+
+# Joins texts in normalize_many; kept by every step, never matched by a rule
+SEPARATOR = "\x00"
+
+
+@lru_cache(maxsize=None)
+def _code_tables(keep_marks=False):
+    """
+    (keep, space): bool per code point for [\\w\\s] (plus combining marks
+    with keep_marks) and \\s, built with the same regexes
+    """
+    every = "".join(map(chr, range(sys.maxunicode + 1)))
+
+    keep = np.zeros(sys.maxunicode + 1, dtype=bool)
+    keep[_codes(PUNCT_RE.sub("", every))] = True
+    keep[ord(SEPARATOR)] = True
+    if keep_marks:
+        keep |= np.fromiter((unicodedata.category(c)[0] == "M" for c in every), dtype=bool, count=len(every))
+
+    space = np.zeros(sys.maxunicode + 1, dtype=bool)
+    space[_codes("".join(re.findall(r"\s", every)))] = True
+    return keep, space
+
+
+def _codes(text):
+    return np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+
+
+def _text(codes):
+    return codes.tobytes().decode("utf-32-le", "surrogatepass")
+
+
+def _collapse_codes(codes, space):
+    """" ".join(t.split()) for every SEPARATOR-delimited text in codes"""
+    is_space = space[codes]
+    if not is_space.any():
+        return codes
+
+    # Last non-space position at or before each index (-1 if none)
+    last_word = np.where(is_space, -1, np.arange(len(codes), dtype=np.int64))
+    np.maximum.accumulate(last_word, out=last_word)
+
+    nxt = np.empty_like(codes)
+    nxt[:-1] = codes[1:]
+    nxt[-1] = 0
+    # A whitespace run survives as one space only between two words of the same text
+    inner = (last_word >= 0) & (codes[np.maximum(last_word, 0)] != 0)
+    kept_space = is_space & ~space[nxt] & (nxt != 0) & inner
 
+    codes = codes.copy()
+    codes[kept_space] = 32
+    return codes[~is_space | kept_space]
+
+
+class TextNormalizer:
+    """One language / profile's normalisation, compiled once"""
+
+    def __init__(self, lowercase=True, strip_punctuation=True, rules=(), unicode_form=None,
+                 keep_marks=False, cache_size=CACHE_SIZE):
+        self.lowercase = lowercase
+        self.strip_punctuation = strip_punctuation
+        self.keep_marks = keep_marks
+        self.unicode_form = unicode_form
+        self.replacements = dict(rules)
+
+        if any(SEPARATOR in s for pair in self.replacements.items() for s in pair):
+            raise ValueError("normalisation rules cannot contain the batch separator")
+
+        if self.replacements:
+            # Longest first, so "क लिए" wins over any shorter overlapping phrase
+            phrases = sorted(self.replacements, key=len, reverse=True)
+            self.rules_re = re.compile("|".join(re.escape(p) for p in phrases))
+        else:
+            self.rules_re = None
+
+        self.normalize = lru_cache(maxsize=cache_size)(self._normalize)
+
+    def _replace(self, match):
+        return self.replacements[match.group(0)]
+
+    def _normalize(self, text):
+        if self.lowercase:
+            text = text.lower()
+        if self.strip_punctuation and self.keep_marks:
+            codes = _codes(text)
+            text = _text(codes[_code_tables(True)[0][codes]])
+        elif self.strip_punctuation:
+            text = PUNCT_RE.sub("", text)
+        if self.rules_re is not None:
+            text = self.rules_re.sub(self._replace, text)
+        text = " ".join(text.split())
+        if self.unicode_form and not unicodedata.is_normalized(self.unicode_form, text):
+            text = unicodedata.normalize(self.unicode_form, text)
+        return text
+
+    def _normalize_joined(self, texts):
+        """All steps on SEPARATOR.join(texts); None if a text contains the separator"""
+        joined = SEPARATOR.join(texts)
+        if joined.count(SEPARATOR) != len(texts) - 1:
+            return None
+        if self.lowercase:
+            joined = joined.lower()
+
+        keep, space = _code_tables(self.keep_marks)
+        if self.strip_punctuation:
+            codes = _codes(joined)
+            codes = codes[keep[codes]]
+            joined = _text(codes)
+        if self.rules_re is not None:
+            joined = self.rules_re.sub(self._replace, joined)
+
+        joined = _text(_collapse_codes(_codes(joined), space))
+        if self.unicode_form and not unicodedata.is_normalized(self.unicode_form, joined):
+            joined = unicodedata.normalize(self.unicode_form, joined)
+        return joined.split(SEPARATOR)
+
+    def normalize_many(self, texts, batch_size=BATCH_SIZE):
+        """Normalise a list of texts, batch_size at a time as one joined string"""
+        out = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            normalized = self._normalize_joined(batch)
+            out += normalized if normalized is not None else map(self._normalize, batch)
+        return out
+
+    def cache_info(self):
+        return self.normalize.cache_info()
+
+
+@lru_cache(maxsize=None)
+def get_normalizer(language=DEFAULT_LANGUAGE, profile="eval"):
+    """Shared TextNormalizer for a language and a PROFILES entry"""
+    options = dict(PROFILES[profile])
+    rules = RULES.get(language, ()) if options.pop("rules") else ()
+    return TextNormalizer(rules=rules, **options)
+
+
+def scoring_profile(language):
+    """
+    Language-aware scoring profile: "eval" where the RULES expect the
+    combining marks gone (Hindi), "eval_marks" for every other language
+    """
+    return "eval" if language in RULES else "eval_marks"
+
+
+@profiled("eval.normalize_text")
 def normalize_text(text):
-    text = text.lower()
-    text = re.sub(r"[^\w\s]", "", text)
+    return get_normalizer().normalize(text)
+
+
+@profiled("eval.normalize_file")
+def normalize_file(in_path, out_path, language=DEFAULT_LANGUAGE, profile="eval",
+                   batch_size=BATCH_SIZE):
+    """Normalise a text file line by line; returns the number of lines"""
+    normalizer = get_normalizer(language, profile)
+    lines = 0
+    with open(in_path, encoding="utf-8") as src, open(out_path, "w", encoding="utf-8") as dst:
+        batch = []
+        for line in src:
+            batch.append(line.rstrip("\n"))
+            if len(batch) == batch_size:
+                dst.write("\n".join(normalizer.normalize_many(batch, batch_size)) + "\n")
+                lines += len(batch)
+                batch = []
+        if batch:
+            dst.write("\n".join(normalizer.normalize_many(batch, batch_size)) + "\n")
+            lines += len(batch)
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalise a text file line by line")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--language", default=DEFAULT_LANGUAGE)
+    parser.add_argument("--profile", default="eval", choices=sorted(PROFILES))
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    lines = normalize_file(args.input, args.output, args.language, args.profile)
+    elapsed = time.perf_counter() - start
+    print(f"{lines} lines in {elapsed:.2f}s ({lines / max(elapsed, 1e-9):,.0f} lines/s)")
 
-    # Hindi-specific normalizations
-    text = text.replace("क लिए", "के लिए")
-    text = text.replace("लए", "लिए")
 
-    return " ".join(text.split())
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,480 @@
+"""
+Experiment runner: several preprocessing variants of one dataset scored
+in a single pass (raw vs preprocessed, different SNR gates, ...).
+
+An experiment file describes the dataset and the variants:
+
+    {
+      "manifest": "data/malya.csv", "audio_dir": "data/ml_audio",
+      "language": "ml", "device": "cuda", "compute_type": "int8",
+      "variants": [
+        {"name": "raw"},
+        {"name": "preprocessed", "target_lufs": -20, "denoise_below_snr_db": 25,
+         "vad_params": {"threshold": 0.5, "min_speech_duration_ms": 250, "min_silence_duration_ms": 100}},
+        {"name": "snr15", "target_lufs": -20, "denoise_below_snr_db": 15, "vad_params": {...}}
+      ]
+    }
+
+A variant is a name plus front_end.process() arguments (none = the raw
+audio). The manifest is a CSV with audio_file,transcript columns (as
+opti_prepo.py used), a TSV (audio_file<TAB>transcript) or JSON lines.
+
+- Streaming: the manifest is read CHUNK_ROWS rows at a time, never
+  loaded whole
+- Prefetch: decode threads read, resample and preprocess the next
+  PREFETCH files while Whisper transcribes the current one
+- Shared work: each file is decoded once for all variants, and variants
+  that differ only in the denoise step share loudness + VAD
+- Cache: transcripts are cached by audio content + variant + Whisper
+  settings, so a file whose variants are all cached is not even decoded
+- Scoring: one thread per variant feeds evaluate_corpus; at the end
+  every variant is compared with the first one (paired bootstrap)
+
+WER is the corpus WER (errors over all reference words), with the mean
+of per-file WER (what opti_prepo.py used to print) next to it. Both
+texts go through the "normalizer" of the experiment file first:
+
+    "none"       text as written, only whitespace collapsed (default,
+                 comparable with the old per-file jiwer.wer numbers)
+    "language"   lowercase, no punctuation, combining marks kept unless
+                 the language's rules need them dropped (Hindi, as
+                 evaluate.py); see normalize_text.scoring_profile
+    "eval", ...  any other normalize_text.PROFILES name
+
+    python experiment.py experiment.json [--max-files 15] [--decode-threads 2] [--prefetch 8]
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import soundfile as sf
+
+from audio_pipeline import front_end
+from audio_pipeline.stage_cache import MISSING, StageCache, stage_key
+from evaluation import normalize_text
+from evaluation.corpus_metrics import evaluate_corpus
+from evaluation.error_table import ErrorTableBuilder, compare, print_comparison
+from lazy import LazyModule
+import stage_profiler
+
+librosa = LazyModule("librosa")
+
+
+# =======================
+# DEFAULTS (an experiment file can override them)
+# =======================
+
+MODEL_SIZE = "small"
+DEVICE = "cpu"
+COMPUTE_TYPE = "default"
+NORMALIZER = "none"       # text normalisation before scoring, see the module docstring
+
+VARIANTS = [
+    {"name": "raw"},
+    {
+        "name": "preprocessed",
+        "target_lufs": -20.0,
+        "vad_params": {"threshold": 0.5, "min_speech_duration_ms": 250, "min_silence_duration_ms": 100},
+        "denoise_below_snr_db": 25,
+    },
+]
+
+CHUNK_ROWS = 1024         # manifest rows read at a time
+DECODE_THREADS = 2
+PREFETCH = 8              # files decoded ahead of Whisper
+CACHE_DIR = "data/cache"  # None to disable
+CACHE_MAX_GB = 20
+BOOTSTRAP_ITERATIONS = 2000
+SCORE_PUT_TIMEOUT_S = 5   # how often a blocked hand-off to a scorer checks it is alive
+PROFILE_FILE = None
+
+# =======================
+
+# front_end.process() arguments a variant may set
+PROCESS_ARGS = ("target_lufs", "vad_params", "denoise_below_snr_db", "always_denoise",
+                "adaptive_denoise", "normalize_peak")
+
+
+def load_experiment(path):
+    """Experiment settings from a JSON file, with defaults filled in"""
+    with open(path, "r", encoding="utf-8") as f:
+        entry = json.load(f)
+
+    name = entry.get("name", os.path.splitext(os.path.basename(entry["manifest"]))[0])
+    return {
+        "name": name,
+        "manifest": entry["manifest"],
+        "encoding": entry.get("encoding", "utf-8"),
+        "audio_dir": entry.get("audio_dir", ""),
+        "language": entry.get("language"),
+        "model": entry.get("model", MODEL_SIZE),
+        "device": entry.get("device", DEVICE),
+        "compute_type": entry.get("compute_type", COMPUTE_TYPE),
+        "normalizer": entry.get("normalizer", NORMALIZER),
+        "variants": entry.get("variants", VARIANTS),
+        "max_files": entry.get("max_files"),
+        "results_dir": entry.get("results_dir", f"data/results/{name}"),
+        "save_audio_dir": entry.get("save_audio_dir"),
+        "cache_dir": entry.get("cache_dir", CACHE_DIR),
+        "cache_max_gb": entry.get("cache_max_gb", CACHE_MAX_GB),
+    }
+
+
+# ---------------- manifest ----------------
+
+def _manifest_rows(path, encoding):
+    """(audio_file, transcript) per record of a CSV / TSV / JSON lines manifest"""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, "r", encoding=encoding, newline="") as f:
+        if ext == ".csv":
+            for row in csv.DictReader(f):
+                yield row.get("audio_file"), row.get("transcript")
+        elif ext == ".tsv":
+            for line in f:
+                audio_file, _, transcript = line.rstrip("\r\n").partition("\t")
+                yield audio_file, transcript
+        else:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    yield row.get("audio_file"), row.get("transcript")
+
+
+def iter_manifest(path, encoding="utf-8", chunk_rows=CHUNK_ROWS):
+    """Yield lists of up to chunk_rows (audio_file, transcript), skipping incomplete rows"""
+    rows = (
+        (audio_file.strip(), transcript.strip())
+        for audio_file, transcript in _manifest_rows(path, encoding)
+        if audio_file and audio_file.strip() and transcript and transcript.strip()
+    )
+    while True:
+        chunk = list(itertools.islice(rows, chunk_rows))
+        if not chunk:
+            return
+        yield chunk
+
+
+def scoring_profile(settings):
+    """normalize_text profile for the experiment's "normalizer" setting"""
+    normalizer = settings.get("normalizer") or "none"
+    if normalizer == "language":
+        return normalize_text.scoring_profile(settings["language"])
+    if normalizer not in normalize_text.PROFILES:
+        raise ValueError(f"unknown normalizer {normalizer!r}: use \"language\" or one of "
+                         f"{sorted(normalize_text.PROFILES)}")
+    return normalizer
+
+
+# ---------------- variants ----------------
+
+def process_params(variant):
+    return {k: variant[k] for k in PROCESS_ARGS if variant.get(k) is not None}
+
+
+@stage_profiler.profiled("experiment.decode")
+def load_resampled(path):
+    y, sr = librosa.load(path, sr=None, mono=True)
+    return front_end.resample(front_end.to_float32(y), sr, front_end.TARGET_SR)
+
+
+_thread_vad = threading.local()
+
+
+def thread_vad_model():
+    """Silero instance of the calling thread (the model is stateful, decode threads must not share it)"""
+    if not hasattr(_thread_vad, "model"):
+        from audio_pipeline.vad import new_vad_model
+
+        _thread_vad.model = new_vad_model()
+    return _thread_vad.model
+
+
+def variant_audio(y, variants):
+    """
+    {name: 16 kHz audio, or None when VAD found no speech} for each variant.
+    Variants with the same loudness target and VAD parameters run those
+    stages once; only denoise / peak normalisation is done per variant.
+    Safe to call from several threads: VAD uses a model per thread.
+    """
+    sr = front_end.TARGET_SR
+    shared = {}
+    out = {}
+    for variant in variants:
+        params = process_params(variant)
+        if not params:
+            out[variant["name"]] = y
+            continue
+        vad_model = thread_vad_model() if "vad_params" in params else None
+        if params.get("adaptive_denoise"):
+            # Runs on the full signal before the speech is cut out
+            out[variant["name"]], _ = front_end.process(y.copy(), sr, vad_model=vad_model, **params)
+            continue
+
+        front = json.dumps([params.get("target_lufs"), params.get("vad_params")], sort_keys=True)
+        if front not in shared:
+            shared[front] = front_end.process(y.copy(), sr, target_lufs=params.get("target_lufs"),
+                                              vad_params=params.get("vad_params"), vad_model=vad_model)
+        audio, info = shared[front]
+
+        if audio is not None:
+            threshold = params.get("denoise_below_snr_db")
+            if params.get("always_denoise") or (threshold is not None and info["snr_db"] < threshold):
+                audio = front_end.denoise(audio, sr)
+            if params.get("normalize_peak"):
+                audio = front_end.peak_normalize(audio.copy())
+        out[variant["name"]] = audio
+    return out
+
+
+# ---------------- runner ----------------
+
+class ExperimentRunner:
+    """Decode / preprocess ahead on threads, transcribe on this thread, score per variant"""
+
+    def __init__(self, settings, decode_threads=DECODE_THREADS, prefetch=PREFETCH):
+        self.settings = settings
+        self.variants = settings["variants"]
+        self.decode_threads = decode_threads
+        self.prefetch = max(prefetch, decode_threads)
+
+        names = [v["name"] for v in self.variants]
+        if len(set(names)) != len(names):
+            raise ValueError(f"variant names must be unique: {names}")
+
+        self.cache = None
+        if settings["cache_dir"]:
+            self.cache = StageCache(settings["cache_dir"], max_bytes=settings["cache_max_gb"] * 1024 ** 3)
+        self.whisper_params = {"model": settings["model"], "device": settings["device"],
+                               "compute_type": settings["compute_type"], "language": settings["language"]}
+        self.profile = scoring_profile(settings)
+        self.model = None
+        self.score_queues = {}
+        self.scorers = {}
+
+    def transcript_key(self, file_key, variant):
+        variant_key = stage_key(file_key, "variant", process_params(variant))
+        return stage_key(variant_key, "whisper", self.whisper_params)
+
+    def _prepare(self, audio_file, reference):
+        """Decode thread: audio of every variant whose transcript is not cached"""
+        item = {"file": audio_file, "reference": reference, "audio": {}, "cached": {}}
+        path = os.path.join(self.settings["audio_dir"], audio_file)
+        if not os.path.exists(path):
+            item["error"] = "missing audio file"
+            return item
+
+        start = time.perf_counter()
+        try:
+            todo = self.variants
+            if self.cache is not None:
+                file_key = self.cache.audio_key(path)
+                item["keys"] = {v["name"]: self.transcript_key(file_key, v) for v in self.variants}
+                for v in self.variants:
+                    text = self.cache.get(item["keys"][v["name"]])
+                    if text is not MISSING:
+                        item["cached"][v["name"]] = text
+                todo = [v for v in self.variants if v["name"] not in item["cached"]]
+
+            if todo:
+                item["audio"] = variant_audio(load_resampled(path), todo)
+                self._save_audio(audio_file, item["audio"])
+        except Exception as e:
+            item["error"] = f"preprocessing: {e}"
+        item["prepare_s"] = time.perf_counter() - start
+        return item
+
+    def _save_audio(self, audio_file, audio):
+        save_dir = self.settings["save_audio_dir"]
+        if not save_dir:
+            return
+        for name, y in audio.items():
+            if y is not None and any(v["name"] == name and process_params(v) for v in self.variants):
+                out_path = os.path.join(save_dir, name, os.path.splitext(audio_file)[0] + ".wav")
+                os.makedirs(os.path.dirname(out_path), exist_ok=True)
+                sf.write(out_path, y, front_end.TARGET_SR)
+
+    def _transcribe(self, audio, audio_file):
+        if self.model is None:
+            from asr.model_registry import get_model
+            self.model = get_model(self.settings["model"], device=self.settings["device"],
+                                   compute_type=self.settings["compute_type"])
+
+        with stage_profiler.profile_stage("experiment.whisper", file=audio_file) as stage:
+            segments, info = self.model.transcribe(audio, language=self.settings["language"])
+            text = " ".join(segment.text.strip() for segment in segments)
+            stage["audio_s"] = info.duration
+        return text
+
+    def _rows(self, max_files=None):
+        chunks = iter_manifest(self.settings["manifest"], self.settings["encoding"])
+        rows = itertools.chain.from_iterable(chunks)
+        return itertools.islice(rows, max_files) if max_files else rows
+
+    def run(self, max_files=None):
+        settings = self.settings
+        max_files = max_files or settings["max_files"]
+        names = [v["name"] for v in self.variants]
+
+        # One scoring thread per variant, fed as transcripts arrive
+        self.score_queues = {name: queue.Queue(self.prefetch) for name in names}
+        tables = {name: ErrorTableBuilder() for name in names}
+        totals = {}
+        errors = {}
+
+        def score(name):
+            results_path = os.path.join(settings["results_dir"], name, "per_utterance.jsonl")
+            try:
+                os.makedirs(os.path.dirname(results_path), exist_ok=True)
+                totals[name] = evaluate_corpus(iter(self.score_queues[name].get, None),
+                                               results_path=results_path, table=tables[name],
+                                               language=settings["language"] or normalize_text.DEFAULT_LANGUAGE,
+                                               profile=self.profile)
+            except Exception as e:
+                errors[name] = e
+                print(f"❌ scoring {name}: {e}")
+
+        self.scorers = {name: threading.Thread(target=score, args=(name,), daemon=True) for name in names}
+        for t in self.scorers.values():
+            t.start()
+
+        stats = {"files": 0, "missing": 0, "failed": 0, "cached": 0, "no_speech": dict.fromkeys(names, 0),
+                 "wait_s": 0.0, "whisper_s": 0.0, "normalizer": self.profile}
+        start = time.time()
+        with ThreadPoolExecutor(self.decode_threads) as pool:
+            pending = deque()
+            rows = self._rows(max_files)
+            try:
+                while True:
+                    # Keep the decode threads PREFETCH files ahead of Whisper
+                    for audio_file, reference in itertools.islice(rows, self.prefetch - len(pending)):
+                        pending.append(pool.submit(self._prepare, audio_file, reference))
+                    if not pending:
+                        break
+
+                    wait = time.perf_counter()
+                    item = pending.popleft().result()
+                    stats["wait_s"] += time.perf_counter() - wait
+                    self._handle(item, stats)
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                raise
+            finally:
+                for name in names:
+                    self._put(name, None)
+
+        for t in self.scorers.values():
+            t.join()
+        if errors:
+            raise RuntimeError(f"scoring failed for {', '.join(errors)}: {next(iter(errors.values()))}")
+
+        stats["elapsed_s"] = time.time() - start
+        return totals, {name: table.build() for name, table in tables.items()}, stats
+
+    def _put(self, name, entry):
+        """Hand entry to a variant's scorer; False if that thread has died"""
+        while self.scorers[name].is_alive():
+            try:
+                self.score_queues[name].put(entry, timeout=SCORE_PUT_TIMEOUT_S)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _handle(self, item, stats):
+        audio_file = item["file"]
+        if "error" in item:
+            stats["missing" if item["error"] == "missing audio file" else "failed"] += 1
+            print(f"⚠️ {audio_file}: {item['error']}")
+            return
+
+        utt_id = os.path.splitext(audio_file)[0]
+        start = time.perf_counter()
+        texts = dict(item["cached"])
+        try:
+            for name, audio in item["audio"].items():
+                if audio is None:
+                    # VAD found no speech: scored as an empty hypothesis
+                    texts[name] = ""
+                    stats["no_speech"][name] += 1
+                    continue
+                texts[name] = self._transcribe(audio, audio_file)
+                if self.cache is not None:
+                    self.cache.put(item["keys"][name], texts[name])
+        except Exception as e:
+            stats["failed"] += 1
+            print(f"❌ {audio_file}: {e}")
+            return
+        finally:
+            stats["whisper_s"] += time.perf_counter() - start
+
+        stats["files"] += 1
+        if item["cached"] and not item["audio"]:
+            stats["cached"] += 1
+        for name in self.score_queues:
+            self._put(name, (utt_id, item["reference"], texts[name]))
+        print(f"📝 {audio_file} (prepare {item['prepare_s']:.2f}s)")
+
+
+def print_results(totals, tables, stats, iterations=BOOTSTRAP_ITERATIONS):
+    print(f"\n✅ {stats['files']} file(s) in {stats['elapsed_s']:.1f}s "
+          f"(whisper {stats['whisper_s']:.1f}s, waiting for audio {stats['wait_s']:.1f}s), "
+          f"{stats['cached']} fully cached, {stats['missing']} missing, {stats['failed']} failed")
+
+    print(f"\n📈 {'variant':<20} {'files':>6} {'no speech':>10} {'WER':>8} {'file WER':>9} {'CER':>8} {'SER':>8}")
+    for name in tables:
+        t = totals[name]
+        if t.utterances:
+            num, den = tables[name].errors("wer")
+            file_wer = float(np.mean(num / np.maximum(den, 1)))
+            print(f"   {name:<20} {t.utterances:>6} {stats['no_speech'][name]:>10} "
+                  f"{t.wer:>8.4f} {file_wer:>9.4f} {t.cer:>8.4f} {t.ser:>8.4f}")
+    print(f"   (WER: corpus, file WER: mean of per-file WER; text normalisation: {stats['normalizer']})")
+
+    names = list(tables)
+    if iterations and len(names) > 1 and len(tables[names[0]]):
+        for name in names[1:]:
+            print(f"\n🔍 {name} vs {names[0]}")
+            print_comparison(compare(tables[names[0]], tables[name], iterations=iterations))
+
+
+def run_experiment(settings, decode_threads=DECODE_THREADS, prefetch=PREFETCH, max_files=None):
+    """Run and print one experiment; returns (totals, tables, stats)"""
+    runner = ExperimentRunner(settings, decode_threads=decode_threads, prefetch=prefetch)
+    totals, tables, stats = runner.run(max_files)
+    for name, table in tables.items():
+        table.save(os.path.join(settings["results_dir"], name, "errors.npz"))
+    print_results(totals, tables, stats)
+    return totals, tables, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score several preprocessing variants in one pass")
+    parser.add_argument("experiment", help="JSON file with the manifest, audio_dir and variants")
+    parser.add_argument("--max-files", type=int)
+    parser.add_argument("--decode-threads", type=int, default=DECODE_THREADS)
+    parser.add_argument("--prefetch", type=int, default=PREFETCH)
+    args = parser.parse_args()
+
+    if PROFILE_FILE:
+        stage_profiler.enable(PROFILE_FILE)
+
+    run_experiment(load_experiment(args.experiment), decode_threads=args.decode_threads,
+                   prefetch=args.prefetch, max_files=args.max_files)
+
+    if PROFILE_FILE and os.path.exists(PROFILE_FILE):
+        print("\n⏱️ Stage profile:", PROFILE_FILE)
+        stage_profiler.print_report(PROFILE_FILE)
+
+
+if __name__ == "__main__":
+    main()
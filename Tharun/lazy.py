@@ -0,0 +1,68 @@
+"""
+Deferred imports and model construction.
+
+Heavy libraries (torch, librosa, noisereduce, faster-whisper, ...) cost
+seconds to import, and models even more to build. Modules declare them
+here so the cost is paid on first use, not on import: running only the
+evaluation no longer imports torch, and worker processes start from a
+light parent.
+
+    librosa = LazyModule("librosa")        # imported on first attribute access
+
+    @once
+    def load_model():                      # built on first call, then shared
+        ...
+"""
+
+import importlib
+import threading
+from functools import wraps
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access"""
+
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+        self.__dict__["_lock"] = threading.Lock()
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            with self.__dict__["_lock"]:
+                module = self.__dict__["_module"]
+                if module is None:
+                    module = importlib.import_module(self.__dict__["_name"])
+                    self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+        return f"<lazy module '{self.__dict__['_name']}' ({state})>"
+
+
+def once(fn):
+    """
+    Call a no-argument loader once (thread-safe) and return its result on
+    every later call. fn.reset() forgets the result.
+    """
+    lock = threading.Lock()
+    result = []
+
+    @wraps(fn)
+    def wrapper():
+        if not result:
+            with lock:
+                if not result:
+                    result.append(fn())
+        return result[0]
+
+    wrapper.reset = result.clear
+    return wrapper
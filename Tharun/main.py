@@ -6,6 +6,10 @@ What this file does:
 2. Run ASR on clean WAV files
 3. Store transcribed (hypothesis) text to disk
 
+Resuming:
+- Progress is tracked in MANIFEST_PATH; a killed run picks up where it stopped
+- Set NUM_WORKERS > 1 to shard files across worker processes
+
 NOTE:
 - No reference loading
 - No normalization
@@ -14,8 +18,11 @@ NOTE:
 
 import os
 
+from audio_pipeline import adaptive_denoise
 from audio_pipeline.audio_pipeline import run_audio_preprocessing
-from asr.transcribe import transcribe_audio
+from audio_pipeline.audio_store import AudioStore
+from asr.parallel_transcribe import run_transcription
+import stage_profiler
 
 
 # =======================
@@ -26,60 +33,79 @@ LANGUAGE = "Hindi"
 
 CLEAN_AUDIO_DIR = f"data/clean_audio/{LANGUAGE}"
 HYPOTHESIS_DIR = f"data/hypothesis/{LANGUAGE}"
+MANIFEST_PATH = f"{HYPOTHESIS_DIR}/manifest.jsonl"
+
+# Sharded audio store instead of one WAV per clip (see audio_pipeline/audio_store.py);
+# None = use CLEAN_AUDIO_DIR
+AUDIO_STORE_DIR = None    # e.g. f"data/clean_store/{LANGUAGE}"
 
 MAX_FILES = 10            # change for testing (1, 5, 10, 100)
 RUN_PREPROCESSING = False   # True only if new raw audio added
 
+NUM_WORKERS = 1           # worker processes, each with its own model
+MODEL_SIZE = "small"
+# Compute type / threads / beam size (see asr/inference_profiles.py);
+# None = ASR_PROFILE env, else the calibrated choice, else "default"
+ASR_PROFILE = None        # e.g. "cpu_int8"
+CACHE_DIR = "data/cache"  # transcripts cached by audio content; None to disable
+
+# Per-stage timings / RTF / memory as JSON lines; None to disable
+PROFILE_FILE = None       # e.g. f"data/profile/{LANGUAGE}.jsonl"
+
+# Adaptive denoise decisions (SNR, mode, time) per file; None to disable
+DENOISE_LOG = None        # e.g. f"data/profile/{LANGUAGE}_denoise.jsonl"
+
 # =======================
 
 
 def main():
     print("🚀 PHASE 1: Hypothesis Generation Started")
 
+    if PROFILE_FILE:
+        stage_profiler.enable(PROFILE_FILE)
+    if DENOISE_LOG:
+        adaptive_denoise.enable_log(DENOISE_LOG)
+
     # STEP 1: Audio preprocessing (optional)
     if RUN_PREPROCESSING:
         print("🔊 Running audio preprocessing...")
-        run_audio_preprocessing()
+        run_audio_preprocessing(store_dir=AUDIO_STORE_DIR)
     else:
         print("⏭️ Skipping audio preprocessing (already done)")
 
-    os.makedirs(HYPOTHESIS_DIR, exist_ok=True)
-
-    processed = 0
-
-    wav_files = sorted([
-        f for f in os.listdir(CLEAN_AUDIO_DIR)
-        if f.lower().endswith(".wav")
-    ])
-
-    for wav_file in wav_files:
-        if processed >= MAX_FILES:
-            break
-
-        wav_path = os.path.join(CLEAN_AUDIO_DIR, wav_file)
-        hyp_txt_path = os.path.join(
-            HYPOTHESIS_DIR,
-            wav_file.replace(".wav", ".txt")
-        )
-
-        print(f"\n▶️ Transcribing: {wav_file}")
-
-        # Skip ASR if hypothesis already exists
-        if os.path.exists(hyp_txt_path):
-            print("📄 Hypothesis already exists, skipping")
-            processed += 1
-            continue
-
-        hypothesis_text = transcribe_audio(wav_path)
-
-        with open(hyp_txt_path, "w", encoding="utf-8") as f:
-            f.write(hypothesis_text.strip())
-
-        print("📝 Hypothesis saved:", hyp_txt_path)
-        processed += 1
+    if AUDIO_STORE_DIR:
+        # Utterance ids straight from the store index, no directory listing
+        with AudioStore(AUDIO_STORE_DIR) as store:
+            wav_paths = store.ids()[:MAX_FILES]
+    else:
+        wav_files = sorted([
+            f for f in os.listdir(CLEAN_AUDIO_DIR)
+            if f.lower().endswith(".wav")
+        ])[:MAX_FILES]
+
+        wav_paths = [os.path.join(CLEAN_AUDIO_DIR, f) for f in wav_files]
+
+    print(f"▶️ Transcribing with {NUM_WORKERS} worker(s)")
+
+    # Files already marked done in the manifest are skipped
+    done, failed = run_transcription(
+        wav_paths,
+        HYPOTHESIS_DIR,
+        MANIFEST_PATH,
+        num_workers=NUM_WORKERS,
+        model_size=MODEL_SIZE,
+        profile=ASR_PROFILE,
+        cache_dir=CACHE_DIR,
+        store_dir=AUDIO_STORE_DIR
+    )
 
     print("\n✅ PHASE 1 completed")
-    print("Files processed:", processed)
+    print("Files transcribed:", done)
+    print("Files failed:", failed)
+
+    if PROFILE_FILE and os.path.exists(PROFILE_FILE):
+        print("\n⏱️ Stage profile:", PROFILE_FILE)
+        stage_profiler.print_report(PROFILE_FILE)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,480 @@
+"""
+Multi-language job scheduler: preprocessing -> ASR -> evaluation for many
+datasets in one run.
+
+main.py / evaluate.py handle one LANGUAGE per run and reload the models
+each time. Here a jobs file lists every dataset:
+
+    [
+      {"language": "Hindi"},
+      {"language": "Kannada", "model": "medium", "preprocess": true},
+      {"name": "telugu_calls", "language": "Telugu",
+       "clean_dir": "data/calls/te", "reference_file": "data/calls/te.tsv"}
+    ]
+
+Missing paths default to main.py's layout (data/raw_audio/<Language>,
+data/clean_audio/<Language>, data/hypothesis/<Language>, ...).
+
+- Order: files are grouped by (model, compute type, language), so each
+  ASR worker loads a model once and Whisper skips language detection;
+  inside a group the longest files go first, so the tail is short
+- Balance: each file goes to the ASR worker with the fewest seconds of
+  audio still queued, not round-robin by count
+- Overlap: preprocessing (process pool), ASR (one process per worker)
+  and scoring (a thread per dataset) run at the same time, joined by
+  bounded queues, so DSP, inference and scoring keep all cores busy and
+  memory stays flat
+- Resume: each dataset keeps its main.py manifest; files already done
+  are only scored
+
+    python scheduler.py jobs.json [--asr-workers 2] [--pre-workers 2] [--queue-size 8]
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import soundfile as sf
+
+from asr.parallel_transcribe import append_manifest, load_manifest
+from evaluation.corpus_metrics import evaluate_corpus
+from evaluation.load_reference import ReferenceStore
+import stage_profiler
+
+
+# =======================
+# DEFAULTS (a jobs file entry can override the per-dataset ones)
+# =======================
+
+MODEL_SIZE = "small"
+DEVICE = "cpu"
+COMPUTE_TYPE = "default"
+ADAPTIVE_DENOISE = False   # see audio_pipeline/audio_pipeline.py
+
+ASR_WORKERS = 2
+PRE_WORKERS = 2
+QUEUE_SIZE = 8            # files in flight between two stages
+PUT_TIMEOUT_S = 5         # how often a blocked hand-off checks for dead ASR workers
+CACHE_DIR = "data/cache"  # transcripts cached by audio content; None to disable
+PROFILE_FILE = None
+
+# Whisper language codes; "whisper_language" in a job overrides
+LANGUAGE_CODES = {
+    "Hindi": "hi", "Kannada": "kn", "Telugu": "te", "Tamil": "ta",
+    "Malayalam": "ml", "Marathi": "mr", "Bengali": "bn", "Gujarati": "gu",
+    "Punjabi": "pa", "Urdu": "ur", "English": "en",
+}
+
+# =======================
+
+
+def load_jobs(path):
+    """Dataset entries from a JSON list or JSON lines file, with defaults filled in"""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    try:
+        entries = json.loads(text)
+    except json.JSONDecodeError:
+        entries = [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    datasets = []
+    for entry in entries:
+        lang = entry["language"]
+        hyp_dir = entry.get("hypothesis_dir", f"data/hypothesis/{lang}")
+        datasets.append({
+            "name": entry.get("name", lang),
+            "language": lang,
+            "whisper_language": entry.get("whisper_language", LANGUAGE_CODES.get(lang)),
+            "model": entry.get("model", MODEL_SIZE),
+            "compute_type": entry.get("compute_type", COMPUTE_TYPE),
+            "preprocess": entry.get("preprocess", False),
+            "adaptive_denoise": entry.get("adaptive_denoise", ADAPTIVE_DENOISE),
+            "raw_dir": entry.get("raw_dir", f"data/raw_audio/{lang}"),
+            "clean_dir": entry.get("clean_dir", f"data/clean_audio/{lang}"),
+            "hypothesis_dir": hyp_dir,
+            "manifest": entry.get("manifest", f"{hyp_dir}/manifest.jsonl"),
+            "reference_file": entry.get("reference_file", f"data/transcripts/{lang}/reference.txt"),
+            "results_file": entry.get("results_file", f"data/results/{entry.get('name', lang)}/per_utterance.jsonl"),
+            "max_files": entry.get("max_files"),
+        })
+    return datasets
+
+
+def audio_seconds(path):
+    """Duration from the file header; MP3s libsndfile cannot open are guessed at 128 kbps"""
+    try:
+        return sf.info(path).duration
+    except RuntimeError:
+        return os.path.getsize(path) / 16000
+
+
+def plan(datasets):
+    """
+    (pending jobs in run order, files already done per dataset).
+    A job is a dict describing one file through all three stages.
+    """
+    jobs = []
+    done = {}
+    for index, ds in enumerate(datasets):
+        if ds["preprocess"]:
+            src_dir, ext = ds["raw_dir"], ".mp3"
+        else:
+            src_dir, ext = ds["clean_dir"], ".wav"
+        files = sorted(f for f in os.listdir(src_dir) if f.lower().endswith(ext))[:ds["max_files"]]
+
+        completed = load_manifest(ds["manifest"])
+        done[index] = []
+        for file in files:
+            wav_file = os.path.splitext(file)[0] + ".wav"
+            if wav_file in completed:
+                done[index].append(wav_file)
+                continue
+            jobs.append({
+                "dataset": index,
+                "source": os.path.join(src_dir, file),
+                "wav": os.path.join(ds["clean_dir"], wav_file),
+                "file": wav_file,
+                "hypothesis": os.path.join(ds["hypothesis_dir"], os.path.splitext(wav_file)[0] + ".txt"),
+                "preprocess": ds["preprocess"],
+                "adaptive_denoise": ds["adaptive_denoise"],
+                "model": ds["model"],
+                "compute_type": ds["compute_type"],
+                "language": ds["whisper_language"],
+                "seconds": audio_seconds(os.path.join(src_dir, file)),
+            })
+
+    # One model / language at a time, longest files first inside each group
+    jobs.sort(key=lambda j: (j["model"], j["compute_type"], j["language"] or "", -j["seconds"]))
+    return jobs, done
+
+
+# ---------------- stage 1: preprocessing (process pool) ----------------
+
+def _preprocess(job):
+    from audio_pipeline.streaming_preprocess import preprocess_file_streaming
+
+    start = time.time()
+    try:
+        samples = preprocess_file_streaming(job["source"], job["wav"],
+                                            adaptive_denoise=job["adaptive_denoise"])
+        return dict(job, seconds=samples / 16000, preprocess_s=round(time.time() - start, 3))
+    except Exception as e:
+        return dict(job, error=f"preprocessing: {e}")
+
+
+# ---------------- stage 2: ASR (one process per worker) ----------------
+
+def _asr_worker(worker, inbox, outbox, cpu_threads, cache_dir):
+    """Transcribe jobs from inbox until None; models are kept per (size, compute type)"""
+    from asr.model_registry import get_model
+    from asr.save_hypothesis import save_hypothesis_text
+    from audio_pipeline.stage_cache import StageCache
+
+    cache = StageCache(cache_dir) if cache_dir else None
+
+    def transcribe(model, job):
+        with stage_profiler.profile_stage("asr.transcribe", file=job["file"]) as stage:
+            segments, info = model.transcribe(job["wav"], language=job["language"])
+            text = " ".join(segment.text for segment in segments)
+            stage["audio_s"] = info.duration
+        return text
+
+    for job in iter(inbox.get, None):
+        start = time.time()
+        entry = {"file": job["file"], "dataset": job["dataset"], "worker": worker, "seconds": job["seconds"]}
+        try:
+            model = get_model(job["model"], device=DEVICE, compute_type=job["compute_type"],
+                              cpu_threads=cpu_threads)
+            if cache is not None:
+                params = {"model": job["model"], "device": DEVICE,
+                          "compute_type": job["compute_type"], "language": job["language"]}
+                _, text = cache.run(cache.audio_key(job["wav"]), "whisper", params, transcribe, model, job)
+            else:
+                text = transcribe(model, job)
+            save_hypothesis_text(text, job["hypothesis"])
+            entry.update(status="done", hypothesis=job["hypothesis"], text=text)
+        except Exception as e:
+            entry.update(status="failed", error=str(e))
+        entry["asr_s"] = round(time.time() - start, 3)
+        outbox.put(entry)
+
+
+# ---------------- stage 3: scoring (a thread per dataset) ----------------
+
+def _existing_pairs(ds, files):
+    """(id, reference, hypothesis) of files transcribed by an earlier run"""
+    for wav_file in files:
+        hyp_path = os.path.join(ds["hypothesis_dir"], os.path.splitext(wav_file)[0] + ".txt")
+        try:
+            with open(hyp_path, "r", encoding="utf-8") as f:
+                yield wav_file, f.read().strip()
+        except FileNotFoundError:
+            print(f"⚠️ [{ds['name']}] no hypothesis for {wav_file}")
+
+
+def _score_dataset(ds, done_files, inbox, totals):
+    if not os.path.exists(ds["reference_file"]):
+        print(f"⚠️ [{ds['name']}] no reference file {ds['reference_file']}, not scored")
+        for _ in iter(inbox.get, None):
+            pass
+        return
+
+    os.makedirs(os.path.dirname(ds["results_file"]) or ".", exist_ok=True)
+    with ReferenceStore(ds["reference_file"]) as references:
+        def pairs():
+            for wav_file, hypothesis in itertools.chain(_existing_pairs(ds, done_files), iter(inbox.get, None)):
+                try:
+                    reference = references.get(wav_file)
+                except KeyError:
+                    print(f"⚠️ [{ds['name']}] no reference for {wav_file}")
+                    continue
+                yield os.path.splitext(wav_file)[0], reference, hypothesis
+
+        totals[ds["name"]] = evaluate_corpus(pairs(), results_path=ds["results_file"])
+
+
+# ---------------- scheduler ----------------
+
+class Scheduler:
+    """Runs the three stages over all datasets; see the module docstring"""
+
+    def __init__(self, datasets, asr_workers=ASR_WORKERS, pre_workers=PRE_WORKERS,
+                 queue_size=QUEUE_SIZE, cache_dir=CACHE_DIR):
+        self.datasets = datasets
+        self.asr_workers = asr_workers
+        self.pre_workers = pre_workers
+        self.queue_size = queue_size
+        self.cache_dir = cache_dir
+
+        self.ctx = mp.get_context("spawn")
+        self.results = self.ctx.Queue()
+        self.ready = queue.Queue()                          # preprocessed, waiting for an ASR worker
+        self.in_flight = threading.Semaphore(queue_size)    # files between stage 1 and stage 2
+        self.queued_s = [0.0] * asr_workers                 # audio seconds queued per ASR worker
+        self.assigned = [{} for _ in range(asr_workers)]    # (dataset, file) -> job, per ASR worker
+        self.dead = set()                                   # ASR workers that crashed
+        self.lost = deque()                                 # failure entries for their files
+        self.workers = []
+        self.inboxes = []
+        self.lock = threading.Lock()
+
+    def _preprocessed(self, job, future):
+        try:
+            self.ready.put(future.result())
+        except Exception as e:
+            # e.g. a pool worker killed by the OOM killer
+            self.ready.put(dict(job, error=f"preprocessing: {e!r}"))
+
+    def _feed(self, jobs, pool):
+        """Stage 1: preprocess (or pass through) in run order, at most queue_size ahead"""
+        for job in jobs:
+            self.in_flight.acquire()
+            if job["preprocess"]:
+                pool.submit(_preprocess, job).add_done_callback(partial(self._preprocessed, job))
+            else:
+                self.ready.put(job)
+
+    def _check_workers(self):
+        """
+        Mark ASR workers that exited abnormally (OOM killer, crash in ctranslate2)
+        as dead: their queued files fail and they get no more jobs.
+        """
+        with self.lock:
+            for w, p in enumerate(self.workers):
+                if w in self.dead or p.exitcode in (None, 0):
+                    continue
+                self.dead.add(w)
+                lost = list(self.assigned[w].values())
+                self.assigned[w].clear()
+                # Nobody reads this inbox any more; do not wait for it to drain at exit
+                self.inboxes[w].cancel_join_thread()
+                print(f"❌ ASR worker {w} exited with code {p.exitcode}, failing its {len(lost)} queued file(s)")
+                for job in lost:
+                    self.lost.append({"file": job["file"], "dataset": job["dataset"], "status": "failed",
+                                      "error": f"ASR worker {w} exited with code {p.exitcode}"})
+
+    def _next_result(self):
+        while True:
+            self._check_workers()
+            if self.lost:
+                return self.lost.popleft()
+            try:
+                entry = self.results.get(timeout=PUT_TIMEOUT_S)
+            except queue.Empty:
+                self._check_workers()
+                # Crashed workers' files are failed above; this is for clean exits that lost files
+                if not self.dead and not any(p.is_alive() for p in self.workers):
+                    raise RuntimeError("all ASR workers exited with files still pending")
+                continue
+            if "worker" in entry:
+                with self.lock:
+                    if self.assigned[entry["worker"]].pop((entry["dataset"], entry["file"]), None) is None:
+                        continue  # already failed when its worker was found dead
+            return entry
+
+    def _hand_over(self, job):
+        """Put job in the inbox of the live worker with the least audio queued; False if none is left"""
+        key = (job["dataset"], job["file"])
+        while True:
+            with self.lock:
+                live = [w for w in range(self.asr_workers) if w not in self.dead]
+                if not live:
+                    return False
+                open_workers = [w for w in live if not self.inboxes[w].full()]
+                worker = min(open_workers or live, key=self.queued_s.__getitem__)
+                self.queued_s[worker] += job["seconds"]
+                self.assigned[worker][key] = job
+            try:
+                # Blocks while that worker's queue is full: back-pressure on stage 1
+                self.inboxes[worker].put(job, timeout=PUT_TIMEOUT_S)
+                return True
+            except queue.Full:
+                with self.lock:
+                    self.queued_s[worker] -= job["seconds"]
+                    self.assigned[worker].pop(key, None)
+                self._check_workers()
+
+    def _dispatch(self, n_jobs):
+        """Stage 1 -> 2: each file to the worker with the least audio queued"""
+        for _ in range(n_jobs):
+            job = self.ready.get()
+            self.in_flight.release()
+            if "error" not in job and not self._hand_over(job):
+                job = dict(job, error="no ASR worker left")
+            if "error" in job:
+                self.results.put({"file": job["file"], "dataset": job["dataset"],
+                                  "status": "failed", "error": job["error"]})
+
+        for w, inbox in enumerate(self.inboxes):
+            while w not in self.dead:
+                try:
+                    inbox.put(None, timeout=PUT_TIMEOUT_S)
+                    break
+                except queue.Full:
+                    self._check_workers()
+
+    def run(self):
+        jobs, done = plan(self.datasets)
+        print(f"📋 {len(self.datasets)} dataset(s): {len(jobs)} file(s) to transcribe "
+              f"({sum(j['seconds'] for j in jobs) / 3600:.2f} h), "
+              f"{sum(len(d) for d in done.values())} already done")
+
+        if any(j["preprocess"] and j["adaptive_denoise"] for j in jobs):
+            from audio_pipeline.adaptive_denoise import require_vad
+            require_vad()
+
+        for ds in self.datasets:
+            os.makedirs(ds["hypothesis_dir"], exist_ok=True)
+            os.makedirs(ds["clean_dir"], exist_ok=True)
+
+        # Stage 3: one scoring thread per dataset, fed as hypotheses arrive
+        pending = {i: 0 for i in range(len(self.datasets))}
+        for job in jobs:
+            pending[job["dataset"]] += 1
+        score_queues = {i: queue.Queue(self.queue_size) for i in pending}
+        totals = {}
+        scorers = [
+            threading.Thread(target=_score_dataset, args=(ds, done[i], score_queues[i], totals), daemon=True)
+            for i, ds in enumerate(self.datasets)
+        ]
+        for t in scorers:
+            t.start()
+        for i, count in pending.items():
+            if count == 0:
+                score_queues[i].put(None)
+
+        # Stage 2: ASR workers, each with a bounded inbox; cores left over by stage 1 are split between them
+        cpu_threads = max(1, ((os.cpu_count() or 1) - self.pre_workers) // self.asr_workers)
+        self.inboxes = [self.ctx.Queue(max(1, self.queue_size // self.asr_workers))
+                        for _ in range(self.asr_workers)]
+        self.workers = workers = [
+            self.ctx.Process(target=_asr_worker,
+                             args=(w, self.inboxes[w], self.results, cpu_threads, self.cache_dir))
+            for w in range(self.asr_workers)
+        ]
+        for p in workers:
+            p.start()
+
+        start = time.time()
+        counts = {"done": 0, "failed": 0}
+        with ProcessPoolExecutor(max_workers=self.pre_workers, mp_context=self.ctx) as pool:
+            threading.Thread(target=self._feed, args=(jobs, pool), daemon=True).start()
+            threading.Thread(target=self._dispatch, args=(len(jobs),), daemon=True).start()
+
+            try:
+                for _ in range(len(jobs)):
+                    entry = self._next_result()
+                    index = entry.pop("dataset")
+                    ds = self.datasets[index]
+                    if "worker" in entry:
+                        with self.lock:
+                            self.queued_s[entry["worker"]] -= entry["seconds"]
+                    text = entry.pop("text", None)
+
+                    # Only this thread writes the manifests
+                    append_manifest(ds["manifest"], entry)
+                    counts[entry["status"]] += 1
+                    if entry["status"] == "done":
+                        print(f"📝 [{ds['name']}] {entry['file']} ({entry['asr_s']}s)")
+                        score_queues[index].put((entry["file"], text.strip()))
+                    else:
+                        print(f"❌ [{ds['name']}] {entry['file']}: {entry['error']}")
+
+                    pending[index] -= 1
+                    if pending[index] == 0:
+                        score_queues[index].put(None)
+            except BaseException:
+                for p in workers:
+                    p.terminate()
+                raise
+            finally:
+                for p in workers:
+                    p.join()
+
+        for t in scorers:
+            t.join()
+
+        elapsed = time.time() - start
+        print(f"\n✅ Transcribed {counts['done']}, failed {counts['failed']} in {elapsed:.1f}s")
+        return totals
+
+
+def print_totals(totals):
+    print(f"\n📈 {'dataset':<20} {'files':>6} {'WER':>8} {'CER':>8} {'SER':>8}")
+    for name, t in totals.items():
+        if t.utterances:
+            print(f"   {name:<20} {t.utterances:>6} {t.wer:>8.4f} {t.cer:>8.4f} {t.ser:>8.4f}")
+        else:
+            print(f"   {name:<20} {0:>6} {'-':>8} {'-':>8} {'-':>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preprocess, transcribe and score many datasets")
+    parser.add_argument("jobs", help="JSON list (or JSON lines) of datasets")
+    parser.add_argument("--asr-workers", type=int, default=ASR_WORKERS)
+    parser.add_argument("--pre-workers", type=int, default=PRE_WORKERS)
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE)
+    args = parser.parse_args()
+
+    if PROFILE_FILE:
+        stage_profiler.enable(PROFILE_FILE)
+
+    scheduler = Scheduler(load_jobs(args.jobs), asr_workers=args.asr_workers,
+                          pre_workers=args.pre_workers, queue_size=args.queue_size)
+    print_totals(scheduler.run())
+
+    if PROFILE_FILE and os.path.exists(PROFILE_FILE):
+        print("\n⏱️ Stage profile:", PROFILE_FILE)
+        stage_profiler.print_report(PROFILE_FILE)
+
+
+if __name__ == "__main__":
+    main()
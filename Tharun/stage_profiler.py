@@ -0,0 +1,196 @@
+"""
+Per-stage profiling for the audio -> ASR -> evaluation pipeline.
+
+Stages are marked with the @profiled("name") decorator or the
+profile_stage("name") context manager. When profiling is off the
+decorator costs one global check per call.
+
+When on, each stage call appends one JSON line to the profile file:
+wall time, CPU time, real-time factor (if the audio duration is known),
+current and peak RSS, and bytes read / written (from /proc/self/io).
+
+Enable with enable("profile.jsonl") or the STAGE_PROFILE environment
+variable (worker processes inherit it). Summarise with:
+
+    python stage_profiler.py profile.jsonl
+"""
+
+import json
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+ENV_VAR = "STAGE_PROFILE"
+
+_path = os.environ.get(ENV_VAR) or None
+_file = None
+
+
+def enable(path):
+    """Start writing stage records to path (also for child processes)"""
+    global _path, _file
+    _path = path
+    _file = None
+    os.environ[ENV_VAR] = path
+
+
+def disable():
+    global _path, _file
+    if _file:
+        _file.close()
+    _path = _file = None
+    os.environ.pop(ENV_VAR, None)
+
+
+def is_enabled():
+    return _path is not None
+
+
+def _io_bytes():
+    """(bytes read, bytes written) by this process, or (0, 0) if unknown"""
+    try:
+        with open("/proc/self/io") as f:
+            counters = dict(line.split(": ") for line in f.read().splitlines())
+        return int(counters["rchar"]), int(counters["wchar"])
+    except (OSError, KeyError, ValueError):
+        return 0, 0
+
+
+def _rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _write(record):
+    global _file
+    if _file is None:
+        os.makedirs(os.path.dirname(_path) or ".", exist_ok=True)
+        _file = open(_path, "a", encoding="utf-8", buffering=1)
+    _file.write(json.dumps(record) + "\n")
+
+
+@contextmanager
+def profile_stage(stage, audio_seconds=None, **fields):
+    """
+    Record one stage. Yields a dict: keys set on it (e.g. "audio_s" once
+    the duration is known, or a file name) are added to the record.
+    """
+    extra = dict(fields)
+    if audio_seconds is not None:
+        extra["audio_s"] = audio_seconds
+
+    if _path is None:
+        yield extra
+        return
+
+    read0, written0 = _io_bytes()
+    cpu0 = time.process_time()
+    wall0 = time.perf_counter()
+    try:
+        yield extra
+    finally:
+        wall = time.perf_counter() - wall0
+        read1, written1 = _io_bytes()
+        audio_s = extra.pop("audio_s", None)
+        record = {
+            "stage": stage,
+            "pid": os.getpid(),
+            "wall_s": round(wall, 6),
+            "cpu_s": round(time.process_time() - cpu0, 6),
+            "audio_s": audio_s,
+            "rtf": round(wall / audio_s, 6) if audio_s else None,
+            "rss_mb": _rss_mb(),
+            # ru_maxrss is KB on Linux
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "bytes_read": read1 - read0,
+            "bytes_written": written1 - written0,
+        }
+        record.update(extra)
+        _write(record)
+
+
+def profiled(stage, audio_seconds=None):
+    """
+    Decorator form of profile_stage.
+    audio_seconds: optional function of the call's arguments returning
+    the audio duration, used for the real-time factor.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _path is None:
+                return fn(*args, **kwargs)
+
+            seconds = None
+            if audio_seconds is not None:
+                try:
+                    seconds = audio_seconds(*args, **kwargs)
+                except Exception:
+                    pass
+
+            with profile_stage(stage, seconds):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def samples_seconds(audio, sr, *args, **kwargs):
+    """audio_seconds helper for functions called as fn(audio, sr, ...)"""
+    return len(audio) / sr
+
+
+# ---------------- report ----------------
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def summarize(path):
+    """Per-stage count, total, p50/p90/p99 wall time, mean RTF, peak RSS, I/O"""
+    stages = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                stages.setdefault(record["stage"], []).append(record)
+
+    summary = {}
+    for stage, records in stages.items():
+        walls = [r["wall_s"] for r in records]
+        rtfs = [r["rtf"] for r in records if r.get("rtf") is not None]
+        summary[stage] = {
+            "count": len(records),
+            "total_s": sum(walls),
+            "p50_s": _percentile(walls, 50),
+            "p90_s": _percentile(walls, 90),
+            "p99_s": _percentile(walls, 99),
+            "cpu_s": sum(r["cpu_s"] for r in records),
+            "mean_rtf": sum(rtfs) / len(rtfs) if rtfs else None,
+            "peak_rss_mb": max(r["peak_rss_mb"] for r in records),
+            "bytes_read": sum(r["bytes_read"] for r in records),
+            "bytes_written": sum(r["bytes_written"] for r in records),
+        }
+    return summary
+
+
+def print_report(path):
+    summary = summarize(path)
+    print(f"{'stage':<40} {'count':>7} {'total s':>9} {'p50 ms':>9} {'p90 ms':>9} "
+          f"{'p99 ms':>9} {'RTF':>7} {'peak MB':>8} {'read MB':>8} {'write MB':>8}")
+
+    for stage, s in sorted(summary.items(), key=lambda item: -item[1]["total_s"]):
+        rtf = f"{s['mean_rtf']:.3f}" if s["mean_rtf"] is not None else "-"
+        print(f"{stage:<40} {s['count']:>7} {s['total_s']:>9.2f} {s['p50_s'] * 1000:>9.2f} "
+              f"{s['p90_s'] * 1000:>9.2f} {s['p99_s'] * 1000:>9.2f} {rtf:>7} "
+              f"{s['peak_rss_mb']:>8.0f} {s['bytes_read'] / 1e6:>8.1f} {s['bytes_written'] / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    print_report(sys.argv[1])